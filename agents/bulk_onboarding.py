@@ -0,0 +1,275 @@
+import contextvars
+import csv
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, Iterable, Callable, Optional, Tuple
+from agents.schemas import validate_onboarding_request
+from agents.study_plan_agent import study_plan_agent
+from memory.plan_cache import plan_shape_key
+from llm.rate_limiter import call_priority, BATCH
+from tools.study_tools import study_tools
+from utils.metrics import metrics
+from utils.logger import logger
+
+PROFILE_COLUMNS = ('student_id', 'name', 'subjects', 'available_hours', 'preferences')
+
+def detect_format(path: str) -> str:
+    return 'ndjson' if path.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+
+def read_roster(stream: Iterable[str], roster_format: str = 'csv') -> Iterator[Dict[str, Any]]:
+    """
+    Stream student records from a CSV or NDJSON roster
+    CSV: subjects are separated by ';' or '|', preferences are a JSON object
+    or 'key=value;key=value', and any other column becomes a preference
+    """
+    if roster_format == 'ndjson':
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                record = {'_error': f"invalid JSON: {e}"}
+            yield record if isinstance(record, dict) else {'_error': 'not a JSON object'}
+        return
+
+    for row in csv.DictReader(stream):
+        yield _parse_csv_row(row)
+
+def _parse_csv_row(row: Dict[str, str]) -> Dict[str, Any]:
+    record = {}
+    for column in ('student_id', 'name'):
+        if (row.get(column) or '').strip():
+            record[column] = row[column].strip()
+
+    record['subjects'] = [subject.strip() for subject in re.split(r'[;|]', row.get('subjects') or '') if subject.strip()]
+    try:
+        record['available_hours'] = int(float(row.get('available_hours') or 0))
+    except ValueError:
+        record['available_hours'] = 0
+
+    preferences = {}
+    raw = (row.get('preferences') or '').strip()
+    if raw.startswith('{'):
+        try:
+            preferences.update(json.loads(raw))
+        except json.JSONDecodeError:
+            pass
+    elif raw:
+        for pair in re.split(r'[;|]', raw):
+            if '=' in pair:
+                key, value = pair.split('=', 1)
+                preferences[key.strip()] = value.strip()
+
+    for column, value in row.items():
+        if column and column not in PROFILE_COLUMNS and (value or '').strip():
+            preferences[column.strip()] = value.strip()
+
+    record['preferences'] = preferences
+    return record
+
+def count_roster_rows(path: str) -> int:
+    """Number of records in a roster file (for progress and ETA)"""
+    with open(path, 'r', newline='') as f:
+        if detect_format(path) == 'ndjson':
+            return sum(1 for line in f if line.strip())
+        return max(0, sum(1 for _ in csv.reader(f)) - 1)
+
+class Checkpoint:
+    """
+    Append-only log of finished roster rows, so a stopped run can resume
+    Rows that failed are tried again on the next run; invalid rows are not
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done = set()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if entry.get('status') in ('onboarded', 'invalid'):
+                        self.done.add(entry['row'])
+
+    def record(self, row: int, status: str, **details):
+        with self._lock:
+            if status in ('onboarded', 'invalid'):
+                self.done.add(row)
+            if not self.path:
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps({'row': row, 'status': status, **details}) + "\n")
+
+class BulkOnboarder:
+    """
+    Onboards a whole roster with a limited number of parallel workers
+    Each worker onboards a student with the local plan, then enriches it with
+    the model at BATCH priority, so the global quota keeps interactive users
+    first. Students with the same profile shape share one plan generation
+    through the shared plan cache.
+    """
+
+    def __init__(self, coordinator, concurrency: int = 8, checkpoint_path: str = None, enrich: bool = True,
+                 report_every_s: float = 5.0, reporter: Callable[[Dict[str, Any]], None] = None):
+        self.coordinator = coordinator
+        self.concurrency = max(1, concurrency)
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.enrich = enrich
+        self.report_every_s = report_every_s
+        self.reporter = reporter or self._log_progress
+        self._lock = threading.Lock()
+
+    def run(self, records: Iterable[Dict[str, Any]], total: int = None) -> Dict[str, Any]:
+        """Onboard every record; returns a summary of the run"""
+        self._stats = {
+            'total': total, 'processed': 0, 'onboarded': 0, 'failed': 0, 'invalid': 0,
+            'skipped': 0, 'unique_shapes': 0, 'started': time.perf_counter()
+        }
+        self._shapes = set()
+        self._seen_ids = set()
+        self._last_report = 0.0
+
+        # Bound the rows waiting for a worker so huge rosters stream in constant memory
+        slots = threading.BoundedSemaphore(self.concurrency * 2)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='bulk-onboard') as executor:
+            for row, record in enumerate(records):
+                if row in self.checkpoint.done:
+                    self._count('skipped')
+                    continue
+                slots.acquire()
+                # Rows run in the caller's context, so they join its trace
+                future = executor.submit(contextvars.copy_context().run, self._onboard_row, row, record)
+                future.add_done_callback(lambda _: slots.release())
+
+        summary = self._summary()
+        self.reporter(summary)
+        logger.info(f"✅ Bulk onboarding finished: {summary['onboarded']} onboarded, "
+                    f"{summary['failed']} failed, {summary['invalid']} invalid")
+        return summary
+
+    def _onboard_row(self, row: int, record: Dict[str, Any]):
+        student_data, errors = validate_onboarding_request(record)
+        if record.get('_error'):
+            errors = [record['_error']]
+        if not errors and student_data.get('student_id'):
+            with self._lock:
+                if student_data['student_id'] in self._seen_ids:
+                    errors = [f"duplicate student_id {student_data['student_id']}"]
+                self._seen_ids.add(student_data['student_id'])
+
+        if errors:
+            self.checkpoint.record(row, 'invalid', errors=errors)
+            self._count('invalid')
+            return
+
+        try:
+            result = self.coordinator.onboard_new_student(student_data, enrich=False)
+            if not result:
+                raise RuntimeError("onboarding returned no result")
+
+            self._note_shape(student_data)
+            if self.enrich:
+                # Model calls wait behind interactive and onboarding traffic
+                with call_priority(BATCH):
+                    study_plan_agent.enrich_plan(result['student_id'], result['profile'],
+                                                 result['study_plan'].get('generated_at'))
+
+            self.checkpoint.record(row, 'onboarded', student_id=result['student_id'])
+            self._count('onboarded')
+        except Exception as e:
+            logger.error(f"❌ Bulk onboarding failed for row {row}: {e}")
+            self.checkpoint.record(row, 'failed', error=str(e))
+            self._count('failed')
+
+    def _note_shape(self, student_data: Dict[str, Any]):
+        study_load = study_tools.calculate_study_load(student_data['subjects'], student_data['available_hours'])
+        shape = plan_shape_key(study_load, student_data.get('preferences', {}))
+        with self._lock:
+            if shape not in self._shapes:
+                self._shapes.add(shape)
+                self._stats['unique_shapes'] += 1
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self._stats[outcome] += 1
+            if outcome != 'skipped':
+                self._stats['processed'] += 1
+            metrics.increment(f'bulk_onboarding.{outcome}')
+
+            now = time.perf_counter()
+            if now - self._last_report < self.report_every_s:
+                return
+            self._last_report = now
+            summary = self._summary_locked(now)
+        self.reporter(summary)
+
+    def _summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._summary_locked(time.perf_counter())
+
+    def _summary_locked(self, now: float) -> Dict[str, Any]:
+        stats = self._stats
+        elapsed = now - stats['started']
+        throughput = stats['processed'] / elapsed if elapsed > 0 else 0.0
+
+        eta_s = None
+        if stats['total'] is not None and throughput > 0:
+            remaining = max(0, stats['total'] - stats['processed'] - stats['skipped'])
+            eta_s = remaining / throughput
+
+        metrics.set_gauge('bulk_onboarding.throughput_per_s', throughput)
+        if eta_s is not None:
+            metrics.set_gauge('bulk_onboarding.eta_s', eta_s)
+
+        return {
+            'total': stats['total'],
+            'processed': stats['processed'],
+            'onboarded': stats['onboarded'],
+            'failed': stats['failed'],
+            'invalid': stats['invalid'],
+            'skipped': stats['skipped'],
+            'unique_shapes': stats['unique_shapes'],
+            'plans_shared': max(0, stats['onboarded'] - stats['unique_shapes']),
+            'elapsed_s': round(elapsed, 2),
+            'throughput_per_s': round(throughput, 2),
+            'eta_s': round(eta_s, 1) if eta_s is not None else None
+        }
+
+    @staticmethod
+    def _log_progress(summary: Dict[str, Any]):
+        done = summary['processed'] + summary['skipped']
+        total = summary['total'] if summary['total'] is not None else '?'
+        eta = f"{summary['eta_s']:.0f}s" if summary['eta_s'] is not None else '?'
+        logger.info(f"📈 {done}/{total} students | {summary['throughput_per_s']:.1f}/s | "
+                    f"{summary['failed']} failed | ETA {eta}")
+
+def onboard_roster_file(coordinator, path: str, roster_format: str = None, concurrency: int = None,
+                        checkpoint_path: str = None, enrich: bool = True,
+                        reporter: Callable[[Dict[str, Any]], None] = None) -> Dict[str, Any]:
+    """Onboard every student in a roster file, resuming from the checkpoint if there is one"""
+    roster_format = roster_format or detect_format(path)
+    concurrency = concurrency or int(os.getenv('BULK_ONBOARDING_CONCURRENCY', '8'))
+    onboarder = BulkOnboarder(coordinator, concurrency, checkpoint_path, enrich, reporter=reporter)
+
+    with open(path, 'r', newline='') as f:
+        return onboarder.run(read_roster(f, roster_format), total=count_roster_rows(path))
+
+def save_uploaded_roster(content: str, roster_format: str, storage_path: str) -> Tuple[str, str]:
+    """Store an uploaded roster so a background job (and a restart) can read it; returns (roster, checkpoint) paths"""
+    directory = os.path.join(storage_path, 'rosters')
+    os.makedirs(directory, exist_ok=True)
+    name = f"roster_{time.strftime('%Y%m%d_%H%M%S')}_{os.urandom(4).hex()}"
+    roster_path = os.path.join(directory, f"{name}.{'ndjson' if roster_format == 'ndjson' else 'csv'}")
+    with open(roster_path, 'w', newline='') as f:
+        f.write(content)
+    return roster_path, os.path.join(directory, f"{name}.checkpoint.jsonl")
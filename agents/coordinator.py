@@ -1,8 +1,19 @@
+import time
 from typing import Dict, List, Any
 from agents.student_profile_agent import student_agent
 from agents.study_plan_agent import study_plan_agent
 from agents.mcq_agent import mcq_agent
 from agents.progress_tracker import progress_tracker
+from agents.spaced_repetition import spaced_repetition, DAY_S
+from agents.workflow import Workflow, WorkflowStep
+from agents.job_queue import job_queue
+from agents.bulk_onboarding import onboard_roster_file
+from agents.review_materializer import ReviewMaterializer
+from agents.revision_digest import revision_digest_job
+from memory.profile_store import profile_store
+from llm.rate_limiter import with_priority, INTERACTIVE, ONBOARDING
+from utils.metrics import metrics
+from utils.tracing import traced, tracer
 from utils.logger import logger
 
 class MultiAgentCoordinator:
@@ -12,57 +23,103 @@ class MultiAgentCoordinator:
     """
     
     def __init__(self):
+        # Each workflow is a dependency graph; steps that don't depend on each other run in parallel
+        self.onboarding_workflow = Workflow('onboarding', [
+            WorkflowStep('create_profile', self._create_profile, inputs=['student_id', 'student_data'], output='profile'),
+            WorkflowStep('generate_plan', self._generate_plan, inputs=['student_id', 'profile', 'enrich'], output='study_plan'),
+            WorkflowStep('init_progress', self._init_progress, inputs=['student_id', 'student_data'],
+                         output='progress_initialized', retries=1)
+        ])
+        
+        self.study_session_workflow = Workflow('study_session', [
+            WorkflowStep('record_session', progress_tracker.record_study_session,
+                         inputs=['student_id', 'session_data'], output='progress_tracked', retries=1),
+            WorkflowStep('generate_mcqs', self._session_mcqs, inputs=['student_id', 'session_data'],
+                         output='mcqs_generated', required=False, default=[]),
+            # Reads and rewrites the progress data, so it waits for the session to be recorded
+            WorkflowStep('update_patterns', self._update_patterns,
+                         inputs=['student_id', 'session_data', 'progress_tracked'], output='patterns_updated')
+        ])
+        
+        self.weekly_review_workflow = Workflow('weekly_review', [
+            WorkflowStep('load_profile', student_agent.get_student_profile, inputs=['student_id'], output='profile'),
+            WorkflowStep('load_progress', progress_tracker.get_student_progress, inputs=['student_id'], output='progress'),
+            WorkflowStep('find_weak_areas', self._identify_weak_areas, inputs=['progress'], output='weak_areas'),
+            # One MCQ generation per focus area (top 2 weak areas), all at the same time
+            WorkflowStep('practice_questions', self._practice_for_area, inputs=['student_id', 'weak_areas'],
+                         output='practice_recommendations', map_over='weak_areas', map_as='area',
+                         limit=2, required=False, default=[]),
+            WorkflowStep('revision_due', self._revision_due, inputs=['student_id'], output='revision_due',
+                         required=False, default=[]),
+            WorkflowStep('plan_next_week', self._generate_next_week_plan, inputs=['profile', 'progress', 'revision_due'],
+                         output='next_week_plan')
+        ])
+        
+        # Nightly batch that stores every active student's weekly review
+        self.review_materializer = ReviewMaterializer.from_env(self)
+        
         logger.info("✅ Multi-Agent Coordinator started!")
     
-    def onboard_new_student(self, student_data: Dict[str, Any]) -> Dict[str, Any]:
+    @with_priority(ONBOARDING)
+    @traced('coordinator.onboard_new_student')
+    def onboard_new_student(self, student_data: Dict[str, Any], enrich: bool = True) -> Dict[str, Any]:
         """
-        Sequential agent workflow for new student onboarding
-        Step-by-step process:
+        Agent workflow for new student onboarding
         1. Create student profile
-        2. Generate study plan
-        3. Set up progress tracking
+        2. Generate study plan (local plan now, model enrichment in the background)
+        3. Set up progress tracking (runs alongside steps 1 and 2)
+        With enrich=False the caller enriches the plan itself (bulk onboarding)
         """
         try:
+            start_time = time.perf_counter()
             logger.info(f"👤 Onboarding new student: {student_data.get('name', 'Unknown')}")
             
-            # Step 1: Student Profile Agent (Sequential)
-            student_id = student_data.get('student_id', f"student_{len(student_agent.student_data) + 1}")
-            profile = student_agent.collect_student_info(
-                student_id=student_id,
-                subjects=student_data['subjects'],
-                available_hours=student_data['available_hours'],
-                preferences=student_data.get('preferences', {})
-            )
-            
-            logger.info("✅ Step 1: Student profile created")
-            
-            # Step 2: Study Plan Generator Agent (Sequential)
-            study_plan = study_plan_agent.generate_study_plan(profile)
-            
-            logger.info("✅ Step 2: Study plan generated")
-            
-            # Step 3: Progress Tracker Setup (Sequential)
-            initial_session = {
-                'subjects': student_data['subjects'],
-                'topics': ['Initial setup'],
-                'duration': 0,
-                'notes': 'Student onboarding completed'
-            }
-            progress_tracker.record_study_session(student_id, initial_session)
+            student_id = student_data.get('student_id') or profile_store.allocate_id()
+            tracer.set_attributes(student_id=student_id, enrich=enrich)
+            run = self.onboarding_workflow.run(student_id=student_id, student_data=student_data, enrich=enrich)
             
-            logger.info("✅ Step 3: Progress tracking initialized")
+            logger.info("✅ Onboarding workflow completed")
             
+            metrics.observe('onboarding.latency_ms', (time.perf_counter() - start_time) * 1000)
             return {
                 'student_id': student_id,
-                'profile': profile,
-                'study_plan': study_plan,
-                'onboarding_status': 'completed'
+                'profile': run.get('profile'),
+                'study_plan': run.get('study_plan'),
+                'onboarding_status': 'completed',
+                'timings': run.breakdown()
             }
             
         except Exception as e:
             logger.error(f"❌ Error in student onboarding: {e}")
             return {}
     
+    def run_onboarding_job(self, student_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Background job version of onboard_new_student; raises so the job is marked failed"""
+        result = self.onboard_new_student(student_data)
+        if not result:
+            raise RuntimeError(f"Onboarding failed for {student_data.get('student_id', 'new student')}")
+        return result
+    
+    def run_bulk_onboarding_job(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Background job that onboards a stored roster; resumes from its checkpoint after a restart"""
+        return onboard_roster_file(
+            self,
+            payload['roster_path'],
+            roster_format=payload.get('format'),
+            concurrency=payload.get('concurrency'),
+            checkpoint_path=payload.get('checkpoint_path')
+        )
+    
+    def run_review_materialization_job(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Background job that materializes the weekly reviews (POST /reviews/materialize)"""
+        return self.review_materializer.run(force=bool(payload.get('force', False)))
+    
+    def run_revision_digest_job(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Background job that writes the day's revision digests (POST /revision/digests)"""
+        return revision_digest_job.run(payload.get('date'))
+    
+    @with_priority(INTERACTIVE)
+    @traced('coordinator.conduct_study_session')
     def conduct_study_session(self, student_id: str, session_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Parallel agent workflow for study session
@@ -70,81 +127,51 @@ class MultiAgentCoordinator:
         """
         try:
             logger.info(f"📚 Conducting study session for {student_id}")
+            tracer.set_attributes(student_id=student_id)
             
-            # Parallel tasks that can happen at the same time
-            parallel_results = {}
-            
-            # Task 1: Record session in progress tracker (Parallel)
-            progress_task = progress_tracker.record_study_session(student_id, session_data)
-            parallel_results['progress_tracked'] = progress_task
+            run = self.study_session_workflow.run(student_id=student_id, session_data=session_data)
             
-            # Task 2: Generate MCQs for topics studied (Parallel)
-            topics = session_data.get('topics', [])
-            if topics:
-                mcq_task = mcq_agent.generate_mcqs(
-                    topic=topics[0],  # Focus on first topic
-                    difficulty=session_data.get('difficulty', 'beginner'),
-                    num_questions=3
-                )
-                parallel_results['mcqs_generated'] = mcq_task
-            
-            # Task 3: Update learning patterns (Parallel)
-            if session_data.get('mcq_score'):
-                for subject in session_data.get('subjects', []):
-                    progress_tracker.update_mcq_performance(
-                        student_id, 
-                        subject, 
-                        session_data['mcq_score'], 
-                        session_data.get('total_questions', 5)
-                    )
+            parallel_results = {'progress_tracked': run.get('progress_tracked')}
+            if session_data.get('topics'):
+                parallel_results['mcqs_generated'] = run.get('mcqs_generated')
             
             logger.info("✅ Parallel study session tasks completed")
             
             return {
                 'student_id': student_id,
                 'session_recorded': True,
-                'parallel_results': parallel_results
+                'parallel_results': parallel_results,
+                'timings': run.breakdown()
             }
             
         except Exception as e:
             logger.error(f"❌ Error in study session: {e}")
             return {}
     
-    def generate_weekly_review(self, student_id: str) -> Dict[str, Any]:
+    @traced('coordinator.generate_weekly_review')
+    def generate_weekly_review(self, student_id: str, profile: Dict[str, Any] = None,
+                               progress: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Comprehensive weekly review using multiple agents
+        Profile and progress load together; weak-area questions are generated in parallel.
+        A profile or progress report passed in is used instead of loading it.
         """
         try:
             logger.info(f"📊 Generating weekly review for {student_id}")
-            
-            # Sequential workflow for review
-            review_data = {}
-            
-            # Step 1: Get student profile
-            profile = student_agent.get_student_profile(student_id)
-            review_data['profile'] = profile
-            
-            # Step 2: Get progress report
-            progress_report = progress_tracker.get_student_progress(student_id)
-            review_data['progress'] = progress_report
-            
-            # Step 3: Generate new MCQs based on weak areas
-            weak_areas = self._identify_weak_areas(progress_report)
-            review_data['weak_areas'] = weak_areas
-            
-            mcq_recommendations = []
-            for area in weak_areas[:2]:  # Focus on top 2 weak areas
-                mcqs = mcq_agent.generate_mcqs(area, 'beginner', 2)
-                mcq_recommendations.append({
-                    'area': area,
-                    'practice_questions': mcqs
-                })
-            
-            review_data['practice_recommendations'] = mcq_recommendations
-            
-            # Step 4: Generate insights for next week
-            next_week_plan = self._generate_next_week_plan(profile, progress_report)
-            review_data['next_week_plan'] = next_week_plan
+            tracer.set_attributes(student_id=student_id)
+            
+            provided = {key: value for key, value in (('profile', profile), ('progress', progress)) if value is not None}
+            run = self.weekly_review_workflow.run(student_id=student_id, **provided)
+            
+            review_data = {
+                'profile': run.get('profile'),
+                'progress': run.get('progress'),
+                'weak_areas': run.get('weak_areas'),
+                'practice_recommendations': run.get('practice_recommendations'),
+                'revision_due': run.get('revision_due'),
+                'next_week_plan': run.get('next_week_plan'),
+                'timings': run.breakdown()
+            }
             
             logger.info("✅ Weekly review generated successfully")
             return review_data
@@ -153,6 +180,74 @@ class MultiAgentCoordinator:
             logger.error(f"❌ Error generating weekly review: {e}")
             return {}
     
+    def _create_profile(self, student_id: str, student_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Onboarding step: Student Profile Agent"""
+        profile = student_agent.collect_student_info(
+            student_id=student_id,
+            subjects=student_data['subjects'],
+            available_hours=student_data['available_hours'],
+            preferences=student_data.get('preferences', {})
+        )
+        logger.info("✅ Student profile created")
+        return profile
+    
+    def _generate_plan(self, student_id: str, profile: Dict[str, Any], enrich: bool) -> Dict[str, Any]:
+        """Onboarding step: Study Plan Generator Agent"""
+        # The local plan is returned right away; the model's version is merged into the stored plan when ready
+        study_plan = study_plan_agent.generate_fast_plan(profile)
+        study_plan_agent.save_plan(student_id, study_plan)
+        if enrich:
+            study_plan_agent.enrich_plan_async(student_id, profile, study_plan.get('generated_at'))
+        logger.info("✅ Study plan generated")
+        return study_plan
+    
+    def _init_progress(self, student_id: str, student_data: Dict[str, Any]) -> bool:
+        """Onboarding step: Progress Tracker setup"""
+        initial_session = {
+            'subjects': student_data['subjects'],
+            'topics': ['Initial setup'],
+            'duration': 0,
+            'notes': 'Student onboarding completed',
+            # Onboarding the same student again doesn't add a second setup session
+            'idempotency_key': f"onboarding:{student_id}"
+        }
+        recorded = progress_tracker.record_study_session(student_id, initial_session)
+        logger.info("✅ Progress tracking initialized")
+        return recorded
+    
+    def _session_mcqs(self, student_id: str, session_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Study session step: practice questions for the first topic studied"""
+        topics = session_data.get('topics', [])
+        if not topics:
+            return []
+        return mcq_agent.generate_mcqs(
+            topic=topics[0],  # Focus on first topic
+            difficulty=session_data.get('difficulty', 'beginner'),
+            num_questions=3,
+            student_id=student_id
+        )
+    
+    def _update_patterns(self, student_id: str, session_data: Dict[str, Any], progress_tracked: bool) -> bool:
+        """Study session step: update learning patterns from the quiz score"""
+        if not session_data.get('mcq_score'):
+            return False
+        for subject in session_data.get('subjects', []):
+            progress_tracker.update_mcq_performance(
+                student_id, 
+                subject, 
+                session_data['mcq_score'], 
+                session_data.get('total_questions', 5)
+            )
+        return True
+    
+    def _practice_for_area(self, student_id: str, area: str) -> Dict[str, Any]:
+        """Weekly review step: practice questions for one weak area"""
+        return {
+            'area': area,
+            'practice_questions': mcq_agent.generate_mcqs(area, 'beginner', 2, student_id=student_id)
+        }
+    
+    @with_priority(INTERACTIVE)
     def interactive_learning_flow(self, student_id: str) -> Dict[str, Any]:
         """
         Interactive learning session with multiple agents
@@ -184,14 +279,14 @@ class MultiAgentCoordinator:
                 for day, tasks in weekly_overview.get('weekly_schedule', {}).items():
                     print(f"   {day}: {', '.join(tasks[:2])}...")
             
-            # Generate practice questions
+            # Generate practice questions (streamed so the first one shows up quickly)
             first_subject = profile['subjects'][0]
             print(f"\n🎯 Generating practice questions for {first_subject}...")
-            mcqs = mcq_agent.generate_mcqs(first_subject, 'beginner', 3)
+            mcqs = mcq_agent.stream_mcqs(first_subject, 'beginner', 3, student_id=student_id)
             
             # Conduct quiz
-            if mcqs:
-                quiz_results = mcq_agent.conduct_quiz(mcqs)
+            quiz_results = mcq_agent.conduct_quiz(mcqs)
+            if quiz_results.get('total_questions'):
                 
                 # Record session
                 session_data = {
@@ -222,17 +317,17 @@ class MultiAgentCoordinator:
             return {
                 'interactive_session_completed': True,
                 'study_plan': study_plan,
-                'quiz_results': quiz_results if 'quiz_results' in locals() else {}
+                'quiz_results': quiz_results
             }
             
         except Exception as e:
             logger.error(f"❌ Error in interactive flow: {e}")
             return {}
     
-    def _identify_weak_areas(self, progress_report: Dict[str, Any]) -> List[str]:
+    def _identify_weak_areas(self, progress: Dict[str, Any]) -> List[str]:
         """Identify subjects/topics that need improvement"""
         weak_areas = []
-        mcq_trends = progress_report.get('metrics', {}).get('mcq_trends', {})
+        mcq_trends = progress.get('metrics', {}).get('mcq_trends', {})
         
         for subject, trend in mcq_trends.items():
             if trend.get('current_score', 0) < 60:  # Below 60%
@@ -242,7 +337,12 @@ class MultiAgentCoordinator:
         
         return weak_areas
     
-    def _generate_next_week_plan(self, profile: Dict[str, Any], progress: Dict[str, Any]) -> Dict[str, Any]:
+    def _revision_due(self, student_id: str) -> List[Dict[str, Any]]:
+        """Weekly review step: topics the spaced repetition engine has due within the next week"""
+        return spaced_repetition.due(student_id, until=time.time() + 7 * DAY_S)
+    
+    def _generate_next_week_plan(self, profile: Dict[str, Any], progress: Dict[str, Any],
+                                 revision_due: List[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Generate plan for next week based on progress"""
         weak_areas = self._identify_weak_areas(progress)
         
@@ -250,10 +350,18 @@ class MultiAgentCoordinator:
             'focus_areas': weak_areas if weak_areas else profile['subjects'],
             'recommended_hours': profile['available_hours'],
             'priority_subjects': weak_areas[:2] if weak_areas else profile['subjects'][:2],
-            'revision_days': ['Wednesday', 'Sunday']
+            'revision_days': ['Wednesday', 'Sunday'],
+            # Earliest due first, from the spaced repetition cards
+            'revision_topics': [card['topic'] for card in revision_due or []]
         }
         
         return next_week_plan
 
 # Create a global coordinator
-coordinator = MultiAgentCoordinator()
\ No newline at end of file
+coordinator = MultiAgentCoordinator()
+
+# Background jobs (POST /onboard?async=true, POST /onboard/bulk, POST /reviews/materialize, POST /revision/digests)
+job_queue.register('onboarding', coordinator.run_onboarding_job)
+job_queue.register('bulk_onboarding', coordinator.run_bulk_onboarding_job)
+job_queue.register('review_materialization', coordinator.run_review_materialization_job)
+job_queue.register('revision_digest', coordinator.run_revision_digest_job)
@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+from memory.availability_store import availability_store
+from memory.plan_cache import normalize_subject
+from tools.availability import POPCOUNT, WEEK_BYTES, free_hours, slot_labels
+from utils.event_bus import event_bus
+from utils.metrics import metrics
+from utils.logger import logger
+
+class GroupMatcher:
+    """
+    Finds study groups: students weak in the same subject with free hours in common
+    Keeps an in-memory index of every student's availability bits and a
+    posting list per weak subject, refreshed from the availability store by
+    comparing file signatures (only changed students are reloaded). A
+    subject's students are stacked into one (students, WEEK_BYTES) byte
+    matrix, so the common free hours of a group and every candidate come
+    from one vectorized AND plus a popcount table; a group is grown
+    greedily by adding the candidate that keeps the most common hours.
+    The global matcher also keeps weak subjects in step with 'mcq.scored'.
+    """
+
+    def __init__(self, store=availability_store, refresh_interval_s: float = 0.0):
+        self.store = store
+        self.refresh_interval_s = refresh_interval_s
+        self._entries = {}
+        self._postings = {}
+        self._matrices = {}
+        self._last_refresh = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_env(cls) -> 'GroupMatcher':
+        return cls(refresh_interval_s=float(os.getenv('GROUP_INDEX_REFRESH_S', '5')))
+
+    def refresh(self, force: bool = False):
+        """Reload the students whose availability changed since the last refresh"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_refresh is not None and now - self._last_refresh < self.refresh_interval_s:
+                return
+            self._last_refresh = now
+
+            signatures = self.store.storage.document_signatures(self.store.collection)
+            for student_id in [student_id for student_id in self._entries if student_id not in signatures]:
+                self._remove(student_id)
+            reloaded = 0
+            for student_id, signature in signatures.items():
+                entry = self._entries.get(student_id)
+                if entry and entry[0] == signature:
+                    continue
+                self._remove(student_id)
+                availability = self.store.get(student_id)
+                if not availability:
+                    continue
+                weak = {normalize_subject(subject) for subject in availability['weak_subjects']}
+                self._entries[student_id] = (signature, availability['bits'], weak)
+                for subject in weak:
+                    self._postings.setdefault(subject, set()).add(student_id)
+                    self._matrices.pop(subject, None)
+                reloaded += 1
+            if reloaded:
+                metrics.increment('groups.index.reloads', reloaded)
+            metrics.set_gauge('groups.index.students', len(self._entries))
+
+    def find_groups(self, student_id: str, subject: str = None, size: int = 4,
+                    min_hours: int = 1) -> List[Dict[str, Any]]:
+        """The best group around a student for each of their weak subjects (or the given subject)"""
+        started = time.perf_counter()
+        self.refresh()
+        with self._lock:
+            entry = self._entries.get(student_id)
+            if not entry:
+                return []
+            subjects = [normalize_subject(subject)] if subject else sorted(entry[2])
+            groups = []
+            for name in subjects:
+                student_ids, matrix = self._subject_matrix(name)
+                try:
+                    seed = student_ids.index(student_id)
+                except ValueError:
+                    # Not weak in this subject: match against the subject's students anyway
+                    seed = None
+                members, common = self._grow(matrix, entry[1], seed, size, min_hours)
+                if members:
+                    groups.append(self._group(name, [student_id] + [student_ids[index] for index in members], common))
+        metrics.observe('groups.match_ms', (time.perf_counter() - started) * 1000)
+        return groups
+
+    def groups_for_subject(self, subject: str, size: int = 4, min_hours: int = 1,
+                           limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Split a subject's weak students into groups, up to limit groups
+        Students with the fewest free hours are placed first, since they
+        have the fewest possible partners
+        """
+        started = time.perf_counter()
+        self.refresh()
+        name = normalize_subject(subject)
+        with self._lock:
+            student_ids, matrix = self._subject_matrix(name)
+            hours = POPCOUNT[matrix].sum(axis=1, dtype=np.int32)
+            open_seats = hours >= min_hours
+            groups = []
+            while len(groups) < limit and open_seats.any():
+                seed = int(np.argmin(np.where(open_seats, hours, np.iinfo(np.int32).max)))
+                open_seats[seed] = False
+                members, common = self._grow(matrix, matrix[seed], seed, size, min_hours, open_seats)
+                if members:
+                    open_seats[members] = False
+                    groups.append(self._group(name, [student_ids[index] for index in [seed] + members], common))
+        metrics.observe('groups.match_ms', (time.perf_counter() - started) * 1000)
+        return groups
+
+    def _grow(self, matrix: np.ndarray, bits: np.ndarray, seed: Optional[int], size: int, min_hours: int,
+              candidates: np.ndarray = None) -> Tuple[List[int], np.ndarray]:
+        """Greedily add up to size - 1 members keeping at least min_hours in common"""
+        available = np.ones(len(matrix), dtype=bool) if candidates is None else candidates.copy()
+        if seed is not None:
+            available[seed] = False
+        common = bits.copy()
+        members = []
+        while len(members) < size - 1 and available.any():
+            overlap = POPCOUNT[matrix & common].sum(axis=1, dtype=np.int32)
+            overlap[~available] = -1
+            best = int(np.argmax(overlap))
+            if overlap[best] < max(1, min_hours):
+                break
+            members.append(best)
+            available[best] = False
+            common &= matrix[best]
+        return members, common
+
+    def _subject_matrix(self, subject: str) -> Tuple[List[str], np.ndarray]:
+        """Student IDs weak in a subject and their stacked availability bits (built once per change)"""
+        if subject not in self._matrices:
+            student_ids = sorted(self._postings.get(subject, ()))
+            matrix = np.stack([self._entries[student_id][1] for student_id in student_ids]) if student_ids \
+                else np.zeros((0, WEEK_BYTES), dtype=np.uint8)
+            self._matrices[subject] = (student_ids, matrix)
+        return self._matrices[subject]
+
+    def _remove(self, student_id: str):
+        entry = self._entries.pop(student_id, None)
+        if entry:
+            for subject in entry[2]:
+                self._postings.get(subject, set()).discard(student_id)
+                self._matrices.pop(subject, None)
+
+    @staticmethod
+    def _group(subject: str, members: List[str], common: np.ndarray) -> Dict[str, Any]:
+        return {
+            'subject': subject,
+            'members': members,
+            'common_hours': free_hours(common),
+            'slots': slot_labels(common)
+        }
+
+    def _on_mcq_scored(self, events: List[Dict[str, Any]]):
+        """Event handler: keep each student's weak subjects in step with their MCQ scores"""
+        scores = {}
+        for event in events:
+            payload = event['payload']
+            timestamp = payload.get('timestamp') or datetime.fromtimestamp(event['published_at']).isoformat()
+            scores.setdefault(payload['student_id'], []).append(
+                (payload['subject'], payload.get('percentage', 0), timestamp))
+        for student_id, student_scores in scores.items():
+            try:
+                self.store.record_scores(student_id, student_scores)
+            except Exception as e:
+                logger.error(f"❌ Error updating weak subjects for {student_id}: {e}")
+
+# Global study group matcher
+group_matcher = GroupMatcher.from_env()
+event_bus.subscribe('mcq.scored', group_matcher._on_mcq_scored)
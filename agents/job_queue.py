@@ -0,0 +1,251 @@
+import fcntl
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Callable, Optional
+from memory.memory_bank import memory_bank
+from utils.metrics import metrics
+from utils.tracing import tracer
+from utils.logger import logger
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+class QueueFullError(RuntimeError):
+    """Too many jobs are already waiting"""
+
+class JobQueue:
+    """
+    Background jobs on a bounded worker pool
+    Every state change is written to the memory bank ('jobs' collection),
+    so status survives a restart. A queued or running job is leased by the
+    worker that holds it, and a heartbeat renews the lease; recover() only
+    takes over jobs whose owner stopped renewing, so workers sharing the
+    storage never run a job twice. Finished jobs expire after ttl_s.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 100, ttl_s: float = 86400.0,
+                 sweep_interval_s: float = 60.0, storage=memory_bank, collection: str = 'jobs',
+                 lease_s: float = 60.0):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.ttl_s = ttl_s
+        self.sweep_interval_s = sweep_interval_s
+        self.storage = storage
+        self.collection = collection
+        self.lease_s = lease_s
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers = {}
+        self._pending = 0
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        # Jobs this worker holds (queued or running), renewed by the heartbeat
+        self._owned = {}
+        self._owned_lock = threading.Lock()
+        self._heartbeat = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job-worker')
+
+    @classmethod
+    def from_env(cls) -> 'JobQueue':
+        return cls(
+            max_workers=int(os.getenv('JOB_WORKERS', '4')),
+            max_pending=int(os.getenv('JOB_MAX_PENDING', '100')),
+            ttl_s=float(os.getenv('JOB_TTL_S', '86400')),
+            lease_s=float(os.getenv('JOB_LEASE_S', '60'))
+        )
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any]], Any]):
+        """Set the function that runs jobs of a kind; it gets the job payload"""
+        self._handlers[kind] = handler
+
+    def submit(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a job and return its record straight away"""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+
+        self.expire_stale()
+        now = time.time()
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'kind': kind,
+            'status': QUEUED,
+            'payload': payload,
+            'result': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+            'started_at': None,
+            'finished_at': None
+        }
+        # The worker updates its own copy; the caller keeps the queued record
+        self._enqueue(dict(job))
+        metrics.increment('jobs.submitted')
+        logger.info(f"📝 Job {job['job_id']} queued ({kind})")
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current record of a job (None if unknown or expired)"""
+        self.expire_stale()
+        job = self.storage.load_document(self.collection, job_id)
+        if not job or self._is_expired(job, time.time()):
+            return None
+        return job
+
+    def recover(self) -> int:
+        """
+        Re-queue unfinished jobs whose owner stopped renewing its lease (e.g. it crashed)
+        Call once at startup, after the handlers are registered. Jobs held by
+        a live worker are left alone; workers recover one at a time, so a
+        job is taken over by only one of them.
+        """
+        recovered = 0
+        lock_path = os.path.join(self.storage.storage_path, f"{self.collection}.lock")
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                for job_id in self.storage.list_documents(self.collection):
+                    job = self.storage.load_document(self.collection, job_id)
+                    if not job or job.get('status') in FINISHED_STATES or job.get('kind') not in self._handlers:
+                        continue
+                    now = time.time()
+                    if self._is_expired(job, now) or job.get('lease_expires_at', 0) > now:
+                        continue
+                    job['status'] = QUEUED
+                    job['recovered'] = True
+                    try:
+                        self._enqueue(job)
+                        recovered += 1
+                    except QueueFullError:
+                        break
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        if recovered:
+            metrics.increment('jobs.recovered', recovered)
+            logger.info(f"✅ Re-queued {recovered} unfinished jobs")
+        return recovered
+
+    def expire_stale(self, force: bool = False) -> int:
+        """Delete expired job records (at most once per sweep interval unless forced)"""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_sweep < self.sweep_interval_s:
+                return 0
+            self._last_sweep = now
+
+        expired = 0
+        for job_id in self.storage.list_documents(self.collection):
+            job = self.storage.load_document(self.collection, job_id)
+            if job and self._is_expired(job, now) and self.storage.delete_document(self.collection, job_id):
+                expired += 1
+
+        if expired:
+            metrics.increment('jobs.expired', expired)
+            logger.info(f"🧹 Expired {expired} old jobs")
+        return expired
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def _enqueue(self, job: Dict[str, Any]):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                metrics.increment('jobs.rejected')
+                raise QueueFullError(f"Job queue is full ({self.max_pending} waiting)")
+            self._pending += 1
+            metrics.set_gauge('jobs.queue_depth', self._pending)
+
+        job['worker_id'] = self.worker_id
+        with self._owned_lock:
+            self._owned[job['job_id']] = job
+            self._save(job)
+        self._start_heartbeat()
+        self._executor.submit(self._run, job)
+
+    def _run(self, job: Dict[str, Any]):
+        with self._lock:
+            self._pending -= 1
+            metrics.set_gauge('jobs.queue_depth', self._pending)
+
+        with self._owned_lock:
+            stored = self.storage.load_document(self.collection, job['job_id'])
+            if stored.get('worker_id') != self.worker_id:
+                # Our lease ran out while the job waited and another worker took it over
+                self._owned.pop(job['job_id'], None)
+                metrics.increment('jobs.lease_lost')
+                logger.warning(f"⚠️  Job {job['job_id']} was taken over by {stored.get('worker_id')}; not running it")
+                return
+            job['status'] = RUNNING
+            job['started_at'] = time.time()
+            self._save(job)
+        metrics.observe('jobs.wait_ms', (job['started_at'] - job['created_at']) * 1000)
+
+        outcome = {}
+        try:
+            with tracer.span(f"job.{job['kind']}", job_id=job['job_id']):
+                outcome['result'] = self._handlers[job['kind']](job['payload'])
+            outcome['status'] = SUCCEEDED
+            metrics.increment('jobs.succeeded')
+        except Exception as e:
+            outcome['error'] = str(e)
+            outcome['status'] = FAILED
+            metrics.increment('jobs.failed')
+            logger.error(f"❌ Job {job['job_id']} failed: {e}")
+
+        with self._owned_lock:
+            # All at once, so the heartbeat never saves a finished job without its finished_at
+            outcome['finished_at'] = time.time()
+            job.update(outcome)
+            self._owned.pop(job['job_id'], None)
+            self._save(job)
+        metrics.observe('jobs.duration_ms', (job['finished_at'] - job['started_at']) * 1000)
+        logger.info(f"✅ Job {job['job_id']} {job['status']}")
+
+    def _save(self, job: Dict[str, Any]):
+        now = time.time()
+        job['updated_at'] = now
+        if job['status'] not in FINISHED_STATES:
+            job['lease_expires_at'] = now + self.lease_s
+        self.storage.save_document(self.collection, job['job_id'], job)
+
+    def _start_heartbeat(self):
+        with self._owned_lock:
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._renew_leases, name='job-heartbeat', daemon=True)
+                self._heartbeat.start()
+
+    def _renew_leases(self):
+        """Heartbeat: renew the lease (and updated_at) of every job this worker holds"""
+        while True:
+            time.sleep(self.lease_s / 3)
+            with self._owned_lock:
+                for job in list(self._owned.values()):
+                    try:
+                        self._save(job)
+                    except Exception as e:
+                        logger.error(f"❌ Error renewing lease of job {job['job_id']}: {e}")
+
+    def _is_expired(self, job: Dict[str, Any], now: float) -> bool:
+        # Finished jobs expire after the TTL; unfinished ones only once nobody has renewed them for that long
+        if job.get('status') in FINISHED_STATES:
+            return now - (job.get('finished_at') or now) > self.ttl_s
+        return job.get('lease_expires_at', 0) < now and now - job.get('updated_at', now) > self.ttl_s
+
+def job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job record (no payload, readable timestamps)"""
+    view = {key: value for key, value in job.items() if key != 'payload'}
+    for key in ('created_at', 'updated_at', 'started_at', 'finished_at', 'lease_expires_at'):
+        if view.get(key):
+            view[key] = datetime.fromtimestamp(view[key]).isoformat()
+    return view
+
+# Global job queue
+job_queue = JobQueue.from_env()
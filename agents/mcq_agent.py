@@ -1,7 +1,17 @@
 import json
 import random
-from typing import Dict, List, Any
+import threading
+import time
+from typing import Dict, List, Any, Iterable, Iterator
 from config.gcp_config import gcp_config
+from llm.client import model_registry
+from llm.resilience import get_resilient_model, ModelUnavailableError
+from agents.schemas import validate_mcqs
+from memory.mcq_history import mcq_history, fingerprint_question
+from utils.json_repair import parse_json_with_repair
+from utils.json_stream import IncrementalJSONArrayParser
+from utils.metrics import metrics
+from utils.tracing import traced, tracer
 from utils.logger import logger
 
 class MCQCreatorAgent:
@@ -11,28 +21,165 @@ class MCQCreatorAgent:
     """
     
     def __init__(self):
-        self.model = gcp_config.get_model()
+        # The model is created lazily by the shared registry on first use
+        self.agent_name = 'mcq_agent'
+        
+        # Model calls go through deadlines, a circuit breaker and optional hedging
+        self.llm = get_resilient_model(self.agent_name)
+        
+        # Recently generated questions, served when the model is unavailable
+        self._question_pool = {}
+        self._pool_lock = threading.Lock()
+        self.max_pool_size = 50
         logger.info("✅ MCQ Creator Agent started!")
     
-    def generate_mcqs(self, topic: str, difficulty: str = 'beginner', num_questions: int = 5) -> List[Dict[str, Any]]:
+    @property
+    def model(self):
+        """Shared Gemini model for this agent"""
+        return model_registry.get_model(self.agent_name)
+    
+    @model.setter
+    def model(self, model):
+        model_registry.set_model(self.agent_name, model)
+    
+    @traced('mcq_agent.generate_mcqs')
+    def generate_mcqs(self, topic: str, difficulty: str = 'beginner', num_questions: int = 5, student_id: str = None) -> List[Dict[str, Any]]:
         """
         Generate multiple-choice questions for a given topic
+        With a student_id, questions the student has already seen are skipped
+        and unseen pooled questions are served without calling the model
         """
+        tracer.set_attributes(topic=topic, difficulty=difficulty, num_questions=num_questions, student_id=student_id)
+        if student_id:
+            pooled = self._get_unseen_pooled_mcqs(student_id, topic, difficulty, num_questions)
+            if pooled:
+                mcq_history.mark_served(student_id, topic, pooled)
+                return pooled
+        
+        mcqs = self._generate_new_mcqs(topic, difficulty, num_questions)
+        
+        if student_id:
+            mcqs = self._drop_seen_mcqs(student_id, topic, difficulty, mcqs, num_questions)
+            mcq_history.mark_served(student_id, topic, mcqs)
+        return mcqs
+    
+    def _generate_new_mcqs(self, topic: str, difficulty: str, num_questions: int) -> List[Dict[str, Any]]:
+        """Ask the model for new questions"""
         try:
             logger.info(f"🎯 Generating {num_questions} {difficulty} MCQs for: {topic}")
             
             prompt = self._create_mcq_prompt(topic, difficulty, num_questions)
-            response = self.model.generate_content(prompt)
+            response_text = self._generate_json(prompt)
             
-            mcqs = self._parse_mcq_response(response.text, num_questions)
+            mcqs = self._parse_mcq_response(response_text, num_questions, topic, difficulty)
             
             logger.info(f"✅ Generated {len(mcqs)} MCQs for {topic}")
             return mcqs
             
+        except ModelUnavailableError as e:
+            logger.warning(f"⚠️  Model unavailable for MCQs ({e}), serving pooled questions")
+            return self._get_pooled_or_sample_mcqs(topic, difficulty, num_questions)
+            
         except Exception as e:
             logger.error(f"❌ Error generating MCQs: {e}")
+            metrics.increment('mcq.fallbacks')
             return self._get_sample_mcqs(topic, num_questions)
     
+    def _generate_json(self, prompt: str) -> str:
+        """Call the model, using JSON mode when the SDK supports it"""
+        json_config = gcp_config.json_generation_config()
+        if json_config:
+            response = self.llm.generate_content(prompt, generation_config=json_config)
+        else:
+            response = self.llm.generate_content(prompt)
+        return response.text
+    
+    def stream_mcqs(self, topic: str, difficulty: str = 'beginner', num_questions: int = 5, student_id: str = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream multiple-choice questions one by one as the model writes them
+        The first question can be shown long before the full response is done
+        """
+        if student_id:
+            pooled = self._get_unseen_pooled_mcqs(student_id, topic, difficulty, num_questions)
+            if pooled:
+                mcq_history.mark_served(student_id, topic, pooled)
+                yield from pooled
+                return
+        
+        served = []
+        try:
+            for mcq in self._stream_new_mcqs(topic, difficulty, num_questions, student_id):
+                served.append(mcq)
+                yield mcq
+        finally:
+            if student_id:
+                mcq_history.mark_served(student_id, topic, served)
+    
+    def _stream_new_mcqs(self, topic: str, difficulty: str, num_questions: int, student_id: str = None) -> Iterator[Dict[str, Any]]:
+        """Stream new questions from the model, skipping ones the student has seen"""
+        start_time = time.perf_counter()
+        yielded = 0
+        
+        try:
+            logger.info(f"🎯 Streaming {num_questions} {difficulty} MCQs for: {topic}")
+            
+            prompt = self._create_mcq_prompt(topic, difficulty, num_questions)
+            json_config = gcp_config.json_generation_config()
+            if json_config:
+                response = self.llm.generate_content(prompt, stream=True, generation_config=json_config)
+            else:
+                response = self.llm.generate_content(prompt, stream=True)
+            parser = IncrementalJSONArrayParser()
+            
+            for chunk in response:
+                for item in parser.feed(self._chunk_text(chunk)):
+                    valid, invalid = validate_mcqs([item])
+                    if invalid:
+                        metrics.increment('mcq.invalid_items')
+                        continue
+                    mcq = valid[0]
+                    
+                    if student_id:
+                        seen = mcq_history.has_seen(student_id, topic, mcq)
+                        self._record_duplicates(1, int(seen))
+                        if seen:
+                            continue
+                    
+                    if yielded == 0:
+                        first_ms = (time.perf_counter() - start_time) * 1000
+                        metrics.observe('mcq.time_to_first_question_ms', first_ms)
+                        logger.info(f"⚡ First MCQ for {topic} ready in {first_ms:.0f}ms")
+                    
+                    yielded += 1
+                    self._remember_mcqs(topic, difficulty, [mcq])
+                    yield mcq
+                    
+                    if yielded >= num_questions:
+                        break
+                
+                if yielded >= num_questions or parser.finished:
+                    break
+            
+            if yielded:
+                metrics.observe('mcq.stream_total_ms', (time.perf_counter() - start_time) * 1000)
+                logger.info(f"✅ Streamed {yielded} MCQs for {topic}")
+                
+        except Exception as e:
+            logger.error(f"❌ Error streaming MCQs: {e}")
+        
+        if yielded == 0:
+            # Nothing usable came back, fall back to pooled or sample questions
+            metrics.increment('mcq.stream_fallbacks')
+            for mcq in self._get_pooled_or_sample_mcqs(topic, difficulty, num_questions):
+                yield mcq
+    
+    def _chunk_text(self, chunk: Any) -> str:
+        """Get the text of a streamed chunk (blocked chunks have no text)"""
+        try:
+            return chunk.text
+        except (ValueError, AttributeError):
+            return ''
+    
     def _create_mcq_prompt(self, topic: str, difficulty: str, num_questions: int) -> str:
         """Create prompt for MCQ generation"""
         
@@ -65,29 +212,146 @@ class MCQCreatorAgent:
         
         return prompt
     
-    def _parse_mcq_response(self, ai_text: str, expected_count: int) -> List[Dict[str, Any]]:
-        """Parse AI response into MCQ list"""
+    def _parse_mcq_response(self, ai_text: str, expected_count: int, topic: str = 'general', difficulty: str = 'beginner') -> List[Dict[str, Any]]:
+        """
+        Parse AI response into a validated MCQ list
+        Broken JSON is repaired locally; only invalid questions are sent back to the model
+        """
+        items, repairs = parse_json_with_repair(ai_text, '[', metric_prefix='structured_output.mcq')
+        if repairs:
+            logger.info(f"🔧 Repaired MCQ JSON locally: {', '.join(repairs)}")
+        
+        if items is None:
+            # Nothing usable at all, so every field is invalid: ask once more
+            logger.warning("⚠️  No valid JSON array in AI response, asking the model again")
+            metrics.increment('mcq.reprompts')
+            prompt = self._create_mcq_prompt(topic, difficulty, expected_count)
+            items, _ = parse_json_with_repair(self._generate_json(prompt), '[', metric_prefix='structured_output.mcq')
+            
+            if items is None:
+                logger.warning("⚠️  Model returned unusable MCQs twice, using sample questions")
+                metrics.increment('mcq.fallbacks')
+                return self._get_sample_mcqs(topic, expected_count)
+        
+        mcqs, invalid = validate_mcqs(items)
+        if invalid:
+            metrics.increment('mcq.invalid_items', len(invalid))
+            logger.warning(f"⚠️  {len(invalid)} generated MCQs failed validation")
+        
+        if invalid and len(mcqs) < expected_count:
+            # Re-prompt for the broken questions only
+            broken = [(items[index], errors) for index, errors in invalid.items()]
+            mcqs.extend(self._fix_invalid_mcqs(topic, difficulty, broken))
+        
+        if not mcqs:
+            logger.warning("⚠️  No generated MCQ passed validation, using sample questions")
+            metrics.increment('mcq.fallbacks')
+            return self._get_sample_mcqs(topic, expected_count)
+        
+        # Ensure we have at most the expected number
+        self._remember_mcqs(topic, difficulty, mcqs)
+        return mcqs[:expected_count]
+    
+    def _fix_invalid_mcqs(self, topic: str, difficulty: str, broken: List[Any]) -> List[Dict[str, Any]]:
+        """Ask the model to correct only the questions that failed validation"""
         try:
-            # Extract JSON from response
-            start_idx = ai_text.find('[')
-            end_idx = ai_text.rfind(']') + 1
+            metrics.increment('mcq.reprompts')
+            prompt = self._create_fix_prompt(topic, difficulty, broken)
+            items, _ = parse_json_with_repair(self._generate_json(prompt), '[', metric_prefix='structured_output.mcq')
+            fixed, still_invalid = validate_mcqs(items or [])
             
-            if start_idx != -1 and end_idx != 0:
-                json_str = ai_text[start_idx:end_idx]
-                mcqs = json.loads(json_str)
-                
-                # Ensure we have the expected number
-                if len(mcqs) >= expected_count:
-                    return mcqs[:expected_count]
-                else:
-                    return mcqs
-            else:
-                logger.warning("⚠️  No JSON array found in AI response")
-                return self._get_sample_mcqs("general", expected_count)
-                
-        except json.JSONDecodeError as e:
-            logger.error(f"❌ Error parsing MCQ JSON: {e}")
-            return self._get_sample_mcqs("general", expected_count)
+            if still_invalid:
+                metrics.increment('mcq.invalid_items', len(still_invalid))
+            logger.info(f"🔧 Fixed {len(fixed)} of {len(broken)} invalid MCQs")
+            return fixed
+            
+        except Exception as e:
+            logger.error(f"❌ Error fixing invalid MCQs: {e}")
+            return []
+    
+    def _create_fix_prompt(self, topic: str, difficulty: str, broken: List[Any]) -> str:
+        """Create prompt asking the model to correct specific invalid questions"""
+        problems = "\n".join(
+            f"- {json.dumps(item)}\n  Problems: {'; '.join(errors)}"
+            for item, errors in broken
+        )
+        
+        prompt = f"""
+        These multiple-choice questions about {topic} ({difficulty} level) are invalid:
+        {problems}
+        
+        Return a JSON array with one corrected question for each of them.
+        Every question needs "question", "options" (exactly the keys a, b, c, d),
+        "correct_answer" (one of a, b, c, d) and "explanation".
+        Return only the JSON array.
+        """
+        
+        return prompt
+    
+    def _get_unseen_pooled_mcqs(self, student_id: str, topic: str, difficulty: str, count: int) -> List[Dict[str, Any]]:
+        """Pooled questions the student hasn't seen, if there are enough for a full quiz"""
+        key = (topic.strip().lower(), difficulty)
+        with self._pool_lock:
+            pool = list(self._question_pool.get(key, []))
+        
+        unseen = mcq_history.filter_unseen(student_id, topic, pool)
+        if len(unseen) < count:
+            return []
+        
+        metrics.increment('mcq.calls_avoided')
+        logger.info(f"♻️  Serving {count} unseen pooled MCQs for {topic} to {student_id}")
+        return unseen[:count]
+    
+    def _drop_seen_mcqs(self, student_id: str, topic: str, difficulty: str, mcqs: List[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+        """Remove questions the student has already seen, topping up from the pool"""
+        unseen = mcq_history.filter_unseen(student_id, topic, mcqs)
+        
+        duplicates = len(mcqs) - len(unseen)
+        self._record_duplicates(len(mcqs), duplicates)
+        if duplicates:
+            logger.info(f"♻️  Skipped {duplicates} MCQs {student_id} has already seen")
+        
+        if len(unseen) < count:
+            key = (topic.strip().lower(), difficulty)
+            with self._pool_lock:
+                pool = list(self._question_pool.get(key, []))
+            chosen = {fingerprint_question(mcq) for mcq in unseen}
+            extra = [mcq for mcq in mcq_history.filter_unseen(student_id, topic, pool)
+                     if fingerprint_question(mcq) not in chosen]
+            unseen.extend(extra[:count - len(unseen)])
+        
+        # A repeated question is still better than an empty quiz
+        return unseen[:count] if unseen else mcqs
+    
+    def _record_duplicates(self, generated: int, duplicates: int):
+        """Track how many generated questions were repeats for the student"""
+        metrics.increment('mcq.questions_generated', generated)
+        metrics.increment('mcq.duplicates', duplicates)
+        total = metrics.get_counter('mcq.questions_generated')
+        if total:
+            metrics.set_gauge('mcq.duplicate_rate', metrics.get_counter('mcq.duplicates') / total)
+    
+    def _remember_mcqs(self, topic: str, difficulty: str, mcqs: List[Dict[str, Any]]):
+        """Keep valid generated questions so they can be served if the model goes down"""
+        key = (topic.strip().lower(), difficulty)
+        with self._pool_lock:
+            pool = self._question_pool.setdefault(key, [])
+            known = {mcq['question'] for mcq in pool}
+            pool.extend(mcq for mcq in mcqs if mcq['question'] not in known)
+            del pool[:-self.max_pool_size]
+    
+    def _get_pooled_or_sample_mcqs(self, topic: str, difficulty: str, count: int) -> List[Dict[str, Any]]:
+        """Serve previously generated questions, or samples if there are none"""
+        key = (topic.strip().lower(), difficulty)
+        with self._pool_lock:
+            pool = list(self._question_pool.get(key, []))
+        
+        if pool:
+            metrics.increment('mcq.served_from_pool')
+            return random.sample(pool, min(count, len(pool)))
+        
+        metrics.increment('mcq.fallbacks')
+        return self._get_sample_mcqs(topic, count)
     
     def _get_sample_mcqs(self, topic: str, count: int) -> List[Dict[str, Any]]:
         """Return sample MCQs if AI fails"""
@@ -118,15 +382,15 @@ class MCQCreatorAgent:
         
         return sample_mcqs[:count]
     
-    def conduct_quiz(self, mcqs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def conduct_quiz(self, mcqs: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Conduct an interactive quiz with the generated questions
+        Accepts a list or a stream from stream_mcqs()
         """
         try:
             logger.info("🎯 Starting quiz session...")
             
             score = 0
-            total_questions = len(mcqs)
             results = []
             
             print(f"\n{'='*50}")
@@ -161,7 +425,8 @@ class MCQCreatorAgent:
                 })
             
             # Calculate percentage
-            percentage = (score / total_questions) * 100
+            total_questions = len(results)
+            percentage = (score / total_questions) * 100 if total_questions else 0.0
             
             print(f"\n{'='*50}")
             print(f"📊 QUIZ RESULTS")
@@ -2,6 +2,9 @@ import json
 from typing import Dict, List, Any
 from datetime import datetime, timedelta
 from memory.memory_bank import memory_bank
+from utils.event_bus import event_bus
+from utils.metrics import metrics
+from utils.tracing import traced, tracer
 from utils.logger import logger
 
 class ProgressTrackerAgent:
@@ -11,69 +14,79 @@ class ProgressTrackerAgent:
     """
     
     def __init__(self):
+        # Derived data is updated from events, so recording a session is a single write
+        event_bus.subscribe('study_session.recorded', self._on_sessions_recorded)
+        event_bus.subscribe('mcq.scored', self._on_mcq_scored)
+        event_bus.subscribe('study_session.recorded', self._update_summary)
+        event_bus.subscribe('mcq.scored', self._update_summary)
         logger.info("✅ Progress Tracker Agent started!")
     
+    @traced('progress_tracker.record_study_session')
     def record_study_session(self, student_id: str, session_data: Dict[str, Any]):
         """
         Record a study session in long-term memory
-        This helps us track progress over time
+        This helps us track progress over time. A session whose
+        'idempotency_key' was already recorded is not added again.
+        Learning patterns and the progress summary follow from the
+        published event.
         """
+        tracer.set_attributes(student_id=student_id)
         try:
-            # Load existing progress
-            progress_data = self._load_progress_data(student_id)
-            
-            # Add new session
-            session_record = {
-                'session_id': f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-                'timestamp': datetime.now().isoformat(),
-                'subjects_studied': session_data.get('subjects', []),
-                'topics_covered': session_data.get('topics', []),
-                'duration_minutes': session_data.get('duration', 0),
-                'mcq_score': session_data.get('mcq_score', None),
-                'self_rating': session_data.get('self_rating', None),
-                'notes': session_data.get('notes', '')
-            }
-            
-            # Add to sessions list
-            if 'study_sessions' not in progress_data:
-                progress_data['study_sessions'] = []
-            
-            progress_data['study_sessions'].append(session_record)
-            
-            # Update learning patterns in memory bank
-            self._update_learning_patterns(student_id, progress_data)
-            
-            # Save updated progress
-            self._save_progress_data(student_id, progress_data)
-            
-            logger.info(f"✅ Study session recorded for {student_id}")
-            return True
+            with memory_bank.student_lock(student_id):
+                return self._append_session(student_id, session_data)
             
         except Exception as e:
             logger.error(f"❌ Error recording study session: {e}")
             return False
     
+    def _append_session(self, student_id: str, session_data: Dict[str, Any]) -> bool:
+        """Add one session to the stored progress (caller holds the student's lock)"""
+        # Load existing progress
+        progress_data = self._load_progress_data(student_id)
+        
+        idempotency_key = session_data.get('idempotency_key')
+        if idempotency_key and any(session.get('idempotency_key') == idempotency_key
+                                   for session in progress_data.get('study_sessions', [])):
+            metrics.increment('progress.duplicate_sessions_suppressed')
+            logger.info(f"♻️ Session {idempotency_key} already recorded for {student_id}")
+            return True
+        
+        # Add new session
+        session_record = {
+            'session_id': f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            'timestamp': datetime.now().isoformat(),
+            'subjects_studied': session_data.get('subjects', []),
+            'topics_covered': session_data.get('topics', []),
+            'duration_minutes': session_data.get('duration', 0),
+            'mcq_score': session_data.get('mcq_score', None),
+            'self_rating': session_data.get('self_rating', None),
+            'notes': session_data.get('notes', '')
+        }
+        if idempotency_key:
+            session_record['idempotency_key'] = idempotency_key
+        
+        # Add to sessions list
+        if 'study_sessions' not in progress_data:
+            progress_data['study_sessions'] = []
+        
+        progress_data['study_sessions'].append(session_record)
+        
+        # Save updated progress
+        self._save_progress_data(student_id, progress_data)
+        event_bus.publish('study_session.recorded', dict(session_record, student_id=student_id))
+        
+        logger.info(f"✅ Study session recorded for {student_id}")
+        return True
+    
+    @traced('progress_tracker.get_student_progress')
     def get_student_progress(self, student_id: str) -> Dict[str, Any]:
         """
         Get comprehensive progress report for a student
         """
+        tracer.set_attributes(student_id=student_id)
         try:
             progress_data = self._load_progress_data(student_id)
-            
-            # Calculate progress metrics
-            metrics = self._calculate_progress_metrics(progress_data)
-            
-            # Generate insights
-            insights = self._generate_progress_insights(progress_data, metrics)
-            
-            progress_report = {
-                'student_id': student_id,
-                'generated_at': datetime.now().isoformat(),
-                'metrics': metrics,
-                'insights': insights,
-                'recent_sessions': progress_data.get('study_sessions', [])[-5:],  # Last 5 sessions
-                'learning_patterns': progress_data.get('learning_patterns', {})
-            }
+            progress_report = self.build_progress_report(student_id, progress_data)
             
             logger.info(f"✅ Progress report generated for {student_id}")
             return progress_report
@@ -82,32 +95,50 @@ class ProgressTrackerAgent:
             logger.error(f"❌ Error getting student progress: {e}")
             return {}
     
+    def build_progress_report(self, student_id: str, progress_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Progress report from already loaded progress data (no storage access)"""
+        # Calculate progress metrics
+        metrics = self._calculate_progress_metrics(progress_data)
+        
+        # Generate insights
+        insights = self._generate_progress_insights(progress_data, metrics)
+        
+        return {
+            'student_id': student_id,
+            'generated_at': datetime.now().isoformat(),
+            'metrics': metrics,
+            'insights': insights,
+            'recent_sessions': progress_data.get('study_sessions', [])[-5:],  # Last 5 sessions
+            'learning_patterns': progress_data.get('learning_patterns', {}),
+            'summary': progress_data.get('summary', {})
+        }
+    
     def update_mcq_performance(self, student_id: str, subject: str, score: float, total_questions: int):
         """
         Update MCQ performance in long-term memory
+        Learning patterns are updated from the published event, off the request path
         """
         try:
-            # Update in memory bank
-            memory_bank.update_learning_pattern(student_id, subject, score)
-            
-            # Also update in progress data
-            progress_data = self._load_progress_data(student_id)
-            
-            if 'mcq_performance' not in progress_data:
-                progress_data['mcq_performance'] = {}
-            
-            if subject not in progress_data['mcq_performance']:
-                progress_data['mcq_performance'][subject] = []
-            
-            performance_record = {
-                'timestamp': datetime.now().isoformat(),
-                'score': score,
-                'total_questions': total_questions,
-                'percentage': (score / total_questions) * 100
-            }
-            
-            progress_data['mcq_performance'][subject].append(performance_record)
-            self._save_progress_data(student_id, progress_data)
+            with memory_bank.student_lock(student_id):
+                progress_data = self._load_progress_data(student_id)
+                
+                if 'mcq_performance' not in progress_data:
+                    progress_data['mcq_performance'] = {}
+                
+                if subject not in progress_data['mcq_performance']:
+                    progress_data['mcq_performance'][subject] = []
+                
+                performance_record = {
+                    'timestamp': datetime.now().isoformat(),
+                    'score': score,
+                    'total_questions': total_questions,
+                    'percentage': (score / total_questions) * 100
+                }
+                
+                progress_data['mcq_performance'][subject].append(performance_record)
+                self._save_progress_data(student_id, progress_data)
+                # Published under the lock so each student's events are queued in timestamp order
+                event_bus.publish('mcq.scored', dict(performance_record, student_id=student_id, subject=subject))
             
             logger.info(f"✅ MCQ performance updated for {student_id} in {subject}: {score}/{total_questions}")
             return True
@@ -154,7 +185,7 @@ class ProgressTrackerAgent:
         subjects = set()
         for session in sessions:
             subjects.update(session.get('subjects_studied', []))
-        return list(subjects)
+        return sorted(subjects)
     
     def _calculate_mcq_trends(self, mcq_performance: Dict[str, List]) -> Dict[str, Any]:
         """Calculate MCQ performance trends"""
@@ -238,9 +269,79 @@ class ProgressTrackerAgent:
             
             if avg_mcq_score > 0:
                 # Update learning pattern for each subject studied
-                for session in recent_sessions:
-                    for subject in session.get('subjects_studied', []):
-                        memory_bank.update_learning_pattern(student_id, subject, avg_mcq_score)
+                updates = [(subject, avg_mcq_score) for session in recent_sessions
+                           for subject in session.get('subjects_studied', [])]
+                if updates:
+                    memory_bank.update_learning_patterns(student_id, updates)
+    
+    def _on_sessions_recorded(self, events: List[Dict[str, Any]]):
+        """Event handler: learning patterns from the latest sessions, once per student in the batch"""
+        for student_id in dict.fromkeys(event['payload']['student_id'] for event in events):
+            with memory_bank.student_lock(student_id):
+                self._update_learning_patterns(student_id, self._load_progress_data(student_id))
+    
+    def _on_mcq_scored(self, events: List[Dict[str, Any]]):
+        """Event handler: one learning-pattern write per student for all their scores in the batch"""
+        updates = {}
+        for event in events:
+            payload = event['payload']
+            updates.setdefault(payload['student_id'], []).append((payload['subject'], payload['score']))
+        for student_id, student_updates in updates.items():
+            memory_bank.update_learning_patterns(student_id, student_updates)
+    
+    def _update_summary(self, events: List[Dict[str, Any]]):
+        """
+        Event handler: running totals per student (sessions, minutes per
+        subject, latest MCQ percentage) and the subjects below 60%
+        """
+        by_student = {}
+        for event in events:
+            by_student.setdefault(event['payload']['student_id'], []).append(event)
+        
+        for student_id, student_events in by_student.items():
+            with memory_bank.student_lock(student_id):
+                progress_data = self._load_progress_data(student_id)
+                if 'summary' not in progress_data:
+                    # First summary for this student: count everything stored so far
+                    progress_data['summary'] = self._build_summary(progress_data)
+                for event in student_events:
+                    self._add_to_summary(progress_data['summary'], event['topic'], event['payload'])
+                self._save_progress_data(student_id, progress_data)
+    
+    def _build_summary(self, progress_data: Dict[str, Any]) -> Dict[str, Any]:
+        summary = {
+            'sessions': 0, 'study_minutes': 0, 'minutes_by_subject': {},
+            'latest_mcq_percentage': {}, 'weak_areas': [], 'last_activity': None,
+            'counted_through': {}
+        }
+        for session in progress_data.get('study_sessions', []):
+            self._add_to_summary(summary, 'study_session.recorded', session)
+        
+        scores = [dict(record, subject=subject) for subject, records in progress_data.get('mcq_performance', {}).items()
+                  for record in records]
+        for record in sorted(scores, key=lambda record: record.get('timestamp', '')):
+            self._add_to_summary(summary, 'mcq.scored', record)
+        return summary
+    
+    def _add_to_summary(self, summary: Dict[str, Any], topic: str, record: Dict[str, Any]):
+        # Records of a topic arrive in timestamp order, so anything at or before
+        # the watermark is already counted (e.g. by _build_summary)
+        timestamp = record.get('timestamp', '')
+        if timestamp <= summary['counted_through'].get(topic, ''):
+            return
+        summary['counted_through'][topic] = timestamp
+        
+        if topic == 'study_session.recorded':
+            duration = record.get('duration_minutes', 0) or 0
+            summary['sessions'] += 1
+            summary['study_minutes'] += duration
+            for subject in record.get('subjects_studied', []):
+                summary['minutes_by_subject'][subject] = summary['minutes_by_subject'].get(subject, 0) + duration
+        else:
+            summary['latest_mcq_percentage'][record['subject']] = record['percentage']
+            summary['weak_areas'] = sorted(subject for subject, percentage
+                                           in summary['latest_mcq_percentage'].items() if percentage < 60)
+        summary['last_activity'] = max(summary['last_activity'] or '', timestamp)
     
     def _calculate_recent_mcq_average(self, recent_sessions: List[Dict]) -> float:
         """Calculate average MCQ score from recent sessions"""
@@ -0,0 +1,179 @@
+import contextvars
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import repeat
+from typing import Dict, List, Any, Optional, Tuple
+from agents.progress_tracker import progress_tracker
+from agents.student_profile_agent import student_agent
+from llm.rate_limiter import call_priority, BATCH
+from memory.memory_bank import memory_bank
+from utils.metrics import metrics
+from utils.logger import logger
+
+# Bump when the review format changes so every stored review is rebuilt
+REVIEW_VERSION = 1
+REVIEW_COLLECTION = 'weekly_reviews'
+
+def _fingerprint(data: Any) -> str:
+    raw = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def _last_activity(learning_data: Dict[str, Any]) -> str:
+    """ISO timestamp of the student's latest study session or MCQ result"""
+    stamps = [session.get('timestamp', '') for session in learning_data.get('study_sessions', [])]
+    for records in learning_data.get('mcq_performance', {}).values():
+        stamps.extend(record.get('timestamp', '') for record in records)
+    return max(stamps, default='')
+
+def snapshot_progress(student_ids: List[str], active_since: str) -> List[Tuple[str, Optional[str], Optional[Dict]]]:
+    """
+    (student_id, data fingerprint, progress report) for a chunk of students
+    Runs in a worker process; students with no activity since active_since
+    come back with no report
+    """
+    snapshots = []
+    for student_id in student_ids:
+        try:
+            learning_data = memory_bank.load_memory_section(student_id, 'learning_data', {}) or {}
+            if _last_activity(learning_data) < active_since:
+                snapshots.append((student_id, None, None))
+                continue
+            report = progress_tracker.build_progress_report(student_id, learning_data)
+            snapshots.append((student_id, _fingerprint(learning_data), report))
+        except Exception as e:
+            logger.error(f"❌ Error computing progress for {student_id}: {e}")
+            snapshots.append((student_id, None, {}))
+    return snapshots
+
+class ReviewMaterializer:
+    """
+    Precomputes every active student's weekly review (e.g. nightly)
+    Progress metrics are computed across a process pool; the model calls for
+    practice questions run on a few threads at BATCH priority, so the global
+    quota keeps interactive users first. Reviews are stored in the memory
+    bank, and a student whose data hasn't changed since the last run is
+    skipped.
+    """
+
+    def __init__(self, coordinator, processes: int = None, model_concurrency: int = 4,
+                 active_days: int = 14, chunk_size: int = 50):
+        self.coordinator = coordinator
+        self.processes = processes if processes is not None else (os.cpu_count() or 1)
+        self.model_concurrency = max(1, model_concurrency)
+        self.active_days = active_days
+        self.chunk_size = max(1, chunk_size)
+
+    @classmethod
+    def from_env(cls, coordinator) -> 'ReviewMaterializer':
+        processes = os.getenv('REVIEW_PROCESSES')
+        return cls(
+            coordinator,
+            processes=int(processes) if processes else None,
+            model_concurrency=int(os.getenv('REVIEW_MODEL_CONCURRENCY', '4')),
+            active_days=int(os.getenv('REVIEW_ACTIVE_DAYS', '14'))
+        )
+
+    def run(self, force: bool = False) -> Dict[str, Any]:
+        """Materialize the review of every active student whose data changed; returns a summary"""
+        started = time.perf_counter()
+        summary = {'students': 0, 'inactive': 0, 'unchanged': 0, 'materialized': 0, 'failed': 0}
+
+        student_ids = memory_bank.list_students()
+        summary['students'] = len(student_ids)
+        active_since = (datetime.now() - timedelta(days=self.active_days)).isoformat()
+
+        pending = []
+        for student_id, data_fingerprint, progress in self._snapshots(student_ids, active_since):
+            if progress is None:
+                summary['inactive'] += 1
+                continue
+            profile = self._profile_for(student_id)
+            if not progress or not profile:
+                summary['failed'] += 1
+                continue
+
+            fingerprint = _fingerprint([REVIEW_VERSION, data_fingerprint, profile])
+            if not force and self.get_review(student_id).get('fingerprint') == fingerprint:
+                summary['unchanged'] += 1
+                continue
+            pending.append((student_id, profile, progress, fingerprint))
+
+        with ThreadPoolExecutor(max_workers=self.model_concurrency, thread_name_prefix='review-model') as executor, \
+                call_priority(BATCH):
+            # Each task copies the context, so its model calls carry the batch priority
+            futures = [executor.submit(contextvars.copy_context().run, self._materialize, *args) for args in pending]
+            for future in futures:
+                summary['materialized' if future.result() else 'failed'] += 1
+
+        summary['elapsed_s'] = round(time.perf_counter() - started, 2)
+        for outcome in ('inactive', 'unchanged', 'materialized', 'failed'):
+            metrics.increment(f'reviews.{outcome}', summary[outcome])
+        metrics.observe('reviews.batch_ms', summary['elapsed_s'] * 1000)
+        logger.info(f"✅ Weekly reviews: {summary['materialized']} materialized, {summary['unchanged']} unchanged, "
+                    f"{summary['inactive']} inactive, {summary['failed']} failed")
+        return summary
+
+    def get_review(self, student_id: str) -> Dict[str, Any]:
+        """The stored review record (empty if none has been materialized)"""
+        return memory_bank.load_document(REVIEW_COLLECTION, student_id)
+
+    def refresh(self, student_id: str) -> Dict[str, Any]:
+        """
+        Compute and store one student's review now (for a review that wasn't materialized yet)
+        Runs at the caller's priority, so a user waiting on GET /review stays interactive
+        """
+        learning_data = memory_bank.load_memory_section(student_id, 'learning_data', {}) or {}
+        profile = self._profile_for(student_id)
+        if not profile:
+            return {}
+
+        progress = progress_tracker.build_progress_report(student_id, learning_data)
+        fingerprint = _fingerprint([REVIEW_VERSION, _fingerprint(learning_data), profile])
+        if not self._materialize(student_id, profile, progress, fingerprint):
+            return {}
+        return self.get_review(student_id)
+
+    def _snapshots(self, student_ids: List[str], active_since: str) -> List[Tuple]:
+        chunks = [student_ids[i:i + self.chunk_size] for i in range(0, len(student_ids), self.chunk_size)]
+        if self.processes <= 1 or len(chunks) <= 1:
+            # Not worth starting processes for a single chunk
+            return [snapshot for chunk in chunks for snapshot in snapshot_progress(chunk, active_since)]
+
+        # Spawned workers don't inherit this process's threads or open model clients
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(self.processes, len(chunks)), mp_context=context) as executor:
+            results = executor.map(snapshot_progress, chunks, repeat(active_since))
+            return [snapshot for chunk in results for snapshot in chunk]
+
+    def _profile_for(self, student_id: str) -> Dict[str, Any]:
+        """The student's profile, rebuilt from the stored plan if this process hasn't seen them"""
+        profile = student_agent.get_student_profile(student_id)
+        if profile:
+            return profile
+
+        study_load = memory_bank.load_memory_section(student_id, 'study_plan', {}).get('study_load_distribution') or {}
+        if not study_load:
+            return {}
+        return {
+            'student_id': student_id,
+            'subjects': list(study_load),
+            'available_hours': sum(study_load.values()),
+            'preferences': {}
+        }
+
+    def _materialize(self, student_id: str, profile: Dict[str, Any], progress: Dict[str, Any],
+                     fingerprint: str) -> bool:
+        review = self.coordinator.generate_weekly_review(student_id, profile=profile, progress=progress)
+        if not review:
+            return False
+        return memory_bank.save_document(REVIEW_COLLECTION, student_id, {
+            'student_id': student_id,
+            'fingerprint': fingerprint,
+            'materialized_at': datetime.now().isoformat(),
+            'review': review
+        })
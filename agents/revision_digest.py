@@ -0,0 +1,97 @@
+import json
+import os
+import time
+from datetime import date, timedelta
+from typing import Dict, Any, Iterator
+from agents.spaced_repetition import spaced_repetition
+from memory.due_wheel import due_wheel, day_of
+from memory.memory_bank import memory_bank
+from utils.metrics import metrics
+from utils.logger import logger
+
+class RevisionDigestJob:
+    """
+    Daily 'N topics to revise today' digests for every student
+    Only the day's due-wheel bucket is read, so a run costs the number of
+    items due that day rather than the number of students, and digests are
+    written out one student at a time. A topic not revised yet is carried
+    into the next day's bucket, so it shows up on its due day and the
+    carry_days days after. Buckets older than that are deleted.
+    """
+
+    def __init__(self, engine=spaced_repetition, wheel=due_wheel, outbox_path: str = None, carry_days: int = 7):
+        self.engine = engine
+        self.wheel = wheel
+        self.outbox_path = outbox_path or os.path.join(memory_bank.storage_path, 'revision_digests')
+        self.carry_days = max(0, carry_days)
+
+    @classmethod
+    def from_env(cls) -> 'RevisionDigestJob':
+        return cls(carry_days=int(os.getenv('REVISION_DIGEST_CARRY_DAYS', '7')))
+
+    def digests(self, day: str) -> Iterator[Dict[str, Any]]:
+        """One digest per student with topics due on day, streamed from its bucket"""
+        end_of_day = time.mktime((date.fromisoformat(day) + timedelta(days=1)).timetuple())
+        next_day = self.wheel.next_day(day)
+        next_date = date.fromisoformat(next_day)
+        for student_id, items in self.wheel.students_due(day):
+            due_times = self.engine.due_times(student_id)
+            topics = {}
+            for item in items:
+                topic = item.get('topic')
+                current = due_times.get(topic)
+                # Revised since it was scheduled (it is in a later bucket now) or already counted
+                if current is None or current >= end_of_day or topic in topics:
+                    continue
+                topics[topic] = current
+            if not topics:
+                continue
+
+            carried = 0
+            for topic, due in topics.items():
+                if (next_date - date.fromisoformat(day_of(due))).days <= self.carry_days:
+                    self.wheel.schedule_on(next_day, student_id, topic, due)
+                    carried += 1
+            ordered = sorted(topics, key=topics.get)
+            yield {
+                'student_id': student_id,
+                'date': day,
+                'count': len(ordered),
+                'overdue': sum(1 for topic in ordered if day_of(topics[topic]) < day),
+                'topics': ordered,
+                'message': f"You have {len(ordered)} topic{'s' if len(ordered) != 1 else ''} to revise today"
+            }
+            metrics.increment('revision.digest_carried', carried)
+
+    def run(self, day: str = None) -> Dict[str, Any]:
+        """Write the day's digests to the outbox (one JSON line each); returns a summary"""
+        started = time.perf_counter()
+        day = day or date.today().isoformat()
+        summary = {'date': day, 'students': 0, 'topics': 0}
+        try:
+            os.makedirs(self.outbox_path, exist_ok=True)
+            path = os.path.join(self.outbox_path, f"{day}.jsonl")
+            temp_path = path + '.tmp'
+            with open(temp_path, 'w') as f:
+                for digest in self.digests(day):
+                    f.write(json.dumps(digest) + "\n")
+                    summary['students'] += 1
+                    summary['topics'] += digest['count']
+            # Re-running a day replaces its outbox instead of appending to it
+            os.replace(temp_path, path)
+            summary['outbox'] = path
+            summary['dropped_buckets'] = self.wheel.drop_before(
+                (date.fromisoformat(day) - timedelta(days=self.carry_days)).isoformat())
+        except Exception as e:
+            logger.error(f"❌ Error sending revision digests for {day}: {e}")
+            summary['error'] = str(e)
+            return summary
+
+        summary['elapsed_s'] = round(time.perf_counter() - started, 2)
+        metrics.increment('revision.digests', summary['students'])
+        metrics.observe('revision.digest_batch_ms', summary['elapsed_s'] * 1000)
+        logger.info(f"✅ Revision digests for {day}: {summary['students']} students, {summary['topics']} topics")
+        return summary
+
+# Global revision digest job
+revision_digest_job = RevisionDigestJob.from_env()
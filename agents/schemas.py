@@ -0,0 +1,144 @@
+from typing import Dict, List, Any, Tuple, Optional
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+
+WEEK_DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+OPTION_KEYS = ['a', 'b', 'c', 'd']
+
+class MCQ(BaseModel):
+    """Schema for one multiple-choice question"""
+    question: str
+    options: Dict[str, str]
+    correct_answer: str
+    explanation: str
+
+    @field_validator('question', 'explanation')
+    @classmethod
+    def not_empty(cls, value: str) -> str:
+        if not value.strip():
+            raise ValueError('must not be empty')
+        return value.strip()
+
+    @field_validator('options')
+    @classmethod
+    def four_options(cls, value: Dict[str, str]) -> Dict[str, str]:
+        options = {key.strip().lower(): text for key, text in value.items()}
+        if sorted(options) != OPTION_KEYS:
+            raise ValueError('must have exactly the options a, b, c and d')
+        return {key: options[key] for key in OPTION_KEYS}
+
+    @field_validator('correct_answer')
+    @classmethod
+    def answer_is_option(cls, value: str) -> str:
+        answer = value.strip().lower().rstrip(')')
+        if answer not in OPTION_KEYS:
+            raise ValueError('must be one of a, b, c or d')
+        return answer
+
+class WeeklyPlan(BaseModel):
+    """Schema for the weekly overview part of a study plan"""
+    weekly_schedule: Dict[str, List[str]]
+    study_techniques: Dict[str, str]
+    revision_days: List[str]
+    weekly_goals: List[str]
+
+    @field_validator('weekly_schedule')
+    @classmethod
+    def known_days(cls, value: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        schedule = {day.strip().capitalize(): tasks for day, tasks in value.items()}
+        unknown = [day for day in schedule if day not in WEEK_DAYS]
+        if unknown:
+            raise ValueError(f'unknown days: {unknown}')
+        if not schedule:
+            raise ValueError('must not be empty')
+        return schedule
+
+    @field_validator('revision_days')
+    @classmethod
+    def revision_days_are_days(cls, value: List[str]) -> List[str]:
+        days = [day.strip().capitalize() for day in value]
+        unknown = [day for day in days if day not in WEEK_DAYS]
+        if unknown:
+            raise ValueError(f'unknown days: {unknown}')
+        return days
+
+class OnboardingRequest(BaseModel):
+    """Schema for a new student sent to /onboard"""
+    model_config = ConfigDict(extra='allow')
+
+    student_id: Optional[str] = None
+    name: Optional[str] = None
+    subjects: List[str]
+    available_hours: int
+    preferences: Dict[str, Any] = {}
+
+    @field_validator('subjects')
+    @classmethod
+    def has_subjects(cls, value: List[str]) -> List[str]:
+        subjects = [subject.strip() for subject in value if subject.strip()]
+        if not subjects:
+            raise ValueError('must list at least one subject')
+        return subjects
+
+    @field_validator('available_hours')
+    @classmethod
+    def hours_in_week(cls, value: int) -> int:
+        if not 0 < value <= 168:
+            raise ValueError('must be between 1 and 168')
+        return value
+
+def validate_mcqs(items: Any) -> Tuple[List[Dict[str, Any]], Dict[int, List[str]]]:
+    """
+    Validate a list of raw MCQs
+    Returns (valid MCQs, {index: error messages} for the invalid ones)
+    """
+    valid = []
+    invalid = {}
+    if not isinstance(items, list):
+        items = [items]
+
+    for index, item in enumerate(items):
+        try:
+            valid.append(MCQ.model_validate(item).model_dump())
+        except ValidationError as e:
+            invalid[index] = _error_messages(e)
+
+    return valid, invalid
+
+def validate_weekly_plan(data: Any) -> Tuple[Dict[str, Any], Dict[str, List[str]]]:
+    """
+    Validate a raw weekly plan field by field
+    Returns (valid fields, {field name: error messages} for missing or invalid fields)
+    """
+    if not isinstance(data, dict):
+        data = {}
+
+    valid = {}
+    invalid = {}
+    for field_name in WeeklyPlan.model_fields:
+        try:
+            validated = WeeklyPlan.__pydantic_validator__.validate_assignment(
+                WeeklyPlan.model_construct(), field_name, data.get(field_name)
+            )
+            valid[field_name] = getattr(validated, field_name)
+        except ValidationError as e:
+            invalid[field_name] = _error_messages(e)
+
+    return valid, invalid
+
+def validate_onboarding_request(data: Any) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Validate the body of an onboarding request
+    Returns (cleaned data, error messages); the data is empty when invalid
+    """
+    try:
+        request = OnboardingRequest.model_validate(data if isinstance(data, dict) else {})
+    except ValidationError as e:
+        return {}, _error_messages(e)
+    return request.model_dump(exclude_none=True), []
+
+def _error_messages(error: ValidationError) -> List[str]:
+    messages = []
+    for item in error.errors():
+        location = '.'.join(str(part) for part in item['loc'])
+        messages.append(f"{location}: {item['msg']}" if location else item['msg'])
+    return messages
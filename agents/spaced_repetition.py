@@ -0,0 +1,169 @@
+import heapq
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+from memory.memory_bank import memory_bank
+from memory.due_wheel import DueWheel, due_wheel
+from utils.event_bus import event_bus
+from utils.metrics import metrics
+from utils.logger import logger
+
+DAY_S = 86400.0
+CARD_COLLECTION = 'revision_cards'
+MIN_EASE = 1.3
+
+def quality_from_percentage(percentage: float) -> int:
+    """MCQ percentage -> SM-2 answer quality (0-5); 60% and up counts as recalled"""
+    return max(0, min(5, int(round(percentage / 20.0))))
+
+def next_card(card: Dict[str, Any], quality: int, reviewed_at: float) -> Dict[str, Any]:
+    """SM-2 update of one topic card after a review of the given quality"""
+    ease = card.get('ease', 2.5)
+    repetitions = card.get('repetitions', 0)
+    interval = card.get('interval_days', 0)
+    lapses = card.get('lapses', 0)
+
+    if quality < 3:
+        # Forgotten: start over tomorrow
+        repetitions = 0
+        interval = 1
+        lapses += 1
+    else:
+        repetitions += 1
+        if repetitions == 1:
+            interval = 1
+        elif repetitions == 2:
+            interval = 6
+        else:
+            interval = max(1, round(interval * ease))
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+
+    return {
+        'ease': round(ease, 3),
+        'repetitions': repetitions,
+        'interval_days': interval,
+        'lapses': lapses,
+        'last_quality': quality,
+        'last_reviewed': reviewed_at,
+        'due': reviewed_at + interval * DAY_S
+    }
+
+class SpacedRepetitionEngine:
+    """
+    SM-2 spaced repetition over each student's topics
+    A student's cards are stored with a min-heap of (due, topic) entries, so
+    the next due topic is at the root and listing the k topics due by a time
+    costs O(k log k). Updating a card pushes a new heap entry; the old one is
+    skipped as stale and dropped when the heap is compacted. The global
+    engine learns from the 'mcq.scored' events published by the progress
+    tracker, and every new due date is also added to the due wheel kept
+    next to the storage (the global one by default) for the daily digests.
+    """
+
+    def __init__(self, storage=memory_bank, collection: str = CARD_COLLECTION, wheel: DueWheel = None):
+        self.storage = storage
+        self.collection = collection
+        if wheel is None:
+            wheel = due_wheel if storage is memory_bank else DueWheel(os.path.join(storage.storage_path, 'due_wheel'))
+        self.wheel = wheel
+
+    def review(self, student_id: str, topic: str, quality: int, reviewed_at: float = None) -> Dict[str, Any]:
+        """Record one review of a topic (quality 0-5); returns the updated card"""
+        return self.review_many(student_id, [(topic, quality, reviewed_at)]).get(topic, {})
+
+    def review_many(self, student_id: str, reviews: List[tuple]) -> Dict[str, Dict[str, Any]]:
+        """Apply (topic, quality, reviewed_at) reviews in order with one write; returns the updated cards"""
+        with self.storage.student_lock(student_id):
+            deck = self._load(student_id)
+            updated = {}
+            for topic, quality, reviewed_at in reviews:
+                card = next_card(deck['cards'].get(topic, {}), quality, reviewed_at or time.time())
+                deck['cards'][topic] = card
+                heapq.heappush(deck['heap'], [card['due'], topic])
+                updated[topic] = card
+                metrics.increment('revision.reviews')
+                if quality < 3:
+                    metrics.increment('revision.lapses')
+            self._compact(deck)
+            if not self.storage.save_document(self.collection, student_id, deck):
+                return {}
+            for topic, card in updated.items():
+                self.wheel.schedule(student_id, topic, card['due'])
+            return updated
+
+    def due(self, student_id: str, until: float = None, limit: int = None) -> List[Dict[str, Any]]:
+        """Topics due by until (default now), earliest first"""
+        until = time.time() if until is None else until
+        deck = self._load(student_id)
+        heap, cards = deck['heap'], deck['cards']
+
+        # Walk the heap from the root without popping: a child is never due before its parent
+        due = []
+        frontier = [(heap[0][0], 0)] if heap else []
+        while frontier and (limit is None or len(due) < limit):
+            due_at, index = heapq.heappop(frontier)
+            if due_at > until:
+                break
+            topic = heap[index][1]
+            card = cards.get(topic)
+            if card and card['due'] == due_at:
+                due.append(self._view(topic, card))
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child][0], child))
+        return due
+
+    def next_due(self, student_id: str) -> Optional[Dict[str, Any]]:
+        """The topic due first (None if the student has no cards)"""
+        upcoming = self.due(student_id, until=float('inf'), limit=1)
+        return upcoming[0] if upcoming else None
+
+    def due_times(self, student_id: str) -> Dict[str, float]:
+        """Current due time of each of the student's topics"""
+        return {topic: card['due'] for topic, card in self._load(student_id)['cards'].items()}
+
+    def cards(self, student_id: str) -> Dict[str, Dict[str, Any]]:
+        return {topic: self._view(topic, card) for topic, card in self._load(student_id)['cards'].items()}
+
+    def _on_mcq_scored(self, events: List[Dict[str, Any]]):
+        """Event handler: one card update (and write) per student for all their scores in the batch"""
+        reviews = {}
+        for event in events:
+            payload = event['payload']
+            try:
+                reviewed_at = datetime.fromisoformat(payload['timestamp']).timestamp()
+            except (KeyError, ValueError):
+                reviewed_at = event['published_at']
+            quality = quality_from_percentage(payload.get('percentage', 0))
+            reviews.setdefault(payload['student_id'], []).append((payload['subject'], quality, reviewed_at))
+        for student_id, student_reviews in reviews.items():
+            self.review_many(student_id, student_reviews)
+
+    def _load(self, student_id: str) -> Dict[str, Any]:
+        deck = self.storage.load_document(self.collection, student_id)
+        # Stored in heap order, so no heapify is needed
+        return {'cards': deck.get('cards', {}), 'heap': deck.get('heap', [])}
+
+    @staticmethod
+    def _compact(deck: Dict[str, Any]):
+        """Drop stale heap entries once they outnumber the live ones"""
+        if len(deck['heap']) > 2 * len(deck['cards']):
+            deck['heap'] = [[card['due'], topic] for topic, card in deck['cards'].items()]
+            heapq.heapify(deck['heap'])
+
+    @staticmethod
+    def _view(topic: str, card: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'topic': topic,
+            'due_at': datetime.fromtimestamp(card['due']).isoformat(),
+            'interval_days': card['interval_days'],
+            'ease': card['ease'],
+            'repetitions': card['repetitions'],
+            'lapses': card['lapses'],
+            'last_quality': card['last_quality']
+        }
+
+# Global spaced repetition engine
+spaced_repetition = SpacedRepetitionEngine()
+event_bus.subscribe('mcq.scored', spaced_repetition._on_mcq_scored)
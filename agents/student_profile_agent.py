@@ -1,39 +1,43 @@
 import json
 from typing import Dict, List, Any
 from datetime import datetime
+from memory.profile_store import profile_store, ProfileVersionConflictError
+from utils.tracing import traced, tracer
 from utils.logger import logger
 
 class StudentProfileAgent:
     """
     Simple agent to manage student information
-    Uses session memory to remember student preferences
+    Profiles live in the shared profile store, so every worker sees them
     """
     
-    def __init__(self):
-        # This will store student data during the session
-        self.student_data = {}
+    def __init__(self, store=profile_store):
+        self.store = store
         logger.info("✅ Student Profile Agent started!")
     
+    @traced('student_agent.collect_student_info')
     def collect_student_info(self, student_id: str, subjects: List[str], available_hours: int, preferences: Dict = None):
         """
         Collect basic student information
         This is like filling out a form about your study needs
         """
+        tracer.set_attributes(student_id=student_id, subjects=len(subjects or []))
         try:
-            # Store student information
-            self.student_data[student_id] = {
+            # Store student information (onboarding again keeps the original created_at)
+            profile = self.store.update(student_id, lambda current: {
                 'subjects': subjects,
                 'available_hours': available_hours,
                 'preferences': preferences or {},
-                'created_at': datetime.now().isoformat(),
-                'last_updated': datetime.now().isoformat()
-            }
+                'created_at': current.get('created_at', datetime.now().isoformat())
+            })
+            if not profile:
+                return {}
             
             logger.info(f"✅ Student info saved for: {student_id}")
             logger.info(f"   Subjects: {subjects}")
             logger.info(f"   Available hours: {available_hours}")
             
-            return self.student_data[student_id]
+            return profile
             
         except Exception as e:
             logger.error(f"❌ Error saving student info: {e}")
@@ -41,23 +45,33 @@ class StudentProfileAgent:
     
     def get_student_profile(self, student_id: str) -> Dict[str, Any]:
         """Get stored student information"""
-        if student_id in self.student_data:
-            return self.student_data[student_id]
-        else:
+        profile = self.store.get(student_id)
+        if not profile:
             logger.warning(f"📝 No profile found for student: {student_id}")
-            return {}
+        return profile
     
-    def update_study_preferences(self, student_id: str, new_preferences: Dict):
-        """Update student's study preferences"""
+    def update_study_preferences(self, student_id: str, new_preferences: Dict, expected_version: int = None):
+        """
+        Update student's study preferences
+        With expected_version the update only applies if nobody changed the
+        profile since that version was read
+        """
         try:
-            if student_id in self.student_data:
-                self.student_data[student_id]['preferences'].update(new_preferences)
-                self.student_data[student_id]['last_updated'] = datetime.now().isoformat()
-                logger.info(f"✅ Preferences updated for: {student_id}")
-                return True
-            else:
+            if not self.store.exists(student_id):
                 logger.error(f"❌ Student {student_id} not found")
                 return False
+            
+            def merge(profile):
+                profile['preferences'] = dict(profile.get('preferences', {}), **new_preferences)
+                return profile
+            
+            if not self.store.update(student_id, merge, expected_version):
+                return False
+            logger.info(f"✅ Preferences updated for: {student_id}")
+            return True
+        except ProfileVersionConflictError as e:
+            logger.warning(f"⚠️  Preferences not updated: {e}")
+            return False
         except Exception as e:
             logger.error(f"❌ Error updating preferences: {e}")
             return False
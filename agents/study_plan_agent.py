@@ -1,8 +1,23 @@
 import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any
 from config.gcp_config import gcp_config
+from llm.client import model_registry
+from llm.resilience import get_resilient_model, ModelUnavailableError
+from llm.rate_limiter import call_priority, current_priority
+from agents.schemas import validate_weekly_plan
+from memory.memory_bank import memory_bank
+from memory.availability_store import availability_store
+from memory.plan_cache import plan_cache, plan_shape_key, normalize_preferences, normalize_subject
+from tools.local_planner import local_planner
 from tools.study_tools import study_tools
 from tools.schedule_tools import schedule_tools
+from utils.json_repair import parse_json_with_repair
+from utils.metrics import metrics
+from utils.tracing import traced, tracer
 from utils.logger import logger
 
 class StudyPlanGeneratorAgent:
@@ -12,10 +27,29 @@ class StudyPlanGeneratorAgent:
     """
     
     def __init__(self):
-        # Get the Gemini model from our GCP configuration
-        self.model = gcp_config.get_model()
+        # The model is created lazily by the shared registry on first use
+        self.agent_name = 'study_plan_agent'
+        
+        # Model calls go through deadlines, a circuit breaker and optional hedging
+        self.llm = get_resilient_model(self.agent_name)
+        
+        # Background workers that enrich local plans with the model's answer
+        self.enrichment_mode = os.getenv('PLAN_ENRICHMENT', 'async')
+        self._enrichment_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('PLAN_ENRICHMENT_WORKERS', '4')), thread_name_prefix='plan-enrich'
+        )
         logger.info("✅ Study Plan Generator Agent started!")
     
+    @property
+    def model(self):
+        """Shared Gemini model for this agent"""
+        return model_registry.get_model(self.agent_name)
+    
+    @model.setter
+    def model(self, model):
+        model_registry.set_model(self.agent_name, model)
+    
+    @traced('study_plan_agent.generate_study_plan')
     def generate_study_plan(self, student_profile: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generate a personalized study plan using Gemini AI
@@ -26,6 +60,7 @@ class StudyPlanGeneratorAgent:
             subjects = student_profile.get('subjects', [])
             available_hours = student_profile.get('available_hours', 0)
             preferences = student_profile.get('preferences', {})
+            tracer.set_attributes(student_id=student_profile.get('student_id'), subjects=len(subjects))
             
             logger.info(f"📚 Generating study plan for {len(subjects)} subjects")
             logger.info(f"⏰ Available hours: {available_hours}")
@@ -34,34 +69,218 @@ class StudyPlanGeneratorAgent:
             study_load = study_tools.calculate_study_load(subjects, available_hours)
             logger.info(f"📊 Study load calculated: {study_load}")
             
-            # Step 2: Use Gemini AI to create a smart study plan
-            prompt = self._create_plan_prompt(subjects, study_load, preferences)
+            # Step 2: Get the weekly plan from the model (shared across identical course loads)
+            study_plan, _ = self._model_weekly_plan(subjects, study_load, preferences)
             
-            # Send prompt to Gemini AI
-            response = self.model.generate_content(prompt)
+            # Step 3: Add the detailed daily schedule
+            final_plan = self._assemble_plan(study_plan, study_load, preferences)
             
-            # Step 3: Parse the AI response
-            study_plan = self._parse_ai_response(response.text)
+            logger.info("✅ Study plan generated successfully!")
+            return final_plan
+            
+        except Exception as e:
+            logger.error(f"❌ Error generating study plan: {e}")
+            return {}
+    
+    @traced('study_plan_agent.generate_fast_plan')
+    def generate_fast_plan(self, student_profile: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build a complete study plan locally, without waiting for the model
+        Takes milliseconds; enrich_plan_async adds the model's ideas later
+        """
+        try:
+            start_time = time.perf_counter()
+            subjects = student_profile.get('subjects', [])
+            available_hours = student_profile.get('available_hours', 0)
+            preferences = student_profile.get('preferences', {})
             
-            # Step 4: Create detailed daily schedule using our tools
-            available_slots = self._generate_time_slots(available_hours)
-            detailed_schedule = schedule_tools.create_daily_schedule(study_load, available_slots)
+            study_load = study_tools.calculate_study_load(subjects, available_hours)
+            study_plan = local_planner.create_weekly_plan(study_load, preferences)
             
-            # Combine everything into final plan
-            final_plan = {
-                'weekly_overview': study_plan,
-                'daily_schedule': detailed_schedule,
-                'study_load_distribution': study_load,
-                'generated_at': self._get_current_timestamp()
-            }
+            final_plan = self._assemble_plan(study_plan, study_load, preferences)
+            final_plan['plan_source'] = 'local'
+            final_plan['enrichment_status'] = 'off' if self.enrichment_mode == 'off' else 'pending'
             
-            logger.info("✅ Study plan generated successfully!")
+            metrics.observe('study_plan.fast_path_ms', (time.perf_counter() - start_time) * 1000)
+            logger.info("⚡ Local study plan ready")
             return final_plan
             
         except Exception as e:
-            logger.error(f"❌ Error generating study plan: {e}")
+            logger.error(f"❌ Error generating local study plan: {e}")
             return {}
     
+    def enrich_plan_async(self, student_id: str, student_profile: Dict[str, Any], generated_at: str):
+        """
+        Enrich a stored local plan with the model's answer in the background
+        Returns a Future (None when enrichment is off)
+        """
+        if self.enrichment_mode == 'off':
+            return None
+        
+        # Worker threads start with a fresh context, so request deadlines don't follow;
+        # the caller's priority class is carried over explicitly
+        priority = current_priority()
+        
+        def run():
+            with call_priority(priority):
+                return self.enrich_plan(student_id, student_profile, generated_at)
+        
+        return self._enrichment_executor.submit(run)
+    
+    @traced('study_plan_agent.enrich_plan')
+    def enrich_plan(self, student_id: str, student_profile: Dict[str, Any], generated_at: str) -> bool:
+        """Merge the model's techniques and topic wording into the student's stored plan"""
+        try:
+            start_time = time.perf_counter()
+            subjects = student_profile.get('subjects', [])
+            preferences = student_profile.get('preferences', {})
+            tracer.set_attributes(student_id=student_id, subjects=len(subjects))
+            study_load = study_tools.calculate_study_load(subjects, student_profile.get('available_hours', 0))
+            
+            model_plan, from_model = self._model_weekly_plan(subjects, study_load, preferences)
+            
+            stored = self.get_stored_plan(student_id)
+            if not stored or stored.get('generated_at') != generated_at:
+                # The student got a newer plan while the model was thinking
+                metrics.increment('study_plan.enrichment_superseded')
+                return False
+            
+            if from_model:
+                stored['weekly_overview'] = self._merge_plans(stored['weekly_overview'], model_plan)
+                stored['plan_source'] = 'local+model'
+                stored['enrichment_status'] = 'enriched'
+                metrics.increment('study_plan.enriched')
+            else:
+                stored['enrichment_status'] = 'unavailable'
+                metrics.increment('study_plan.enrichment_failures')
+            
+            stored['enriched_at'] = self._get_current_timestamp()
+            self.save_plan(student_id, stored)
+            metrics.observe('study_plan.enrichment_ms', (time.perf_counter() - start_time) * 1000)
+            logger.info(f"✅ Study plan enrichment {stored['enrichment_status']} for {student_id}")
+            return from_model
+            
+        except Exception as e:
+            metrics.increment('study_plan.enrichment_failures')
+            logger.error(f"❌ Error enriching study plan: {e}")
+            return False
+    
+    def save_plan(self, student_id: str, plan: Dict[str, Any]) -> bool:
+        """Store a student's current study plan (and the free hours its timetable leaves, for group matching)"""
+        if plan.get('weekly_timetable'):
+            availability_store.set_timetable(student_id, plan['weekly_timetable'])
+        return memory_bank.save_memory_section(student_id, 'study_plan', plan)
+    
+    def get_stored_plan(self, student_id: str) -> Dict[str, Any]:
+        """Get a student's current study plan (empty if there is none)"""
+        return memory_bank.load_memory_section(student_id, 'study_plan', {}) or {}
+    
+    def _merge_plans(self, local_plan: Dict[str, Any], model_plan: Dict[str, Any]) -> Dict[str, Any]:
+        """The model's wording wins; the local plan fills any day or subject it left out"""
+        techniques = dict(local_plan.get('study_techniques', {}))
+        techniques.update(model_plan.get('study_techniques', {}))
+        
+        return {
+            'weekly_schedule': {
+                day: model_plan.get('weekly_schedule', {}).get(day) or entries
+                for day, entries in local_plan.get('weekly_schedule', {}).items()
+            },
+            'study_techniques': techniques,
+            'revision_days': model_plan.get('revision_days') or local_plan.get('revision_days', []),
+            'weekly_goals': model_plan.get('weekly_goals') or local_plan.get('weekly_goals', [])
+        }
+    
+    def _assemble_plan(self, study_plan: Dict[str, Any], study_load: Dict[str, int], preferences: Dict) -> Dict[str, Any]:
+        """Combine a weekly plan with the timed weekly schedule"""
+        weekly_timetable = schedule_tools.create_weekly_schedule(study_load, preferences, study_plan.get('revision_days'))
+        
+        return {
+            'weekly_overview': study_plan,
+            'weekly_timetable': weekly_timetable,
+            'daily_schedule': self._first_study_day(weekly_timetable),
+            'study_load_distribution': study_load,
+            'generated_at': self._get_current_timestamp()
+        }
+    
+    def _first_study_day(self, weekly_timetable: Dict[str, Any]) -> Dict[str, Any]:
+        """The first day with study blocks, in the slot -> session shape of daily_schedule"""
+        for entries in weekly_timetable.get('days', {}).values():
+            if any(entry['activity'] == 'study' for entry in entries):
+                return {
+                    f"{entry['start']}-{entry['end']}": {
+                        'subject': entry['subject'],
+                        'duration_hours': round(entry['minutes'] / 60, 2),
+                        'activity': 'new_topic' if entry['activity'] == 'study' else 'revision'
+                    }
+                    for entry in entries
+                }
+        return {}
+    
+    def _model_weekly_plan(self, subjects: List[str], study_load: Dict[str, int], preferences: Dict) -> tuple:
+        """
+        The model's weekly plan for this course-load shape, fitted to the student
+        Returns (plan, from_model); from_model is False for the default plan
+        """
+        # Students with the same subjects, hours and preferences share one model call
+        cache_key = plan_shape_key(study_load, preferences)
+        cached = plan_cache.get_or_create(
+            cache_key, lambda: self._create_weekly_plan(subjects, study_load, preferences)
+        )
+        
+        # Fit the shared plan to this student's own subject names
+        return self._personalize_plan(cached, subjects), cached.get('source', 'model') == 'model'
+    
+    def _create_weekly_plan(self, subjects: List[str], study_load: Dict[str, int], preferences: Dict) -> tuple:
+        """
+        Ask Gemini for the weekly plan
+        Returns (cache entry, cacheable); fallback plans are not cached
+        """
+        # The prompt only sees the normalized preferences, so the cache key fully describes it
+        prompt = self._create_plan_prompt(subjects, study_load, normalize_preferences(preferences))
+        
+        try:
+            response_text = self._generate_json(prompt)
+            
+            # Parse and validate the AI response
+            study_plan = self._parse_ai_response(response_text, prompt)
+            source = 'model'
+        except ModelUnavailableError as e:
+            # Don't fail onboarding when the model is down or too slow
+            logger.warning(f"⚠️  Model unavailable for study plan ({e}), using default plan")
+            metrics.increment('study_plan.fallbacks')
+            study_plan = self._get_default_plan()
+            source = 'default'
+        
+        return {'overview': study_plan, 'subjects': list(subjects), 'source': source}, source == 'model'
+    
+    def _personalize_plan(self, cached: Dict[str, Any], subjects: List[str]) -> Dict[str, Any]:
+        """Rewrite subject names in a shared plan to the spelling this student used"""
+        spellings = {normalize_subject(subject): subject for subject in subjects}
+        renames = {}
+        for original in cached.get('subjects', []):
+            own = spellings.get(normalize_subject(original))
+            if own and own != original:
+                renames[original] = own
+        
+        plan = json.loads(json.dumps(cached['overview']))
+        if not renames:
+            return plan
+        
+        names = '|'.join(re.escape(name) for name in sorted(renames, key=len, reverse=True))
+        pattern = re.compile(rf'(?<!\w)(?:{names})(?!\w)')
+        rename = lambda text: pattern.sub(lambda match: renames[match.group(0)], text)
+        
+        plan['weekly_schedule'] = {
+            day: [rename(entry) for entry in entries]
+            for day, entries in plan.get('weekly_schedule', {}).items()
+        }
+        plan['study_techniques'] = {
+            rename(subject): rename(technique)
+            for subject, technique in plan.get('study_techniques', {}).items()
+        }
+        plan['weekly_goals'] = [rename(goal) for goal in plan.get('weekly_goals', [])]
+        return plan
+    
     def _create_plan_prompt(self, subjects: List[str], study_load: Dict[str, int], preferences: Dict) -> str:
         """Create a smart prompt for Gemini AI"""
         
@@ -99,25 +318,77 @@ class StudyPlanGeneratorAgent:
         
         return prompt
     
-    def _parse_ai_response(self, ai_text: str) -> Dict[str, Any]:
-        """Parse the AI's response into structured data"""
+    def _generate_json(self, prompt: str) -> str:
+        """Call the model, using JSON mode when the SDK supports it"""
+        json_config = gcp_config.json_generation_config()
+        if json_config:
+            response = self.llm.generate_content(prompt, generation_config=json_config)
+        else:
+            response = self.llm.generate_content(prompt)
+        return response.text
+    
+    def _parse_ai_response(self, ai_text: str, prompt: str = '') -> Dict[str, Any]:
+        """
+        Parse the AI's response into a validated weekly plan
+        Broken JSON is repaired locally; only invalid fields are asked for again
+        """
+        plan_data, repairs = parse_json_with_repair(ai_text, '{', metric_prefix='structured_output.study_plan')
+        if repairs:
+            logger.info(f"🔧 Repaired study plan JSON locally: {', '.join(repairs)}")
+        if plan_data is None:
+            logger.warning("⚠️  No valid JSON object in AI response")
+        
+        plan, invalid = validate_weekly_plan(plan_data)
+        
+        if invalid and prompt:
+            # Re-prompt for the missing or broken fields only
+            metrics.increment('study_plan.invalid_fields', len(invalid))
+            logger.warning(f"⚠️  Invalid study plan fields: {', '.join(invalid)}")
+            plan.update(self._fix_invalid_fields(prompt, invalid))
+            invalid = {field: errors for field, errors in invalid.items() if field not in plan}
+        
+        if invalid:
+            # Fill whatever is still missing from the default plan
+            metrics.increment('study_plan.default_fields', len(invalid))
+            logger.warning(f"⚠️  Using default values for: {', '.join(invalid)}")
+            default_plan = self._get_default_plan()
+            for field in invalid:
+                plan[field] = default_plan[field]
+        
+        # Keep the fields in their usual order
+        return {field: plan[field] for field in self._get_default_plan()}
+    
+    def _fix_invalid_fields(self, prompt: str, invalid: Dict[str, List[str]]) -> Dict[str, Any]:
+        """Ask the model again for just the fields that failed validation"""
         try:
-            # Try to extract JSON from the AI response
-            # Sometimes AI adds extra text, so we look for JSON pattern
-            start_idx = ai_text.find('{')
-            end_idx = ai_text.rfind('}') + 1
-            
-            if start_idx != -1 and end_idx != 0:
-                json_str = ai_text[start_idx:end_idx]
-                return json.loads(json_str)
-            else:
-                # If no JSON found, return a default structure
-                logger.warning("⚠️  No JSON found in AI response, using default structure")
-                return self._get_default_plan()
-                
-        except json.JSONDecodeError as e:
-            logger.error(f"❌ Error parsing AI response: {e}")
-            return self._get_default_plan()
+            metrics.increment('study_plan.reprompts')
+            fix_prompt = self._create_fix_prompt(prompt, invalid)
+            fixed_data, _ = parse_json_with_repair(self._generate_json(fix_prompt), '{', metric_prefix='structured_output.study_plan')
+            
+            fixed, _ = validate_weekly_plan(fixed_data)
+            fixed = {field: value for field, value in fixed.items() if field in invalid}
+            logger.info(f"🔧 Fixed {len(fixed)} of {len(invalid)} invalid study plan fields")
+            return fixed
+            
+        except Exception as e:
+            logger.error(f"❌ Error fixing study plan fields: {e}")
+            return {}
+    
+    def _create_fix_prompt(self, prompt: str, invalid: Dict[str, List[str]]) -> str:
+        """Create a prompt asking only for the fields that were invalid"""
+        problems = "\n".join(f"- {field}: {'; '.join(errors)}" for field, errors in invalid.items())
+        
+        fix_prompt = f"""
+        {prompt}
+        
+        Your previous answer had problems in these fields:
+        {problems}
+        
+        Return a JSON object containing ONLY these keys: {', '.join(invalid)}.
+        Use full English day names (Monday to Sunday).
+        """
+        
+        return fix_prompt
     
     def _get_default_plan(self) -> Dict[str, Any]:
         """Return a default study plan if AI fails"""
@@ -138,24 +409,6 @@ class StudyPlanGeneratorAgent:
             "weekly_goals": ["Complete all planned topics", "Practice problems", "Weekly review"]
         }
     
-    def _generate_time_slots(self, total_hours: int) -> List[str]:
-        """Generate time slots for the schedule"""
-        # Simple time slot generation (9 AM to 9 PM)
-        slots = []
-        start_time = 9  # 9 AM
-        
-        for i in range(total_hours):
-            end_time = start_time + 1
-            slot = f"{start_time}:00-{end_time}:00"
-            slots.append(slot)
-            start_time = end_time
-            
-            # Break for lunch
-            if start_time == 13:  # 1 PM
-                start_time = 14   # 2 PM
-                
-        return slots
-    
     def _get_current_timestamp(self) -> str:
         from datetime import datetime
         return datetime.now().isoformat()
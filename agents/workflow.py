@@ -0,0 +1,264 @@
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Callable, Iterable
+from utils.metrics import metrics
+from utils.tracing import tracer
+from utils.logger import logger
+
+class WorkflowError(RuntimeError):
+    """A required workflow step failed after all its retries"""
+
+    def __init__(self, workflow: str, step: str, cause: BaseException):
+        super().__init__(f"Step '{step}' of workflow '{workflow}' failed: {cause}")
+        self.workflow = workflow
+        self.step = step
+        self.cause = cause
+
+class StepTimeoutError(TimeoutError):
+    """A step attempt ran longer than its timeout"""
+
+class WorkflowStep:
+    """
+    One unit of work in a workflow
+    The function is called with the named inputs as keyword arguments and its
+    return value is published under `output` for later steps. With `map_over`,
+    the function runs once per item of that input (concurrently, at most
+    `limit` items), gets the item as `map_as`, and the output is the list of
+    results in order.
+    """
+
+    def __init__(self, name: str, func: Callable, inputs: Iterable[str] = (), output: str = None,
+                 map_over: str = None, map_as: str = None, limit: int = None, retries: int = 0,
+                 retry_backoff_s: float = 0.1, timeout_s: float = None, required: bool = True,
+                 default: Any = None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.output = output or name
+        self.map_over = map_over
+        self.map_as = map_as or map_over
+        self.limit = limit
+        self.retries = retries
+        self.retry_backoff_s = retry_backoff_s
+        self.timeout_s = timeout_s
+        self.required = required
+        self.default = default
+
+        if map_over and map_over not in self.inputs:
+            raise ValueError(f"Step '{name}' maps over '{map_over}', which is not one of its inputs")
+
+class WorkflowRun:
+    """Outputs, errors and timing breakdown of one workflow run"""
+
+    def __init__(self, workflow: str):
+        self.workflow = workflow
+        self.values = {}
+        self.errors = {}
+        self.timings = {}
+        self.total_ms = 0.0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.values.get(key, default)
+
+    def breakdown(self) -> Dict[str, Any]:
+        """Per-step timings, ordered by when each step started"""
+        steps = dict(sorted(self.timings.items(), key=lambda item: item[1]['start_ms']))
+        return {
+            'workflow': self.workflow,
+            'total_ms': round(self.total_ms, 2),
+            'steps': steps
+        }
+
+class Workflow:
+    """
+    Runs steps as a dependency graph
+    A step starts as soon as all of its inputs exist, so independent steps
+    run at the same time on the shared executor
+    """
+
+    def __init__(self, name: str, steps: List[WorkflowStep] = None, executor: ThreadPoolExecutor = None):
+        self.name = name
+        self.steps = {}
+        self.executor = executor or _executor
+        for step in steps or []:
+            self.add_step(step)
+
+    def add_step(self, step: WorkflowStep) -> 'Workflow':
+        if step.name in self.steps:
+            raise ValueError(f"Duplicate step '{step.name}' in workflow '{self.name}'")
+        if any(other.output == step.output for other in self.steps.values()):
+            raise ValueError(f"Two steps in workflow '{self.name}' produce '{step.output}'")
+        self.steps[step.name] = step
+        return self
+
+    def validate(self, initial: Iterable[str] = ()):
+        """Check every input can be produced and the steps have no cycles"""
+        available = set(initial)
+        remaining = {name: step for name, step in self.steps.items() if step.output not in available}
+        while remaining:
+            ready = [name for name, step in remaining.items() if set(step.inputs) <= available]
+            if not ready:
+                missing = {name: sorted(set(step.inputs) - available) for name, step in remaining.items()}
+                raise ValueError(f"Workflow '{self.name}' has unresolved inputs or a cycle: {missing}")
+            for name in ready:
+                available.add(remaining.pop(name).output)
+
+    def run(self, **inputs) -> WorkflowRun:
+        """
+        Run the workflow; raises WorkflowError if a required step fails
+        Steps whose output is passed in as an input are skipped
+        """
+        self.validate(inputs)
+        run = WorkflowRun(self.name)
+        run.values.update(inputs)
+        start_time = time.perf_counter()
+
+        waiting = {name: step for name, step in self.steps.items() if step.output not in inputs}
+        active = {}
+        running = {}
+
+        try:
+            while waiting or running:
+                for name, step in list(waiting.items()):
+                    if all(key in run.values for key in step.inputs):
+                        del waiting[name]
+                        self._start_step(run, step, active, running, start_time)
+
+                if not running:
+                    break
+
+                now = time.monotonic()
+                deadlines = [task['deadline'] for task in running.values() if task['deadline'] is not None]
+                timeout = max(0.0, min(deadlines) - now) if deadlines else None
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                now = time.monotonic()
+                for future in list(running):
+                    task = running[future]
+                    if future in done:
+                        error = future.exception()
+                    elif task['deadline'] is not None and now >= task['deadline']:
+                        # Threads can't be stopped; the late result is simply ignored
+                        error = StepTimeoutError(f"Step '{task['step'].name}' timed out after {task['step'].timeout_s}s")
+                    else:
+                        continue
+
+                    del running[future]
+                    if error is None:
+                        self._finish_item(run, task, future.result(), active)
+                    else:
+                        self._handle_error(run, task, error, active, running)
+        finally:
+            run.total_ms = (time.perf_counter() - start_time) * 1000
+            metrics.observe(f'workflow.{self.name}.total_ms', run.total_ms)
+
+        logger.info(f"✅ Workflow '{self.name}' finished in {run.total_ms:.0f}ms")
+        return run
+
+    def _start_step(self, run: WorkflowRun, step: WorkflowStep, active: Dict, running: Dict, start_time: float):
+        kwargs = {key: run.values[key] for key in step.inputs}
+        items = [None]
+        if step.map_over:
+            items = list(kwargs.pop(step.map_over) or [])[:step.limit]
+
+        state = {
+            'started': time.perf_counter(),
+            'results': [None] * len(items),
+            'left': len(items),
+            'attempts': 0,
+            'failed': False
+        }
+        active[step.name] = state
+        run.timings[step.name] = {
+            'start_ms': round((state['started'] - start_time) * 1000, 2),
+            'duration_ms': 0.0,
+            'attempts': 0,
+            'status': 'running'
+        }
+
+        if not items:
+            self._complete_step(run, step, [], 'completed', active)
+            return
+
+        for index, item in enumerate(items):
+            item_kwargs = dict(kwargs)
+            if step.map_over:
+                item_kwargs[step.map_as] = item
+            self._submit(step, index, item_kwargs, 1, running, active)
+
+    def _submit(self, step: WorkflowStep, index: int, kwargs: Dict[str, Any], attempt: int,
+                running: Dict, active: Dict):
+        delay = step.retry_backoff_s * (2 ** (attempt - 2)) if attempt > 1 else 0.0
+        # Steps see the caller's context (priority class, request deadline)
+        context = contextvars.copy_context()
+        span_attributes = {'attempt': attempt}
+        if step.map_over:
+            span_attributes['item'] = index
+        future = self.executor.submit(context.run, _call_step, step.func, kwargs, delay,
+                                      f"{self.name}.{step.name}", span_attributes)
+
+        deadline = None
+        if step.timeout_s is not None:
+            deadline = time.monotonic() + delay + step.timeout_s
+        running[future] = {'step': step, 'index': index, 'kwargs': kwargs, 'attempt': attempt, 'deadline': deadline}
+        active[step.name]['attempts'] += 1
+
+    def _finish_item(self, run: WorkflowRun, task: Dict, result: Any, active: Dict):
+        step = task['step']
+        state = active.get(step.name)
+        if state is None or state['failed']:
+            return
+        state['results'][task['index']] = result
+        state['left'] -= 1
+        if state['left'] == 0:
+            value = state['results'] if step.map_over else state['results'][0]
+            self._complete_step(run, step, value, 'completed', active)
+
+    def _handle_error(self, run: WorkflowRun, task: Dict, error: BaseException, active: Dict, running: Dict):
+        step = task['step']
+        state = active.get(step.name)
+        if state is None or state['failed']:
+            return
+
+        if task['attempt'] <= step.retries:
+            metrics.increment(f'workflow.{self.name}.{step.name}.retries')
+            logger.warning(f"⚠️  Step '{step.name}' failed ({error}), retrying")
+            self._submit(step, task['index'], task['kwargs'], task['attempt'] + 1, running, active)
+            return
+
+        state['failed'] = True
+        run.errors[step.name] = error
+        metrics.increment(f'workflow.{self.name}.{step.name}.failures')
+
+        if step.required:
+            self._complete_step(run, step, None, 'failed', active, publish=False)
+            raise WorkflowError(self.name, step.name, error) from error
+
+        logger.warning(f"⚠️  Optional step '{step.name}' failed ({error}), using its default")
+        self._complete_step(run, step, step.default, 'failed', active)
+
+    def _complete_step(self, run: WorkflowRun, step: WorkflowStep, value: Any, status: str, active: Dict,
+                       publish: bool = True):
+        state = active[step.name]
+        duration_ms = (time.perf_counter() - state['started']) * 1000
+        run.timings[step.name].update({
+            'duration_ms': round(duration_ms, 2),
+            'attempts': state['attempts'],
+            'status': status
+        })
+        metrics.observe(f'workflow.{self.name}.{step.name}_ms', duration_ms)
+        if publish:
+            run.values[step.output] = value
+
+def _call_step(func: Callable, kwargs: Dict[str, Any], delay: float, span_name: str,
+               span_attributes: Dict[str, Any]) -> Any:
+    if delay:
+        time.sleep(delay)
+    with tracer.span(span_name, **span_attributes):
+        return func(**kwargs)
+
+# Shared pool that runs workflow steps
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('WORKFLOW_MAX_WORKERS', '16')),
+                               thread_name_prefix='workflow-step')
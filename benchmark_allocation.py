@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+SmartStudy AI - Study-load allocation benchmark
+Times the per-student allocation tools against their NumPy batch variants
+for a large cohort, and checks both give the same hours.
+
+Example:
+    python benchmark_allocation.py --students 100000
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.append('.')
+
+from tools.study_tools import study_tools
+from tools.schedule_tools import schedule_tools
+from utils.logger import logger
+
+SUBJECTS = ['Data Structures', 'Algorithms', 'Operating Systems', 'Computer Networks', 'DBMS', 'Compilers',
+            'Theory of Computation', 'Computer Architecture', 'Machine Learning', 'Software Engineering']
+
+def make_cohort(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    subjects, weights, hours = [], [], []
+    for _ in range(count):
+        student_subjects = rng.sample(SUBJECTS, rng.randint(2, 7))
+        subjects.append(student_subjects)
+        weights.append({subject: rng.choice([0.5, 1.0, 1.5, 2.0, 3.0]) for subject in student_subjects})
+        hours.append(rng.randint(4, 40))
+    return subjects, weights, hours
+
+def timed(label: str, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<36} {elapsed:8.3f}s")
+    return result, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-student and batch study-load allocation")
+    parser.add_argument('--students', type=int, default=100000, help="Students to allocate for (default: 100000)")
+    args = parser.parse_args()
+
+    subjects, weights, hours = make_cohort(args.students)
+    # The per-student tools log every call; keep the log out of the timing
+    logger.setLevel(logging.WARNING)
+
+    print(f"📈 {args.students} students")
+    loads, loop_load = timed("calculate_study_load (loop)",
+                             lambda: [study_tools.calculate_study_load(s, h) for s, h in zip(subjects, hours)])
+    batch_loads, batch_load = timed("calculate_study_load_batch",
+                                    lambda: study_tools.calculate_study_load_batch(subjects, hours))
+    assert batch_loads == loads, "Batch study load differs from the per-student result"
+
+    allocations, loop_alloc = timed("optimize_time_allocation (loop)",
+                                    lambda: [schedule_tools.optimize_time_allocation(s, w, h)
+                                             for s, w, h in zip(subjects, weights, hours)])
+    batch_allocations, batch_alloc = timed("optimize_time_allocation_batch",
+                                           lambda: schedule_tools.optimize_time_allocation_batch(subjects, weights, hours))
+    assert batch_allocations == allocations, "Batch allocation differs from the per-student result"
+    assert all(sum(a.values()) == h and min(a.values()) >= 0 for a, h in zip(batch_allocations, hours))
+
+    print(f"✅ Batch speedup: study load {loop_load / batch_load:.1f}x, allocation {loop_alloc / batch_alloc:.1f}x")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+SmartStudy AI - Profile memory benchmark
+Measures with tracemalloc how many bytes each cached student profile costs
+as a plain dict (as loaded from storage) and as a compact ProfileRecord.
+
+Example:
+    python benchmark_profiles.py --count 100000
+"""
+
+import argparse
+import json
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.append('.')
+
+from memory.profile_record import ProfileRecord
+
+SUBJECTS = ['Data Structures', 'Algorithms', 'Operating Systems', 'Computer Networks', 'DBMS', 'Compilers',
+            'Theory of Computation', 'Computer Architecture', 'Machine Learning', 'Software Engineering',
+            'Discrete Mathematics', 'Digital Logic', 'Cloud Computing', 'Cryptography', 'Linear Algebra']
+PREFERENCES = {
+    'preferred_time': ['morning', 'afternoon', 'evening', 'night'],
+    'learning_style': ['visual', 'auditory', 'reading', 'kinesthetic', 'mixed'],
+    'difficulty': ['easy', 'medium', 'hard']
+}
+
+def make_profiles(count: int, seed: int = 7):
+    """Profiles as JSON text, so each one is parsed into its own strings like a load from storage"""
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    for n in range(count):
+        created = start + timedelta(seconds=rng.randrange(10 ** 7), microseconds=rng.randrange(10 ** 6))
+        yield json.dumps({
+            'subjects': rng.sample(SUBJECTS, rng.randint(3, 6)),
+            'available_hours': rng.randint(2, 30),
+            'preferences': {key: rng.choice(values) for key, values in PREFERENCES.items() if rng.random() < 0.8},
+            'created_at': created.isoformat(),
+            'student_id': f"student_{n + 1}",
+            'version': rng.randint(1, 5),
+            'last_updated': (created + timedelta(days=rng.randint(0, 30))).isoformat()
+        })
+
+def measure(build, count: int) -> float:
+    """Bytes held per profile by what build() returns"""
+    tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+    held = build()
+    used = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(baseline, 'filename'))
+    tracemalloc.stop()
+    del held
+    return used / count
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory cost of dict and compact profiles")
+    parser.add_argument('--count', type=int, default=50000, help="Profiles to build (default: 50000)")
+    args = parser.parse_args()
+
+    raw = list(make_profiles(args.count))
+    # Fill the shared subject/preference tables first: they are paid once per process, not per profile
+    for profile in raw[:1000]:
+        ProfileRecord.from_dict(json.loads(profile))
+
+    as_dicts = measure(lambda: [json.loads(profile) for profile in raw], args.count)
+    as_records = measure(lambda: [ProfileRecord.from_dict(json.loads(profile)) for profile in raw], args.count)
+
+    # Records must convert back to exactly the stored shape
+    sample = json.loads(raw[0])
+    assert ProfileRecord.from_dict(sample).to_dict() == sample, "Round trip changed the profile"
+
+    print(f"📈 {args.count} profiles")
+    print(f"   dict:          {as_dicts:8.0f} bytes/profile")
+    print(f"   ProfileRecord: {as_records:8.0f} bytes/profile")
+    print(f"✅ {1 - as_records / as_dicts:.0%} less memory per cached profile")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
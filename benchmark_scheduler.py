@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+SmartStudy AI - Weekly scheduler benchmark
+Times WeeklyScheduler for growing subject counts and weekly hour budgets,
+including budgets larger than the week can hold.
+
+Example:
+    python benchmark_scheduler.py --repeat 20
+"""
+
+import argparse
+import logging
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.append('.')
+
+from tools.weekly_scheduler import WeeklyScheduler
+from utils.logger import logger
+
+# (subjects, weekly hours)
+CASES = [(4, 20), (10, 40), (50, 70), (200, 70), (1000, 500), (5000, 2000)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the weekly scheduler on large loads")
+    parser.add_argument('--repeat', type=int, default=10, help="Schedules per case (default: 10)")
+    parser.add_argument('--block', type=int, default=30, help="Maximum block minutes (default: 30, more blocks)")
+    args = parser.parse_args()
+
+    # Over-full weeks log a warning per schedule; keep the log out of the timing
+    logger.setLevel(logging.ERROR)
+    scheduler = WeeklyScheduler(day_start=6 * 60, day_end=24 * 60, max_block_minutes=args.block,
+                                min_block_minutes=min(15, args.block), break_minutes=5)
+
+    print(f"📈 Weekly schedules, {args.block}-minute blocks")
+    print(f"   {'subjects':>8} {'hours':>6} {'blocks':>7} {'scheduled h':>12} {'ms/schedule':>12}")
+    for subjects, hours in CASES:
+        load = {f"Subject {n}": hours / subjects for n in range(subjects)}
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            schedule = scheduler.schedule(load, revision_days=['Saturday'])
+        elapsed_ms = (time.perf_counter() - start) * 1000 / args.repeat
+        blocks = sum(len(entries) for entries in schedule['days'].values())
+        scheduled = sum(schedule['scheduled_hours'].values())
+        print(f"   {subjects:>8} {hours:>6} {blocks:>7} {scheduled:>12.1f} {elapsed_ms:>12.2f}")
+    print("✅ Done")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
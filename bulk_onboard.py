@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+SmartStudy AI - Bulk onboarding
+Onboards a whole class from a CSV or NDJSON roster
+
+CSV columns: student_id, name, subjects (separated by ';'), available_hours,
+preferences ('key=value;key=value' or JSON); extra columns become preferences.
+
+Example:
+    python bulk_onboard.py roster.csv --concurrency 16
+"""
+
+import argparse
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add the current directory to Python path
+sys.path.append('.')
+
+def print_progress(summary):
+    done = summary['processed'] + summary['skipped']
+    total = summary['total'] if summary['total'] is not None else '?'
+    eta = f"{summary['eta_s']:.0f}s" if summary['eta_s'] is not None else '?'
+    print(f"📈 {done}/{total} students | {summary['throughput_per_s']:.1f} students/s | "
+          f"{summary['failed']} failed | {summary['invalid']} invalid | ETA {eta}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Onboard a whole class from a CSV or NDJSON roster")
+    parser.add_argument('roster', help="Path to the roster (.csv, .ndjson or .jsonl)")
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help="Roster format (default: from the file extension)")
+    parser.add_argument('--concurrency', type=int, help="Parallel workers (default: BULK_ONBOARDING_CONCURRENCY or 8)")
+    parser.add_argument('--checkpoint', help="Checkpoint file; rerun with the same file to resume (default: <roster>.checkpoint.jsonl)")
+    parser.add_argument('--no-enrich', action='store_true', help="Only build local plans, skip the model")
+    args = parser.parse_args()
+    
+    from agents.coordinator import coordinator
+    from agents.bulk_onboarding import onboard_roster_file
+    
+    print(f"🚀 Bulk onboarding from {args.roster}...")
+    summary = onboard_roster_file(
+        coordinator,
+        args.roster,
+        roster_format=args.format,
+        concurrency=args.concurrency,
+        checkpoint_path=args.checkpoint or f"{args.roster}.checkpoint.jsonl",
+        enrich=not args.no_enrich,
+        reporter=print_progress
+    )
+    
+    print(f"\n✅ Onboarded {summary['onboarded']} students in {summary['elapsed_s']}s "
+          f"({summary['unique_shapes']} distinct profile shapes, {summary['plans_shared']} plans shared)")
+    if summary['failed'] or summary['invalid']:
+        print(f"⚠️  {summary['failed']} failed, {summary['invalid']} invalid - see the checkpoint file for details")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -17,8 +17,10 @@ sys.path.append('.')
 def create_app():
     """Create a Flask web application for Cloud Run"""
     try:
-        from flask import Flask, request, jsonify, render_template_string
+        from flask import Flask, Response, g, request, jsonify, render_template_string, stream_with_context
         import json
+        import time
+        from datetime import date
         
         app = Flask(__name__)
         
@@ -26,10 +28,63 @@ def create_app():
         from agents.coordinator import coordinator
         from agents.student_profile_agent import student_agent
         from agents.progress_tracker import progress_tracker
+        from agents.mcq_agent import mcq_agent
+        from agents.study_plan_agent import study_plan_agent
+        from agents.spaced_repetition import spaced_repetition
+        from agents.group_matcher import group_matcher
+        from agents.job_queue import job_queue, job_view, QueueFullError
+        from agents.schemas import validate_onboarding_request
+        from agents.bulk_onboarding import save_uploaded_roster
+        from memory.memory_bank import memory_bank
+        from memory.idempotency_store import idempotency_store, request_fingerprint, IdempotencyConflictError
+        from memory.profile_store import profile_store, ProfileVersionConflictError
+        from llm.resilience import set_request_deadline, reset_request_deadline
+        from utils.metrics import metrics
+        from utils.tracing import tracer
         from utils.logger import logger
         
         logger.info("🚀 SmartStudy AI starting in Cloud Run mode...")
         
+        # Pick up onboarding jobs that were still waiting when the last instance stopped
+        job_queue.recover()
+        
+        # Every request gets a time budget; model calls inside it stop waiting when it runs out
+        default_budget = float(os.environ.get('REQUEST_BUDGET_S', 60))
+        
+        @app.before_request
+        def start_request_budget():
+            try:
+                budget = float(request.headers.get('X-Request-Timeout', default_budget))
+            except ValueError:
+                budget = default_budget
+            g.deadline_token = set_request_deadline(min(budget, default_budget))
+        
+        # Each request is the root span of its trace; send X-Trace: 1 to always trace it
+        @app.before_request
+        def start_request_span():
+            if request.path.startswith('/debug/'):
+                return
+            force = request.headers.get('X-Trace', '').lower() in ('1', 'true', 'yes')
+            g.trace_span = tracer.start_span(f"{request.method} {request.path}", force=force,
+                                             method=request.method, path=request.path)
+        
+        @app.after_request
+        def tag_request_span(response):
+            span, _ = g.get('trace_span', (None, None))
+            if span is not None and span.sampled:
+                span.set_attribute('status_code', response.status_code)
+                response.headers['X-Trace-Id'] = span.trace.trace_id
+            return response
+        
+        @app.teardown_request
+        def end_request_budget(error=None):
+            token = g.pop('deadline_token', None)
+            if token is not None:
+                reset_request_deadline(token)
+            span, token = g.pop('trace_span', (None, None))
+            if span is not None:
+                tracer.end_span(span, token, error)
+        
         # Health check endpoint (required by Cloud Run)
         @app.route('/health', methods=['GET'])
         def health_check():
@@ -75,8 +130,24 @@ def create_app():
                     <ul>
                         <li><strong>GET /health</strong> - Service health check</li>
                         <li><strong>GET /demo</strong> - Run a demonstration</li>
-                        <li><strong>POST /onboard</strong> - Onboard new student</li>
+                        <li><strong>POST /onboard</strong> - Onboard new student (add ?async=true to run it as a job)</li>
+                        <li><strong>POST /onboard/bulk</strong> - Onboard a CSV or NDJSON roster as a job</li>
+                        <li><strong>POST /study-session/&lt;student_id&gt;</strong> - Record a study session</li>
+                        <li><strong>GET /jobs/&lt;job_id&gt;</strong> - Background job status and result</li>
+                        <li><strong>GET /students?subject=...&amp;preferred_time=...</strong> - Find students (paginated)</li>
+                        <li><strong>PATCH /students/&lt;student_id&gt;/preferences</strong> - Update preferences (If-Match: version)</li>
+                        <li><strong>GET /students/changes?offset=...</strong> - Profile change feed</li>
                         <li><strong>GET /progress/&lt;student_id&gt;</strong> - Get progress</li>
+                        <li><strong>GET /study-plan/&lt;student_id&gt;</strong> - Get the current study plan</li>
+                        <li><strong>GET /review/&lt;student_id&gt;</strong> - Get the stored weekly review</li>
+                        <li><strong>GET /revision/&lt;student_id&gt;</strong> - Topics due for revision (spaced repetition)</li>
+                        <li><strong>GET /study-groups/&lt;student_id&gt;</strong> - Study groups with common free hours and a shared weak subject</li>
+                        <li><strong>GET /study-groups?subject=...</strong> - Split a subject's weak students into study groups</li>
+                        <li><strong>POST /reviews/materialize</strong> - Rebuild weekly reviews as a job</li>
+                        <li><strong>POST /revision/digests?date=...</strong> - Write the day's revision digests as a job</li>
+                        <li><strong>GET /mcqs/stream?topic=...</strong> - Stream practice questions (NDJSON)</li>
+                        <li><strong>GET /metrics</strong> - Service metrics</li>
+                        <li><strong>GET /debug/traces</strong> - Recent request traces</li>
                     </ul>
                     
                     <h2>Local Development:</h2>
@@ -117,21 +188,235 @@ def create_app():
                     "message": f"Demo failed: {str(e)}"
                 }), 500
         
+        def request_owner(data):
+            """
+            Whose Idempotency-Key a request uses when its URL names no student:
+            the body's student_id, else its name, else the client address
+            """
+            if isinstance(data, dict) and data.get('student_id'):
+                return f"student:{data['student_id']}"
+            if isinstance(data, dict) and data.get('name'):
+                return f"name:{request_fingerprint(str(data['name']).strip().lower())}"
+            client = request.headers.get('X-Forwarded-For', request.remote_addr or '')
+            return f"client:{client.split(',')[0].strip()}"
+        
+        def run_idempotent(scope, data, func, owner):
+            """
+            Run func once per Idempotency-Key header and owner; returns (response, headers)
+            Keys are scoped to the owner, so clients picking the same key don't collide.
+            Requests without the header always run
+            """
+            key = request.headers.get('Idempotency-Key')
+            if not key:
+                return func(), {}
+            response, replayed = idempotency_store.run(scope, f"{owner}:{key}", request_fingerprint(data), func)
+            return response, {'Idempotent-Replayed': 'true' if replayed else 'false'}
+        
         # Onboard endpoint
         @app.route('/onboard', methods=['POST'])
         def onboard_student():
-            """Onboard a new student via API"""
+            """
+            Onboard a new student via API
+            With ?async=true (or Prefer: respond-async) the work runs as a
+            background job and the response is 202 with a job ID to poll.
+            A retry with the same Idempotency-Key header gets the first response.
+            """
             try:
-                data = request.get_json()
+                data = request.get_json(silent=True)
                 if not data:
                     return jsonify({"error": "No JSON data provided"}), 400
                 
-                result = coordinator.onboard_new_student(data)
-                return jsonify(result)
+                wants_async = (request.args.get('async', '').lower() in ('1', 'true', 'yes')
+                               or 'respond-async' in request.headers.get('Prefer', ''))
+                if not wants_async:
+                    result, headers = run_idempotent('onboard', data, lambda: coordinator.onboard_new_student(data),
+                                                     owner=request_owner(data))
+                    return jsonify(result), 200, headers
+                
+                student_data, errors = validate_onboarding_request(data)
+                if errors:
+                    return jsonify({"error": "Invalid onboarding request", "details": errors}), 400
+                
+                def submit_job():
+                    job = job_queue.submit('onboarding', student_data)
+                    return {
+                        "job_id": job['job_id'],
+                        "status": job['status'],
+                        "status_url": f"/jobs/{job['job_id']}"
+                    }
                 
+                try:
+                    accepted, headers = run_idempotent('onboard_async', data, submit_job, owner=request_owner(data))
+                except QueueFullError as e:
+                    return jsonify({"error": str(e)}), 503, {'Retry-After': '30'}
+                
+                headers['Location'] = accepted['status_url']
+                return jsonify(accepted), 202, headers
+                
+            except IdempotencyConflictError as e:
+                return jsonify({"error": str(e)}), 422
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
         
+        # Bulk onboarding endpoint
+        @app.route('/onboard/bulk', methods=['POST'])
+        def onboard_bulk():
+            """
+            Onboard a whole roster (CSV or NDJSON body) as a background job
+            Returns 202 with a job ID; the job result is the run summary
+            """
+            try:
+                content = request.get_data(as_text=True)
+                if not content.strip():
+                    return jsonify({"error": "Roster body is empty"}), 400
+                
+                roster_format = request.args.get('format')
+                if not roster_format:
+                    roster_format = 'ndjson' if 'ndjson' in (request.content_type or '') else 'csv'
+                if roster_format not in ('csv', 'ndjson'):
+                    return jsonify({"error": "format must be csv or ndjson"}), 400
+                
+                try:
+                    concurrency = int(request.args['concurrency']) if 'concurrency' in request.args else None
+                except ValueError:
+                    return jsonify({"error": "concurrency must be an integer"}), 400
+                
+                roster_path, checkpoint_path = save_uploaded_roster(content, roster_format, memory_bank.storage_path)
+                try:
+                    job = job_queue.submit('bulk_onboarding', {
+                        'roster_path': roster_path,
+                        'format': roster_format,
+                        'concurrency': concurrency,
+                        'checkpoint_path': checkpoint_path
+                    })
+                except QueueFullError as e:
+                    return jsonify({"error": str(e)}), 503, {'Retry-After': '30'}
+                
+                status_url = f"/jobs/{job['job_id']}"
+                return jsonify({
+                    "job_id": job['job_id'],
+                    "status": job['status'],
+                    "status_url": status_url
+                }), 202, {'Location': status_url}
+                
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        # Study session endpoint
+        @app.route('/study-session/<student_id>', methods=['POST'])
+        def record_study_session(student_id):
+            """
+            Record a study session (subjects, topics, duration, mcq_score...)
+            A retry with the same Idempotency-Key header gets the first response
+            and the session is stored only once
+            """
+            try:
+                data = request.get_json(silent=True)
+                if not data:
+                    return jsonify({"error": "No JSON data provided"}), 400
+                
+                key = request.headers.get('Idempotency-Key')
+                session_data = dict(data, idempotency_key=key) if key else data
+                result, headers = run_idempotent('study_session', data,
+                                                 lambda: coordinator.conduct_study_session(student_id, session_data),
+                                                 owner=student_id)
+                if not result:
+                    return jsonify({"error": "Study session could not be recorded"}), 500
+                return jsonify(result), 200, headers
+                
+            except IdempotencyConflictError as e:
+                return jsonify({"error": str(e)}), 422
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        # Job status endpoint
+        @app.route('/jobs/<job_id>', methods=['GET'])
+        def get_job(job_id):
+            """Get the status (and result, once finished) of a background job"""
+            job = job_queue.get(job_id)
+            if not job:
+                return jsonify({"error": f"Job {job_id} not found or expired"}), 404
+            return jsonify(job_view(job))
+        
+        # Student search endpoint
+        @app.route('/students', methods=['GET'])
+        def list_students():
+            """
+            Students matching every filter, one page at a time
+            ?subject=...&min_hours=...&max_hours=... (min <= hours < max); any
+            other parameter filters on that preference (e.g. preferred_time=morning).
+            Pass next_cursor back as ?cursor= for the following page.
+            """
+            args = request.args.to_dict()
+            try:
+                limit = min(int(args.pop('limit', 50)), 200)
+                min_hours = args.pop('min_hours', None)
+                max_hours = args.pop('max_hours', None)
+                min_hours = float(min_hours) if min_hours is not None else None
+                max_hours = float(max_hours) if max_hours is not None else None
+            except ValueError:
+                return jsonify({"error": "limit, min_hours and max_hours must be numbers"}), 400
+            if limit < 1:
+                return jsonify({"error": "limit must be positive"}), 400
+            
+            try:
+                return jsonify(profile_store.query(
+                    subject=args.pop('subject', None),
+                    min_hours=min_hours,
+                    max_hours=max_hours,
+                    cursor=args.pop('cursor', None),
+                    preferences=args,
+                    limit=limit
+                ))
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        # Preference update endpoint
+        @app.route('/students/<student_id>/preferences', methods=['PATCH'])
+        def update_preferences(student_id):
+            """
+            Merge new preferences into a student's profile
+            Send the version you read as If-Match to only update if nobody
+            changed the profile since (412 with the current version otherwise)
+            """
+            preferences = request.get_json(silent=True)
+            if not isinstance(preferences, dict):
+                return jsonify({"error": "Body must be a JSON object of preferences"}), 400
+            expected = request.headers.get('If-Match')
+            try:
+                expected_version = int(expected.strip('W/"')) if expected else None
+            except ValueError:
+                return jsonify({"error": "If-Match must be a profile version"}), 400
+            if not profile_store.exists(student_id):
+                return jsonify({"error": f"Student {student_id} not found"}), 404
+            
+            def merge(profile):
+                profile['preferences'] = dict(profile.get('preferences', {}), **preferences)
+                return profile
+            
+            try:
+                profile = profile_store.update(student_id, merge, expected_version)
+            except ProfileVersionConflictError as e:
+                return jsonify({"error": str(e), "version": e.current_version}), 412
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+            if not profile:
+                return jsonify({"error": f"Could not update {student_id}"}), 500
+            return jsonify(profile), 200, {'ETag': f'"{profile["version"]}"'}
+        
+        # Profile change feed endpoint
+        @app.route('/students/changes', methods=['GET'])
+        def profile_changes():
+            """Profile changes from ?offset= on; pass next_offset back to keep tailing (offset_expired if it was dropped)"""
+            try:
+                offset = int(request.args.get('offset', 0))
+                limit = min(int(request.args.get('limit', 100)), 1000)
+            except ValueError:
+                return jsonify({"error": "offset and limit must be integers"}), 400
+            if offset < 0 or limit < 1:
+                return jsonify({"error": "offset must be >= 0 and limit positive"}), 400
+            return jsonify(profile_store.changes(offset, limit))
+        
         # Progress endpoint
         @app.route('/progress/<student_id>', methods=['GET'])
         def get_progress(student_id):
@@ -142,6 +427,185 @@ def create_app():
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
         
+        # Study plan endpoint
+        @app.route('/study-plan/<student_id>', methods=['GET'])
+        def get_study_plan(student_id):
+            """Get a student's stored study plan (enriched by the model once ready)"""
+            try:
+                plan = study_plan_agent.get_stored_plan(student_id)
+                if not plan:
+                    return jsonify({"error": f"No study plan for {student_id}"}), 404
+                return jsonify(plan)
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        # Weekly review endpoint
+        @app.route('/review/<student_id>', methods=['GET'])
+        def get_weekly_review(student_id):
+            """
+            Get a student's weekly review
+            Reads the review stored by the nightly batch; only a student who
+            has none yet gets one computed (and stored) on demand
+            """
+            try:
+                stored = coordinator.review_materializer.get_review(student_id)
+                if stored:
+                    metrics.increment('reviews.reads')
+                else:
+                    metrics.increment('reviews.read_misses')
+                    stored = coordinator.review_materializer.refresh(student_id)
+                if not stored:
+                    return jsonify({"error": f"No weekly review for {student_id}"}), 404
+                return jsonify(stored)
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        # Spaced repetition endpoint
+        @app.route('/revision/<student_id>', methods=['GET'])
+        def get_revision_due(student_id):
+            """
+            Topics due for revision, earliest first (?days=0 means due now;
+            ?days=7 includes the coming week), and the next topic coming due
+            """
+            try:
+                days = float(request.args.get('days', 0))
+                limit = int(request.args.get('limit', 50))
+            except ValueError:
+                return jsonify({"error": "days and limit must be numbers"}), 400
+            try:
+                due = spaced_repetition.due(student_id, until=time.time() + days * 86400, limit=limit)
+                return jsonify({
+                    "student_id": student_id,
+                    "due": due,
+                    "next_due": spaced_repetition.next_due(student_id)
+                })
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        # Group study matching
+        @app.route('/study-groups/<student_id>', methods=['GET'])
+        def get_study_groups(student_id):
+            """
+            The best group around a student for each weak subject (or ?subject=),
+            with the free hours the whole group has in common
+            """
+            try:
+                size = int(request.args.get('size', 4))
+                min_hours = int(request.args.get('min_hours', 1))
+            except ValueError:
+                return jsonify({"error": "size and min_hours must be integers"}), 400
+            if not 2 <= size <= 20:
+                return jsonify({"error": "size must be between 2 and 20"}), 400
+            try:
+                groups = group_matcher.find_groups(student_id, subject=request.args.get('subject'),
+                                                   size=size, min_hours=min_hours)
+                return jsonify({"student_id": student_id, "groups": groups})
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        @app.route('/study-groups', methods=['GET'])
+        def list_study_groups():
+            """Split the students weak in ?subject= into groups with common free hours"""
+            subject = request.args.get('subject')
+            if not subject:
+                return jsonify({"error": "subject query parameter is required"}), 400
+            try:
+                size = int(request.args.get('size', 4))
+                min_hours = int(request.args.get('min_hours', 1))
+                limit = min(int(request.args.get('limit', 20)), 200)
+            except ValueError:
+                return jsonify({"error": "size, min_hours and limit must be integers"}), 400
+            if not 2 <= size <= 20:
+                return jsonify({"error": "size must be between 2 and 20"}), 400
+            try:
+                groups = group_matcher.groups_for_subject(subject, size=size, min_hours=min_hours, limit=limit)
+                return jsonify({"subject": subject, "groups": groups})
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+        
+        # Weekly review batch endpoint (for a nightly scheduler)
+        @app.route('/reviews/materialize', methods=['POST'])
+        def materialize_reviews():
+            """Materialize every active student's weekly review as a background job (?force=true rebuilds all)"""
+            force = request.args.get('force', '').lower() in ('1', 'true', 'yes')
+            try:
+                job = job_queue.submit('review_materialization', {'force': force})
+            except QueueFullError as e:
+                return jsonify({"error": str(e)}), 503, {'Retry-After': '30'}
+            
+            status_url = f"/jobs/{job['job_id']}"
+            return jsonify({
+                "job_id": job['job_id'],
+                "status": job['status'],
+                "status_url": status_url
+            }), 202, {'Location': status_url}
+        
+        # Daily revision digest endpoint (for a daily scheduler)
+        @app.route('/revision/digests', methods=['POST'])
+        def send_revision_digests():
+            """Write a digest for every student with topics due on ?date= (default today) as a background job"""
+            day = request.args.get('date')
+            if day:
+                try:
+                    date.fromisoformat(day)
+                except ValueError:
+                    return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+            try:
+                job = job_queue.submit('revision_digest', {'date': day})
+            except QueueFullError as e:
+                return jsonify({"error": str(e)}), 503, {'Retry-After': '30'}
+            
+            status_url = f"/jobs/{job['job_id']}"
+            return jsonify({
+                "job_id": job['job_id'],
+                "status": job['status'],
+                "status_url": status_url
+            }), 202, {'Location': status_url}
+        
+        # Streaming MCQ endpoint
+        @app.route('/mcqs/stream', methods=['GET'])
+        def stream_mcqs():
+            """Stream practice questions as newline-delimited JSON"""
+            topic = request.args.get('topic')
+            if not topic:
+                return jsonify({"error": "topic query parameter is required"}), 400
+            
+            difficulty = request.args.get('difficulty', 'beginner')
+            try:
+                num_questions = int(request.args.get('num_questions', 5))
+            except ValueError:
+                return jsonify({"error": "num_questions must be an integer"}), 400
+            
+            def generate():
+                for mcq in mcq_agent.stream_mcqs(topic, difficulty, num_questions):
+                    yield json.dumps(mcq) + "\n"
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+        # Trace endpoints
+        @app.route('/debug/traces', methods=['GET'])
+        def list_traces():
+            """Recent sampled traces, newest first (?limit=20)"""
+            try:
+                limit = int(request.args.get('limit', 20))
+            except ValueError:
+                return jsonify({"error": "limit must be an integer"}), 400
+            return jsonify({"sample_rate": tracer.sample_rate, "traces": tracer.traces(limit)})
+        
+        @app.route('/debug/traces/<trace_id>', methods=['GET'])
+        def get_trace(trace_id):
+            """All spans of one trace"""
+            trace = tracer.get_trace(trace_id)
+            if not trace:
+                return jsonify({"error": f"Trace {trace_id} not found"}), 404
+            return jsonify(trace)
+        
+        # Metrics endpoint
+        @app.route('/metrics', methods=['GET'])
+        def get_metrics():
+            """Get service metrics"""
+            return jsonify(metrics.snapshot())
+        
         logger.info("✅ Flask app created successfully")
         return app
         
@@ -1,5 +1,7 @@
 import os
+import threading
 import google.generativeai as genai
+from google.generativeai import client as genai_client
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -11,25 +13,88 @@ class GCPConfig:
     def __init__(self):
         self.api_key = os.getenv('GOOGLE_API_KEY')
         self.model_name = os.getenv('GEMINI_MODEL', 'gemini-pro')
-        self._configure_genai()
+        
+        # Model backend: 'gemini' (live API) or 'cassette' (record/replay)
+        self.backend = os.getenv('LLM_BACKEND', 'gemini').lower()
+        self.cassette_path = os.getenv('LLM_CASSETTE_PATH', './cassettes/llm_cassette.json')
+        self.cassette_mode = os.getenv('LLM_CASSETTE_MODE', 'replay').lower()
+        self.replay_latency = os.getenv('LLM_REPLAY_LATENCY', 'none')
+        self.replay_seed = int(os.getenv('LLM_REPLAY_SEED', '0'))
+        
+        # genai is configured lazily, on the first model that needs it
+        self._configured = False
+        self._configure_lock = threading.Lock()
+    
+    def _needs_live_model(self) -> bool:
+        """Only pure cassette replay can run without the Gemini API"""
+        return not (self.backend == 'cassette' and self.cassette_mode == 'replay')
     
     def _configure_genai(self):
-        """Configure Google Generative AI with API key"""
-        if not self.api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment variables")
+        """Configure Google Generative AI with API key (only once per process)"""
+        if self._configured:
+            return
         
-        genai.configure(api_key=self.api_key)
-        print("✅ Google Generative AI configured successfully!")
+        with self._configure_lock:
+            if self._configured:
+                return
+            
+            if not self.api_key:
+                raise ValueError("GOOGLE_API_KEY not found in environment variables")
+            
+            genai.configure(api_key=self.api_key)
+            
+            # Create the shared API client now, under the lock, so every model
+            # reuses the same underlying connection instead of racing to make its own
+            genai_client.get_default_generative_client()
+            self._configured = True
+            print("✅ Google Generative AI configured successfully!")
     
-    def get_model(self):
-        """Get the configured Gemini model"""
+    def get_model(self, generation_config: dict = None):
+        """
+        Create a Gemini model (or the cassette backend)
+        Agents should use model_registry.get_model() to share clients
+        """
         try:
-            model = genai.GenerativeModel(self.model_name)
+            if self.backend == 'cassette':
+                return self._get_cassette_model(generation_config)
+            
+            self._configure_genai()
+            model = genai.GenerativeModel(self.model_name, generation_config=generation_config)
             print(f"✅ Gemini model '{self.model_name}' loaded successfully!")
             return model
         except Exception as e:
             print(f"❌ Error loading model: {e}")
             return None
+    
+    def _get_cassette_model(self, generation_config: dict = None):
+        """Record/replay backend for offline runs, benchmarks and tests"""
+        from llm.cassette import CassetteModel, LatencyModel, get_cassette
+        
+        inner_model = None
+        if self._needs_live_model():
+            self._configure_genai()
+            inner_model = genai.GenerativeModel(self.model_name, generation_config=generation_config)
+        
+        model = CassetteModel(
+            cassette=get_cassette(self.cassette_path),
+            model_name=self.model_name,
+            mode=self.cassette_mode,
+            inner_model=inner_model,
+            latency=LatencyModel(self.replay_latency, self.replay_seed),
+            generation_config=generation_config
+        )
+        print(f"✅ Cassette backend '{self.cassette_mode}' loaded from {self.cassette_path}")
+        return model
+    
+    def json_generation_config(self):
+        """
+        Generation config that asks the model for JSON output
+        Returns None if the installed SDK has no JSON mode
+        """
+        fields = getattr(genai.types.GenerationConfig, '__dataclass_fields__', {})
+        if 'response_mime_type' in fields:
+            return {'response_mime_type': 'application/json'}
+        return None
 
 # Global configuration instance
 gcp_config = GCPConfig()
\ No newline at end of file
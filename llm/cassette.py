@@ -0,0 +1,254 @@
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Iterator, Optional
+from utils.metrics import metrics
+from utils.logger import logger
+
+class CassetteMissError(KeyError):
+    """Raised when a prompt has no recorded response in replay mode"""
+
+class CassetteChunk:
+    """One streamed piece of a replayed response"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+class CassetteResponse:
+    """Replayed response with the same .text attribute as a Gemini response"""
+
+    def __init__(self, text: str, chunks: List[str] = None, delays: List[float] = None):
+        self.text = text
+        self._chunks = chunks
+        self._delays = delays or []
+
+    def __iter__(self) -> Iterator[CassetteChunk]:
+        chunks = self._chunks if self._chunks is not None else [self.text]
+        for i, chunk in enumerate(chunks):
+            if i < len(self._delays) and self._delays[i] > 0:
+                time.sleep(self._delays[i])
+            yield CassetteChunk(chunk)
+
+class LatencyModel:
+    """
+    Injected latency for replayed responses
+    Spec examples: 'none', 'recorded', 'fixed:800', 'uniform:200,1500',
+    'normal:900,200', 'lognormal:800,0.5' (median ms, sigma)
+    """
+
+    def __init__(self, spec: str = 'none', seed: int = 0):
+        self.spec = spec or 'none'
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        kind, _, params = self.spec.partition(':')
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params.split(',') if p.strip()]
+
+        expected = {'none': 0, 'recorded': 0, 'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"Invalid latency spec: {self.spec}")
+
+    def sample_ms(self, recorded_ms: float = 0.0) -> float:
+        """Get the next latency in milliseconds (deterministic for a given seed)"""
+        with self._lock:
+            if self.kind == 'none':
+                return 0.0
+            if self.kind == 'recorded':
+                return recorded_ms
+            if self.kind == 'fixed':
+                return self.params[0]
+            if self.kind == 'uniform':
+                return self._random.uniform(self.params[0], self.params[1])
+            if self.kind == 'normal':
+                return max(0.0, self._random.gauss(self.params[0], self.params[1]))
+            # lognormal: params are median in ms and sigma
+            return self._random.lognormvariate(math.log(max(self.params[0], 1e-9)), self.params[1])
+
+class Cassette:
+    """
+    File of recorded prompt/response interactions
+    Identical prompts are replayed in the order they were recorded
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._interactions = {}
+        self._cursors = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def make_key(model_name: str, prompt: Any, generation_config: Any = None) -> str:
+        """Stable key for a request; whitespace differences in the prompt are ignored"""
+        normalized_prompt = re.sub(r'\s+', ' ', str(prompt)).strip()
+        raw = json.dumps([model_name, normalized_prompt, generation_config], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def has(self, key: str) -> bool:
+        with self._lock:
+            return key in self._interactions
+
+    def next_interaction(self, key: str) -> Dict[str, Any]:
+        """Get the next recorded interaction for a key (cycles when exhausted)"""
+        with self._lock:
+            recorded = self._interactions.get(key)
+            if not recorded:
+                raise CassetteMissError(key)
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            return recorded[cursor % len(recorded)]
+
+    def record(self, interaction: Dict[str, Any]):
+        """Add an interaction and save the cassette file"""
+        with self._lock:
+            self._interactions.setdefault(interaction['key'], []).append(interaction)
+            self._save()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(items) for items in self._interactions.values())
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        for interaction in data.get('interactions', []):
+            self._interactions.setdefault(interaction['key'], []).append(interaction)
+        logger.info(f"✅ Cassette loaded with {len(data.get('interactions', []))} interactions: {self.path}")
+
+    def _save(self):
+        interactions = [item for items in self._interactions.values() for item in items]
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temp file first so a crash never leaves a half-written cassette
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': 1, 'interactions': interactions}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+class CassetteModel:
+    """
+    Drop-in replacement for a Gemini model that records and replays responses
+    Modes: 'replay' (never calls the network), 'record' (always calls the real
+    model and records) and 'replay_or_record' (records only cache misses)
+    """
+
+    MODES = ('replay', 'record', 'replay_or_record')
+
+    def __init__(self, cassette: Cassette, model_name: str, mode: str = 'replay',
+                 inner_model: Any = None, latency: LatencyModel = None, generation_config: Dict[str, Any] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode != 'replay' and inner_model is None:
+            raise ValueError(f"Cassette mode '{mode}' needs a real model to record from")
+
+        self.cassette = cassette
+        self.model_name = model_name
+        self.mode = mode
+        self.inner_model = inner_model
+        self.latency = latency or LatencyModel('none')
+        
+        # Default generation config of this model; part of every cassette key
+        self.generation_config = generation_config or {}
+
+    def generate_content(self, prompt: Any, stream: bool = False, generation_config: Any = None, **kwargs):
+        """Same call shape as genai.GenerativeModel.generate_content"""
+        effective_config = {**self.generation_config, **(generation_config or {})} or None
+        key = Cassette.make_key(self.model_name, prompt, effective_config)
+
+        if self.mode == 'record' or (self.mode == 'replay_or_record' and not self.cassette.has(key)):
+            return self._record(key, prompt, stream, generation_config, **kwargs)
+
+        try:
+            interaction = self.cassette.next_interaction(key)
+        except CassetteMissError:
+            metrics.increment('llm.cassette.misses')
+            logger.error(f"❌ No recorded response for prompt (key {key[:12]})")
+            raise
+
+        metrics.increment('llm.cassette.hits')
+        return self._replay(interaction, stream)
+
+    def _record(self, key: str, prompt: Any, stream: bool, generation_config: Any, **kwargs):
+        call_kwargs = dict(kwargs)
+        if generation_config is not None:
+            call_kwargs['generation_config'] = generation_config
+
+        start = time.perf_counter()
+        first_chunk_ms = None
+        if stream:
+            chunks = []
+            for chunk in self.inner_model.generate_content(prompt, stream=True, **call_kwargs):
+                if first_chunk_ms is None:
+                    first_chunk_ms = (time.perf_counter() - start) * 1000
+                chunks.append(_chunk_text(chunk))
+            text = ''.join(chunks)
+        else:
+            text = self.inner_model.generate_content(prompt, **call_kwargs).text
+            chunks = None
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        self.cassette.record({
+            'key': key,
+            'model': self.model_name,
+            'prompt': str(prompt),
+            'generation_config': {**self.generation_config, **(generation_config or {})} or None,
+            'response_text': text,
+            'chunks': chunks,
+            'latency_ms': round(latency_ms, 1),
+            'first_chunk_ms': round(first_chunk_ms, 1) if first_chunk_ms is not None else None,
+            'recorded_at': datetime.now().isoformat()
+        })
+        metrics.increment('llm.cassette.recorded')
+
+        return CassetteResponse(text, chunks if stream else None)
+
+    def _replay(self, interaction: Dict[str, Any], stream: bool) -> CassetteResponse:
+        text = interaction['response_text']
+        delay_s = self.latency.sample_ms(interaction.get('latency_ms') or 0.0) / 1000
+
+        if not stream:
+            if delay_s > 0:
+                time.sleep(delay_s)
+            return CassetteResponse(text)
+
+        chunks = interaction.get('chunks') or _split_text(text)
+
+        # Spend part of the latency before the first chunk and spread the rest
+        first_share = 0.2
+        if interaction.get('first_chunk_ms') and interaction.get('latency_ms'):
+            first_share = min(1.0, interaction['first_chunk_ms'] / interaction['latency_ms'])
+        rest = delay_s * (1 - first_share) / max(1, len(chunks) - 1)
+        delays = [delay_s * first_share] + [rest] * (len(chunks) - 1)
+
+        return CassetteResponse(text, chunks, delays)
+
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+def get_cassette(path: str) -> Cassette:
+    """Get the shared Cassette for a file so all agents record into one place"""
+    with _cassettes_lock:
+        key = os.path.abspath(path)
+        if key not in _cassettes:
+            _cassettes[key] = Cassette(path)
+        return _cassettes[key]
+
+def _chunk_text(chunk: Any) -> str:
+    try:
+        return chunk.text
+    except (ValueError, AttributeError):
+        return ''
+
+def _split_text(text: str, size: int = 64) -> List[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)] or ['']
@@ -0,0 +1,82 @@
+import json
+import os
+import threading
+from typing import Dict, Any
+from config.gcp_config import gcp_config
+from utils.metrics import metrics
+from utils.logger import logger
+
+class ModelCreationError(RuntimeError):
+    """No model client could be created (e.g. no API key)"""
+
+class ModelRegistry:
+    """
+    Shared, lazily created model clients
+    One model per agent, created on first use; all of them reuse the same
+    underlying API connection configured by gcp_config
+    """
+
+    def __init__(self, config=gcp_config):
+        self.config = config
+        self._models = {}
+        self._generation_configs = self._load_generation_configs()
+        self._lock = threading.Lock()
+
+    def get_model(self, agent_name: str = 'default'):
+        """Get the model for an agent, creating it on the first call"""
+        model = self._models.get(agent_name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            model = self._models.get(agent_name)
+            if model is None:
+                model = self.config.get_model(self._generation_configs.get(agent_name))
+                if model is None:
+                    raise ModelCreationError(f"Could not create model for {agent_name}")
+
+                self._models[agent_name] = model
+                metrics.increment('llm.models_created')
+                logger.info(f"✅ Model client ready for {agent_name}")
+        return model
+
+    def set_model(self, agent_name: str, model: Any):
+        """Use a specific model for an agent (None goes back to lazy creation)"""
+        with self._lock:
+            if model is None:
+                self._models.pop(agent_name, None)
+            else:
+                self._models[agent_name] = model
+
+    def set_generation_config(self, agent_name: str, generation_config: Dict[str, Any]):
+        """Set an agent's generation config; its model is rebuilt on next use"""
+        with self._lock:
+            self._generation_configs[agent_name] = generation_config
+            self._models.pop(agent_name, None)
+
+    def get_generation_config(self, agent_name: str) -> Dict[str, Any]:
+        return dict(self._generation_configs.get(agent_name) or {})
+
+    def loaded_agents(self) -> list:
+        """Names of agents whose model has been created"""
+        with self._lock:
+            return list(self._models)
+
+    def reset(self):
+        """Drop all created models"""
+        with self._lock:
+            self._models.clear()
+
+    def _load_generation_configs(self) -> Dict[str, Dict[str, Any]]:
+        """Per-agent generation configs, e.g. LLM_GENERATION_CONFIGS='{"mcq_agent": {"temperature": 0.7}}'"""
+        raw = os.getenv('LLM_GENERATION_CONFIGS')
+        if not raw:
+            return {}
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError as e:
+            logger.error(f"❌ Invalid LLM_GENERATION_CONFIGS: {e}")
+            return {}
+
+# Global model registry
+model_registry = ModelRegistry()
@@ -0,0 +1,237 @@
+import contextvars
+import fcntl
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+from utils.metrics import metrics
+from utils.logger import logger
+
+INTERACTIVE = 'interactive'
+ONBOARDING = 'onboarding'
+BATCH = 'batch'
+
+# Share of model calls each class gets when all of them are waiting
+PRIORITY_WEIGHTS = {INTERACTIVE: 6, ONBOARDING: 3, BATCH: 1}
+
+class RateLimitTimeoutError(TimeoutError):
+    """No model call slot became free within the allowed wait"""
+
+# Priority class of the model calls made by the current request or job
+_call_priority = contextvars.ContextVar('call_priority', default=INTERACTIVE)
+
+@contextmanager
+def call_priority(priority: str):
+    """Run a block whose model calls belong to a priority class"""
+    if priority not in PRIORITY_WEIGHTS:
+        raise ValueError(f"Unknown priority class: {priority}")
+    token = _call_priority.set(priority)
+    try:
+        yield
+    finally:
+        _call_priority.reset(token)
+
+def with_priority(priority: str):
+    """Decorator form of call_priority for workflow methods"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with call_priority(priority):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def current_priority() -> str:
+    return _call_priority.get()
+
+class TokenBucket:
+    """In-process token bucket"""
+
+    def __init__(self, rate_per_s: float, capacity: float):
+        self.rate_per_s = rate_per_s
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def try_take(self) -> bool:
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def time_until_token(self) -> float:
+        self._refill()
+        return max(0.0, (1 - self._tokens) / self.rate_per_s)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_s)
+        self._updated = now
+
+class FileTokenBucket:
+    """
+    Token bucket kept in a small locked file so several worker processes
+    on the same host (or a shared volume) draw from one quota
+    """
+
+    def __init__(self, path: str, rate_per_s: float, capacity: float):
+        self.path = path
+        self.rate_per_s = rate_per_s
+        self.capacity = capacity
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def try_take(self) -> bool:
+        return self._update(take=True)
+
+    def time_until_token(self) -> float:
+        tokens = self._read_tokens()
+        return max(0.0, (1 - tokens) / self.rate_per_s)
+
+    def _read_tokens(self) -> float:
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_SH)
+            try:
+                tokens, _ = self._refilled(f)
+                return tokens
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _update(self, take: bool) -> bool:
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                tokens, now = self._refilled(f)
+                taken = take and tokens >= 1
+                if taken:
+                    tokens -= 1
+                f.seek(0)
+                f.truncate()
+                json.dump({'tokens': tokens, 'updated': now}, f)
+                f.flush()
+                return taken
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refilled(self, f):
+        f.seek(0)
+        raw = f.read()
+        now = time.time()
+        try:
+            state = json.loads(raw)
+            elapsed = max(0.0, now - state['updated'])
+            tokens = min(self.capacity, state['tokens'] + elapsed * self.rate_per_s)
+        except (json.JSONDecodeError, KeyError):
+            tokens = self.capacity
+        return tokens, now
+
+class RateLimiter:
+    """
+    Admission control for model calls
+    Waiters queue per priority class (FIFO inside a class); free tokens go to
+    the classes by weighted fair share, so batch work keeps moving but can
+    never starve interactive users
+    """
+
+    def __init__(self, rate_per_s: float = None, burst: float = None, shared_file: str = None):
+        self.enabled = bool(rate_per_s)
+        self._queues = {priority: deque() for priority in PRIORITY_WEIGHTS}
+        self._passes = {priority: 0.0 for priority in PRIORITY_WEIGHTS}
+        self._cond = threading.Condition()
+
+        if self.enabled:
+            capacity = burst or max(1.0, rate_per_s)
+            if shared_file:
+                self._bucket = FileTokenBucket(shared_file, rate_per_s, capacity)
+            else:
+                self._bucket = TokenBucket(rate_per_s, capacity)
+
+    @classmethod
+    def from_env(cls) -> 'RateLimiter':
+        rate = float(os.getenv('LLM_RATE_LIMIT_RPS', '0'))
+        burst = float(os.getenv('LLM_RATE_LIMIT_BURST', '0')) or None
+        shared_file = os.getenv('LLM_RATE_LIMIT_SHARED_FILE') or None
+        if rate:
+            logger.info(f"✅ Model rate limit: {rate}/s (burst {burst or max(1.0, rate)})")
+        return cls(rate, burst, shared_file)
+
+    def acquire(self, priority: str = None, timeout: float = None) -> float:
+        """
+        Wait for permission to make one model call
+        Returns the seconds spent waiting; raises RateLimitTimeoutError on timeout
+        """
+        if not self.enabled:
+            return 0.0
+
+        priority = priority or current_priority()
+        ticket = object()
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+
+        with self._cond:
+            queue = self._queues[priority]
+            if not queue:
+                # A class returning from idle doesn't get credit for the time it was away
+                self._passes[priority] = max(self._passes[priority], self._min_active_pass())
+            queue.append(ticket)
+            self._update_depth(priority)
+
+            try:
+                while True:
+                    if self._next_class() == priority and queue[0] is ticket and self._bucket.try_take():
+                        queue.popleft()
+                        self._passes[priority] += 1.0 / PRIORITY_WEIGHTS[priority]
+                        self._cond.notify_all()
+                        break
+
+                    wait_s = min(self._bucket.time_until_token(), 0.5) or 0.01
+                    if deadline is not None:
+                        left = deadline - time.monotonic()
+                        if left <= 0:
+                            queue.remove(ticket)
+                            self._cond.notify_all()
+                            metrics.increment(f'llm.rate_limiter.timeouts.{priority}')
+                            raise RateLimitTimeoutError(f"No model call slot for {priority} within {timeout:.1f}s")
+                        wait_s = min(wait_s, left)
+                    self._cond.wait(wait_s)
+            finally:
+                self._update_depth(priority)
+
+        waited = time.monotonic() - start
+        metrics.observe(f'llm.rate_limiter.wait_ms.{priority}', waited * 1000)
+        metrics.increment(f'llm.rate_limiter.admitted.{priority}')
+        return waited
+
+    def try_acquire(self, priority: str = None) -> bool:
+        """Take a token only if one is free and nobody is queued (used for hedges)"""
+        if not self.enabled:
+            return True
+        with self._cond:
+            if any(self._queues.values()):
+                return False
+            return self._bucket.try_take()
+
+    def queue_depths(self) -> Dict[str, int]:
+        with self._cond:
+            return {priority: len(queue) for priority, queue in self._queues.items()}
+
+    def _next_class(self) -> Optional[str]:
+        """Waiting class with the lowest virtual time (stride scheduling)"""
+        waiting = [priority for priority, queue in self._queues.items() if queue]
+        if not waiting:
+            return None
+        return min(waiting, key=lambda priority: (self._passes[priority], -PRIORITY_WEIGHTS[priority]))
+
+    def _min_active_pass(self) -> float:
+        active = [self._passes[priority] for priority, queue in self._queues.items() if queue]
+        return min(active) if active else max(self._passes.values())
+
+    def _update_depth(self, priority: str):
+        metrics.set_gauge(f'llm.rate_limiter.queue_depth.{priority}', len(self._queues[priority]))
+
+# Global rate limiter shared by every agent's model calls
+rate_limiter = RateLimiter.from_env()
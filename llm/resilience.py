@@ -0,0 +1,340 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+from llm.client import model_registry, ModelCreationError
+from llm.rate_limiter import rate_limiter, RateLimitTimeoutError
+from utils.metrics import metrics
+from utils.tracing import tracer
+from utils.logger import logger
+
+class ModelUnavailableError(RuntimeError):
+    """The model call was not made or did not finish in time"""
+
+class CircuitOpenError(ModelUnavailableError):
+    """The circuit breaker is open, so the upstream is not being called"""
+
+class DeadlineExceededError(ModelUnavailableError, TimeoutError):
+    """The call ran out of time budget"""
+
+# Returned by next() when a stream has no more chunks
+_END_OF_STREAM = object()
+
+# Absolute deadline (time.monotonic()) of the inbound request being served
+_request_deadline = contextvars.ContextVar('request_deadline', default=None)
+
+def set_request_deadline(budget_s: float):
+    """Start a time budget for the current request; returns a token for reset_request_deadline"""
+    return _request_deadline.set(time.monotonic() + budget_s)
+
+def reset_request_deadline(token):
+    _request_deadline.reset(token)
+
+@contextmanager
+def request_deadline(budget_s: float):
+    """Run a block with a time budget that all model calls inside it respect"""
+    token = set_request_deadline(budget_s)
+    try:
+        yield
+    finally:
+        reset_request_deadline(token)
+
+def remaining_time() -> Optional[float]:
+    """Seconds left in the current request budget (None if there is no budget)"""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+class ResiliencePolicy:
+    """Per-agent settings for model calls"""
+
+    def __init__(self, timeout_s: float = 30.0, failure_threshold: int = 5, reset_timeout_s: float = 30.0,
+                 hedge: bool = False, hedge_percentile: float = 95.0, hedge_min_delay_s: float = 0.5,
+                 hedge_min_samples: int = 20, cache_size: int = 256):
+        self.timeout_s = timeout_s
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay_s = hedge_min_delay_s
+        self.hedge_min_samples = hedge_min_samples
+        self.cache_size = cache_size
+
+    @classmethod
+    def for_agent(cls, agent_name: str) -> 'ResiliencePolicy':
+        """
+        Load the policy for an agent from LLM_RESILIENCE_CONFIG, for example
+        '{"default": {"timeout_s": 20}, "mcq_agent": {"hedge": true}}'
+        """
+        settings = {}
+        raw = os.getenv('LLM_RESILIENCE_CONFIG')
+        if raw:
+            try:
+                config = json.loads(raw)
+                settings.update(config.get('default', {}))
+                settings.update(config.get(agent_name, {}))
+            except json.JSONDecodeError as e:
+                logger.error(f"❌ Invalid LLM_RESILIENCE_CONFIG: {e}")
+        return cls(**settings)
+
+class CircuitBreaker:
+    """
+    Trips open after consecutive failures, then lets one trial call
+    through (half-open) once the reset timeout has passed
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout_s: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Should a call be attempted right now?"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout_s:
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+            if self.state != self.CLOSED:
+                logger.info(f"✅ Circuit closed again for {self.name}")
+                self._set_state(self.CLOSED)
+
+    def cancel_trial(self):
+        """The allowed call was never made (for example it was rate limited)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"⚠️  Circuit opened for {self.name} after {self.consecutive_failures} failures")
+                    metrics.increment(f'llm.{self.name}.circuit_trips')
+                self.opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+    def _set_state(self, state: str):
+        self.state = state
+        metrics.set_gauge(f'llm.{self.name}.circuit_state', self.STATE_VALUES[state])
+
+class ResilientModel:
+    """
+    Wraps an agent's model with deadlines, a circuit breaker, an optional
+    hedged second attempt and a cache of last good responses
+    """
+
+    def __init__(self, agent_name: str, policy: ResiliencePolicy = None, executor: ThreadPoolExecutor = None):
+        self.agent_name = agent_name
+        self.policy = policy or ResiliencePolicy.for_agent(agent_name)
+        self.breaker = CircuitBreaker(agent_name, self.policy.failure_threshold, self.policy.reset_timeout_s)
+        self.executor = executor or _executor
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def generate_content(self, prompt: Any, **kwargs):
+        """Same call shape as genai.GenerativeModel.generate_content"""
+        with tracer.span('llm.generate_content', agent=self.agent_name, prompt_chars=len(str(prompt)),
+                         stream=bool(kwargs.get('stream'))) as span:
+            response = self._generate_content(prompt, kwargs)
+            if span.sampled and not kwargs.get('stream'):
+                span.set_attribute('response_chars', len(getattr(response, 'text', '') or ''))
+            return response
+
+    def _generate_content(self, prompt: Any, kwargs: Dict[str, Any]):
+        name = self.agent_name
+        cache_key = self._cache_key(prompt, kwargs)
+
+        if not self.breaker.allow():
+            metrics.increment(f'llm.{name}.circuit_open_rejections')
+            cached = self._cached_response(cache_key)
+            if cached is not None:
+                metrics.increment(f'llm.{name}.served_from_cache')
+                return cached
+            raise CircuitOpenError(f"Circuit open for {name}")
+
+        timeout = self._call_timeout()
+        if timeout <= 0:
+            self.breaker.cancel_trial()
+            metrics.increment(f'llm.{name}.deadline_exceeded')
+            raise DeadlineExceededError(f"No time budget left for {name}")
+        
+        # Wait for a slot under the global model quota; the wait uses up the budget
+        try:
+            timeout -= rate_limiter.acquire(timeout=timeout)
+        except RateLimitTimeoutError as e:
+            self.breaker.cancel_trial()
+            metrics.increment(f'llm.{name}.rate_limited')
+            raise DeadlineExceededError(str(e))
+
+        start = time.perf_counter()
+        metrics.increment(f'llm.{name}.calls')
+        try:
+            response = self._call_with_hedging(prompt, kwargs, timeout)
+        except DeadlineExceededError:
+            metrics.increment(f'llm.{name}.timeouts')
+            self.breaker.record_failure()
+            raise
+        except Exception:
+            metrics.increment(f'llm.{name}.failures')
+            self.breaker.record_failure()
+            raise
+
+        if kwargs.get('stream'):
+            # The chunks are still to come: time them and judge the call when the stream ends
+            return self._timed_stream(response, start)
+        metrics.observe(f'llm.{name}.latency_ms', (time.perf_counter() - start) * 1000)
+        self.breaker.record_success()
+        self._store_response(cache_key, response)
+        return response
+
+    def _timed_stream(self, response: Any, start: float):
+        """
+        Yield a streamed response's chunks, each read in the call pool within
+        the per-call timeout (capped by the request budget). A stalled or
+        failed stream counts against the circuit; one that ends, or that the
+        caller stops reading, counts as a success.
+        """
+        name = self.agent_name
+        chunks = iter(response)
+        try:
+            while True:
+                timeout = self._call_timeout()
+                if timeout <= 0:
+                    raise DeadlineExceededError(f"No time budget left to read the stream for {name}")
+                context = contextvars.copy_context()
+                future = self.executor.submit(context.run, next, chunks, _END_OF_STREAM)
+                try:
+                    chunk = future.result(timeout=timeout)
+                except FutureTimeoutError:
+                    raise DeadlineExceededError(f"Stream for {name} stalled for {timeout:.1f}s")
+                if chunk is _END_OF_STREAM:
+                    break
+                yield chunk
+        except GeneratorExit:
+            self.breaker.record_success()
+            raise
+        except DeadlineExceededError:
+            metrics.increment(f'llm.{name}.timeouts')
+            self.breaker.record_failure()
+            raise
+        except Exception:
+            metrics.increment(f'llm.{name}.failures')
+            self.breaker.record_failure()
+            raise
+        metrics.observe(f'llm.{name}.latency_ms', (time.perf_counter() - start) * 1000)
+        self.breaker.record_success()
+
+    def _call_timeout(self) -> float:
+        """Per-call timeout: the agent's limit, capped by the request budget"""
+        remaining = remaining_time()
+        if remaining is None:
+            return self.policy.timeout_s
+        return min(self.policy.timeout_s, remaining)
+
+    def _hedge_delay(self) -> Optional[float]:
+        """How long to wait before firing a second attempt (None means no hedging)"""
+        if not self.policy.hedge:
+            return None
+        latency_name = f'llm.{self.agent_name}.latency_ms'
+        if metrics.get_count(latency_name) < self.policy.hedge_min_samples:
+            return None
+        p_delay = metrics.percentile(latency_name, self.policy.hedge_percentile) / 1000
+        return max(self.policy.hedge_min_delay_s, p_delay)
+
+    def _call_with_hedging(self, prompt: Any, kwargs: Dict[str, Any], timeout: float):
+        deadline = time.monotonic() + timeout
+        futures = [self._submit(prompt, kwargs)]
+
+        hedge_delay = None if kwargs.get('stream') else self._hedge_delay()
+        if hedge_delay is not None and hedge_delay < timeout:
+            done, _ = wait(futures, timeout=hedge_delay)
+            if not done:
+                # The first attempt is slower than usual: race a second one,
+                # but only if the quota has a spare slot right now
+                if rate_limiter.try_acquire():
+                    metrics.increment(f'llm.{self.agent_name}.hedges_fired')
+                    futures.append(self._submit(prompt, kwargs))
+                else:
+                    metrics.increment(f'llm.{self.agent_name}.hedges_skipped')
+
+        pending = set(futures)
+        last_error = None
+        while pending:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            done, pending = wait(pending, timeout=left, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if len(futures) > 1 and future is futures[1]:
+                        metrics.increment(f'llm.{self.agent_name}.hedge_wins')
+                    return future.result()
+                last_error = future.exception()
+
+        if last_error is not None and not pending:
+            raise last_error
+        raise DeadlineExceededError(f"Model call for {self.agent_name} timed out after {timeout:.1f}s")
+
+    def _submit(self, prompt: Any, kwargs: Dict[str, Any]):
+        try:
+            model = model_registry.get_model(self.agent_name)
+        except ModelCreationError as e:
+            # Callers fall back the same way as when the model is down
+            raise ModelUnavailableError(str(e)) from e
+        context = contextvars.copy_context()
+        return self.executor.submit(context.run, model.generate_content, prompt, **kwargs)
+
+    def _cache_key(self, prompt: Any, kwargs: Dict[str, Any]) -> str:
+        return json.dumps([str(prompt), {k: v for k, v in kwargs.items() if k != 'stream'}], sort_keys=True, default=str)
+
+    def _cached_response(self, key: str):
+        with self._cache_lock:
+            return self._cache.get(key)
+
+    def _store_response(self, key: str, response: Any):
+        with self._cache_lock:
+            self._cache[key] = response
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.policy.cache_size:
+                self._cache.popitem(last=False)
+
+# Shared pool that runs model calls so request threads can stop waiting on time
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('LLM_MAX_CONCURRENT_CALLS', '32')),
+                               thread_name_prefix='llm-call')
+
+_resilient_models = {}
+_resilient_lock = threading.Lock()
+
+def get_resilient_model(agent_name: str) -> ResilientModel:
+    """Get the shared resilient wrapper for an agent's model"""
+    with _resilient_lock:
+        if agent_name not in _resilient_models:
+            _resilient_models[agent_name] = ResilientModel(agent_name)
+        return _resilient_models[agent_name]
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+SmartStudy AI - Nightly weekly reviews
+Builds and stores the weekly review of every active student, so reading a
+review is a lookup instead of a model call. Schedule it nightly (cron, a
+Cloud Run job) - students whose data hasn't changed are skipped.
+
+Example:
+    python materialize_reviews.py --processes 4
+"""
+
+import argparse
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add the current directory to Python path
+sys.path.append('.')
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialize every active student's weekly review")
+    parser.add_argument('--force', action='store_true', help="Rebuild every review, even if the data hasn't changed")
+    parser.add_argument('--processes', type=int, help="Worker processes for progress metrics (default: REVIEW_PROCESSES or the CPU count)")
+    parser.add_argument('--concurrency', type=int, help="Parallel model calls (default: REVIEW_MODEL_CONCURRENCY or 4)")
+    args = parser.parse_args()
+
+    from agents.coordinator import coordinator
+
+    materializer = coordinator.review_materializer
+    if args.processes is not None:
+        materializer.processes = args.processes
+    if args.concurrency is not None:
+        materializer.model_concurrency = max(1, args.concurrency)
+
+    print("🚀 Materializing weekly reviews...")
+    summary = materializer.run(force=args.force)
+
+    print(f"\n✅ {summary['materialized']} reviews materialized in {summary['elapsed_s']}s "
+          f"({summary['unchanged']} unchanged, {summary['inactive']} inactive of {summary['students']} students)")
+    if summary['failed']:
+        print(f"⚠️  {summary['failed']} reviews failed - see smart_study.log for details")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import Dict, List, Any
+from memory.memory_bank import memory_bank
+from tools.availability import availability_bits, encode_bits, decode_bits, free_hours
+from utils.logger import logger
+
+# Latest MCQ percentage below this makes a subject weak (as in the progress summary)
+WEAK_PERCENTAGE = 60
+
+class AvailabilityStore:
+    """
+    Each student's weekly free hours and weak subjects, for group matching
+    Free hours are kept as a hex string of WEEK_SLOTS bits derived from the
+    study plan's weekly timetable; weak subjects follow the latest MCQ score
+    of each subject. One small document per student.
+    """
+
+    def __init__(self, storage=memory_bank, collection: str = 'availability'):
+        self.storage = storage
+        self.collection = collection
+
+    def set_timetable(self, student_id: str, weekly_timetable: Dict[str, Any]) -> bool:
+        """Store the free hours of a new weekly timetable"""
+        try:
+            bits = availability_bits(weekly_timetable)
+            with self.storage.student_lock(student_id):
+                document = self.storage.load_document(self.collection, student_id)
+                if document.get('bits') == encode_bits(bits):
+                    # e.g. the plan was only enriched
+                    return True
+                document.update({
+                    'student_id': student_id,
+                    'bits': encode_bits(bits),
+                    'updated_at': datetime.now().isoformat()
+                })
+                return self.storage.save_document(self.collection, student_id, document)
+        except Exception as e:
+            logger.error(f"❌ Error saving availability for {student_id}: {e}")
+            return False
+
+    def record_scores(self, student_id: str, scores: List[tuple]) -> bool:
+        """Apply (subject, percentage, timestamp) MCQ scores; the latest score of a subject decides if it's weak"""
+        with self.storage.student_lock(student_id):
+            document = self.storage.load_document(self.collection, student_id)
+            latest = document.get('latest_mcq', {})
+            for subject, percentage, timestamp in scores:
+                if subject not in latest or timestamp >= latest[subject][1]:
+                    latest[subject] = [percentage, timestamp]
+            document.update({
+                'student_id': student_id,
+                'latest_mcq': latest,
+                'weak_subjects': sorted(subject for subject, (percentage, _) in latest.items()
+                                        if percentage < WEAK_PERCENTAGE),
+                'updated_at': datetime.now().isoformat()
+            })
+            return self.storage.save_document(self.collection, student_id, document)
+
+    def get(self, student_id: str) -> Dict[str, Any]:
+        """Free hours (packed bits) and weak subjects (empty if nothing is stored)"""
+        document = self.storage.load_document(self.collection, student_id)
+        if not document:
+            return {}
+        bits = decode_bits(document.get('bits'))
+        return {
+            'student_id': student_id,
+            'bits': bits,
+            'free_hours': free_hours(bits),
+            'weak_subjects': document.get('weak_subjects', [])
+        }
+
+# Global availability store
+availability_store = AvailabilityStore()
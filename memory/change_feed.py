@@ -0,0 +1,145 @@
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Tuple
+from utils.metrics import metrics
+from utils.logger import logger
+
+# First line of a compacted feed: the offset its first event has
+HEADER_KEY = 'feed_base'
+
+class ChangeFeed:
+    """
+    Append-only log of changes, shared by every worker on the same storage
+    Each event is one JSON line; its offset is the byte position of that
+    line, so consumers remember the next_offset they were given and tail
+    from there. Writers hold an exclusive lock (a file lock next to the log)
+    while appending. Once the log grows past max_bytes the oldest events are
+    dropped, keeping about half of it: the rewritten file starts with a
+    header line giving the offset of its first event, so the offsets of the
+    kept events don't change. A reader whose offset was dropped gets
+    offset_expired and the oldest offset still available.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 16 * 1024 * 1024):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._holder = threading.local()
+
+    @contextmanager
+    def locked(self):
+        """Hold the feed's write lock (across threads and processes)"""
+        with self._lock:
+            if getattr(self._holder, 'file', None) is not None:
+                # Re-entered by the same thread
+                yield
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.lock_path, 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                self._holder.file = f
+                try:
+                    yield
+                finally:
+                    self._holder.file = None
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def append(self, event: Dict[str, Any]) -> int:
+        """Add an event; returns its offset"""
+        with self.locked():
+            # Opened under the lock, so a compaction by another worker is always seen
+            with open(self.path, 'a+b') as f:
+                base, header = self._header(f)
+                end = f.seek(0, os.SEEK_END)
+                if end > header:
+                    f.seek(end - 1)
+                    if f.read(1) != b"\n":
+                        # A writer crashed mid-line: end that line so this event starts on its own
+                        f.write(b"\n")
+                        end += 1
+                f.write((json.dumps(dict(event, at=time.time()), default=str) + "\n").encode('utf-8'))
+                f.flush()
+                size = f.tell()
+            if self.max_bytes and size - header > self.max_bytes:
+                self._compact()
+            return base + end - header
+
+    def end_offset(self) -> int:
+        """Offset the next event will get"""
+        try:
+            with open(self.path, 'rb') as f:
+                base, header = self._header(f)
+                return base + f.seek(0, os.SEEK_END) - header
+        except FileNotFoundError:
+            return 0
+
+    def read(self, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """
+        Up to limit events from offset on, and the offset to continue from
+        offset_expired is True if events from offset on were already dropped;
+        next_offset is then the oldest offset still in the feed.
+        """
+        events = []
+        next_offset = offset
+        try:
+            with open(self.path, 'rb') as f:
+                base, header = self._header(f)
+                if offset < base:
+                    metrics.increment('feeds.offsets_expired')
+                    return {'events': [], 'next_offset': base, 'offset_expired': True}
+                f.seek(header + offset - base)
+                while len(events) < limit:
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        # Nothing more, or a line still being written
+                        break
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        logger.warning(f"⚠️  Skipping unreadable change feed entry at offset {next_offset}")
+                    else:
+                        event['offset'] = next_offset
+                        events.append(event)
+                    next_offset += len(line)
+        except FileNotFoundError:
+            pass
+        return {'events': events, 'next_offset': next_offset, 'offset_expired': False}
+
+    def _compact(self):
+        """Drop the oldest events, keeping about max_bytes / 2 (call with the lock held)"""
+        with open(self.path, 'rb') as f:
+            base, header = self._header(f)
+            size = f.seek(0, os.SEEK_END)
+            cut = size - self.max_bytes // 2
+            if cut <= header:
+                return
+            # Keep whole lines only: the kept part starts after the next newline
+            f.seek(cut - 1)
+            f.readline()
+            start = f.tell()
+            new_base = base + start - header
+            tail = f.read()
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write((json.dumps({HEADER_KEY: new_base}) + "\n").encode('utf-8'))
+            f.write(tail)
+        os.replace(tmp_path, self.path)
+        metrics.increment('feeds.compactions')
+        logger.info(f"🧹 Compacted change feed {self.path}: events before offset {new_base} dropped")
+
+    @staticmethod
+    def _header(f) -> Tuple[int, int]:
+        """(offset of the first event, bytes taken by the header line) of an open feed file"""
+        f.seek(0)
+        first = f.readline()
+        if first.startswith(b'{"' + HEADER_KEY.encode('utf-8') + b'"') and first.endswith(b"\n"):
+            return json.loads(first)[HEADER_KEY], len(first)
+        return 0, 0
@@ -0,0 +1,79 @@
+import json
+import os
+import shutil
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Iterator, Tuple
+from memory.memory_bank import memory_bank
+from utils.logger import logger
+
+def day_of(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).date().isoformat()
+
+class DueWheel:
+    """
+    Day-bucketed index of upcoming due dates for all students
+    Each day is a directory holding one small append-only file per student
+    with a (topic, due) line per scheduled item. Scheduling is one append;
+    reading a day touches only the students with something due that day,
+    one at a time, so the cost follows the items due rather than the number
+    of students. Entries are never rewritten: a topic that moved is simply
+    appended to its new day, and readers check it is still due.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def schedule(self, student_id: str, topic: str, due: float):
+        """Add an item to the bucket of the day it is due"""
+        self.schedule_on(day_of(due), student_id, topic, due)
+
+    def schedule_on(self, day: str, student_id: str, topic: str, due: float):
+        """Add an item to a given day's bucket (e.g. carried over from the day before)"""
+        directory = os.path.join(self.path, day)
+        line = json.dumps({'topic': topic, 'due': due}) + "\n"
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"{student_id}.jsonl"), 'a') as f:
+                f.write(line)
+
+    def students_due(self, day: str) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """(student_id, items) for every student with items in a day's bucket, streamed"""
+        directory = os.path.join(self.path, day)
+        if not os.path.isdir(directory):
+            return
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.jsonl'):
+                    continue
+                items = []
+                with open(entry.path) as f:
+                    for line in f:
+                        try:
+                            items.append(json.loads(line))
+                        except ValueError:
+                            # A line cut short by a crash
+                            logger.warning(f"⚠️  Skipping unreadable due entry in {entry.path}")
+                yield entry.name[:-len('.jsonl')], items
+
+    def days(self) -> List[str]:
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(name for name in os.listdir(self.path) if os.path.isdir(os.path.join(self.path, name)))
+
+    def drop_before(self, day: str) -> int:
+        """Delete the buckets of days before day; returns how many were deleted"""
+        dropped = 0
+        for bucket in self.days():
+            if bucket < day:
+                shutil.rmtree(os.path.join(self.path, bucket), ignore_errors=True)
+                dropped += 1
+        return dropped
+
+    @staticmethod
+    def next_day(day: str) -> str:
+        return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+# Global due-date wheel
+due_wheel = DueWheel(os.path.join(memory_bank.storage_path, 'due_wheel'))
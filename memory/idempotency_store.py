@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Callable, Tuple
+from memory.memory_bank import memory_bank
+from utils.metrics import metrics
+from utils.logger import logger
+
+class IdempotencyConflictError(ValueError):
+    """An idempotency key was reused with a different request body"""
+
+def request_fingerprint(data: Any) -> str:
+    raw = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+class IdempotencyStore:
+    """
+    Remembers the response to each idempotency key for ttl_s
+    A retry with the same key gets the stored response instead of running the
+    work again; a retry that arrives while the first attempt is still running
+    waits for it. Responses are kept in the memory bank, so a retry that
+    lands after a restart is still answered. Failed attempts are not stored.
+    """
+
+    def __init__(self, ttl_s: float = 86400.0, sweep_interval_s: float = 3600.0, storage=memory_bank,
+                 collection: str = 'idempotency'):
+        self.ttl_s = ttl_s
+        self.sweep_interval_s = sweep_interval_s
+        self.storage = storage
+        self.collection = collection
+        self._in_flight = {}
+        self._last_sweep = time.time()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'IdempotencyStore':
+        return cls(ttl_s=float(os.getenv('IDEMPOTENCY_TTL_S', '86400')))
+
+    def run(self, scope: str, key: str, fingerprint: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run func once per (scope, key); returns (response, replayed)
+        Raises IdempotencyConflictError if the key was used for a different request
+        """
+        self.expire_stale()
+        doc_id = self._doc_id(scope, key)
+        while True:
+            stored = self._load(doc_id)
+            if stored:
+                if stored['fingerprint'] != fingerprint:
+                    metrics.increment(f'idempotency.{scope}.conflicts')
+                    raise IdempotencyConflictError(f"Idempotency key '{key}' was already used for a different request")
+                metrics.increment('idempotency.replayed')
+                metrics.increment(f'idempotency.{scope}.replayed')
+                logger.info(f"♻️ Replayed stored response for idempotency key {key}")
+                return stored['response'], True
+
+            with self._lock:
+                waiter = self._in_flight.get(doc_id)
+                if waiter is None:
+                    # This caller does the work; retries wait for its response
+                    self._in_flight[doc_id] = threading.Event()
+                    break
+            waiter.wait()
+
+        try:
+            response = func()
+            if response:
+                self.storage.save_document(self.collection, doc_id, {
+                    'scope': scope,
+                    'key': key,
+                    'fingerprint': fingerprint,
+                    'response': response,
+                    'created_at': time.time()
+                })
+            return response, False
+        finally:
+            with self._lock:
+                self._in_flight.pop(doc_id).set()
+
+    def expire_stale(self, force: bool = False) -> int:
+        """Delete stored responses older than the TTL (at most once per sweep interval unless forced)"""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_sweep < self.sweep_interval_s:
+                return 0
+            self._last_sweep = now
+
+        expired = 0
+        for doc_id in self.storage.list_documents(self.collection):
+            stored = self.storage.load_document(self.collection, doc_id)
+            if stored and self._is_expired(stored) and self.storage.delete_document(self.collection, doc_id):
+                expired += 1
+        if expired:
+            logger.info(f"🧹 Expired {expired} idempotency records")
+        return expired
+
+    def _load(self, doc_id: str) -> Dict[str, Any]:
+        stored = self.storage.load_document(self.collection, doc_id)
+        if not stored or self._is_expired(stored):
+            return {}
+        return stored
+
+    def _is_expired(self, stored: Dict[str, Any]) -> bool:
+        return time.time() - stored.get('created_at', 0) > self.ttl_s
+
+    @staticmethod
+    def _doc_id(scope: str, key: str) -> str:
+        # Keys come from clients, so they never become file names directly
+        return hashlib.sha1(f"{scope}:{key}".encode('utf-8')).hexdigest()
+
+# Global idempotency store
+idempotency_store = IdempotencyStore.from_env()
@@ -0,0 +1,107 @@
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Any
+from memory.memory_bank import memory_bank
+from utils.logger import logger
+
+def fingerprint_question(mcq: Any) -> str:
+    """
+    Fingerprint of a question's normalized text
+    Unicode forms, case, spacing and a trailing '?' or '.' don't change the
+    fingerprint; every other character (operators, symbols, any script) does
+    """
+    text = mcq.get('question', '') if isinstance(mcq, dict) else str(mcq)
+    normalized = re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', text).casefold()).strip()
+    normalized = re.sub(r'\s*[?.!。？！]+$', '', normalized)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+def normalize_topic(topic: str) -> str:
+    return re.sub(r'\s+', ' ', topic.strip().lower())
+
+class MCQHistoryIndex:
+    """
+    Per-student, per-topic set of question fingerprints
+    Stored in the 'mcq_history' section of each student's memory file. The
+    last cache_size students are cached in memory and checked against the
+    file's signature on every read, so writes from other workers are seen;
+    updates re-read the file under the student's lock and merge into it.
+    """
+
+    def __init__(self, max_per_topic: int = 500, cache_size: int = 1024):
+        self.max_per_topic = max_per_topic
+        self.cache_size = max(1, cache_size)
+        self._history = OrderedDict()
+        self._lock = threading.Lock()
+
+    def has_seen(self, student_id: str, topic: str, mcq: Any) -> bool:
+        return fingerprint_question(mcq) in self._load(student_id).get(normalize_topic(topic), {})
+
+    def filter_unseen(self, student_id: str, topic: str, mcqs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep only questions the student has not seen (and no repeats within the list)"""
+        unseen = []
+        in_batch = set()
+        seen = self._load(student_id).get(normalize_topic(topic), {})
+        for mcq in mcqs:
+            fingerprint = fingerprint_question(mcq)
+            if fingerprint not in seen and fingerprint not in in_batch:
+                in_batch.add(fingerprint)
+                unseen.append(mcq)
+        return unseen
+
+    def mark_served(self, student_id: str, topic: str, mcqs: List[Dict[str, Any]]):
+        """Record questions as seen by the student and persist the index"""
+        if not mcqs:
+            return
+
+        with memory_bank.student_lock(student_id):
+            # Start from the stored history, which another worker may have just updated
+            student_history = self._read(student_id)
+            fingerprints = student_history.setdefault(normalize_topic(topic), {})
+            for mcq in mcqs:
+                # dict keeps insertion order, so the oldest entries are dropped first
+                fingerprint = fingerprint_question(mcq)
+                fingerprints.pop(fingerprint, None)
+                fingerprints[fingerprint] = None
+            while len(fingerprints) > self.max_per_topic:
+                fingerprints.pop(next(iter(fingerprints)))
+
+            stored = {topic_key: list(items) for topic_key, items in student_history.items()}
+            if memory_bank.save_memory_section(student_id, 'mcq_history', stored):
+                self._remember(student_id, memory_bank.memory_signature(student_id), student_history)
+        logger.info(f"✅ MCQ history updated for {student_id} in {topic}")
+
+    def seen_count(self, student_id: str, topic: str) -> int:
+        return len(self._load(student_id).get(normalize_topic(topic), {}))
+
+    def _load(self, student_id: str) -> Dict[str, Dict[str, None]]:
+        """A student's history, from the cache while the memory file hasn't changed"""
+        signature = memory_bank.memory_signature(student_id)
+        with self._lock:
+            cached = self._history.get(student_id)
+            if cached and cached[0] == signature:
+                self._history.move_to_end(student_id)
+                return cached[1]
+
+        with memory_bank.student_lock(student_id):
+            # Signature first: a save landing after it just makes the next read reload
+            signature = memory_bank.memory_signature(student_id)
+            history = self._read(student_id)
+        self._remember(student_id, signature, history)
+        return history
+
+    def _read(self, student_id: str) -> Dict[str, Dict[str, None]]:
+        stored = memory_bank.load_memory_section(student_id, 'mcq_history', {}) or {}
+        return {topic: dict.fromkeys(items) for topic, items in stored.items()}
+
+    def _remember(self, student_id: str, signature, history: Dict[str, Dict[str, None]]):
+        with self._lock:
+            self._history[student_id] = (signature, history)
+            self._history.move_to_end(student_id)
+            while len(self._history) > self.cache_size:
+                self._history.popitem(last=False)
+
+# Global MCQ history index
+mcq_history = MCQHistoryIndex()
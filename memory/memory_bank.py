@@ -1,7 +1,11 @@
 import json
 import os
-from typing import Dict, List, Any
+import tempfile
+import threading
+import weakref
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
+from utils.tracing import traced, tracer
 from utils.logger import logger
 
 class MemoryBank:
@@ -9,6 +13,9 @@ class MemoryBank:
     
     def __init__(self, storage_path: str = "./memory_data/"):
         self.storage_path = storage_path
+        # A student's lock lives only while someone holds or waits for it
+        self._locks = weakref.WeakValueDictionary()
+        self._locks_lock = threading.Lock()
         self._ensure_storage_path()
         logger.info("✅ Memory Bank initialized")
     
@@ -16,34 +23,64 @@ class MemoryBank:
         """Create storage directory if it doesn't exist"""
         os.makedirs(self.storage_path, exist_ok=True)
     
+    def _student_lock(self, student_id: str) -> threading.RLock:
+        """Lock for one student's file, so concurrent section updates don't overwrite each other"""
+        with self._locks_lock:
+            lock = self._locks.get(student_id)
+            if lock is None:
+                lock = threading.RLock()
+                self._locks[student_id] = lock
+            return lock
+    
+    def student_lock(self, student_id: str) -> threading.RLock:
+        """Hold while reading and rewriting a student's data so no other update lands in between"""
+        return self._student_lock(student_id)
+    
+    def _write_json(self, file_path: str, data: Any) -> int:
+        """Write JSON to a temp file and rename it into place, so readers never see half a file; returns bytes written"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, indent=2)
+                written = f.tell()
+            os.replace(tmp_path, file_path)
+            return written
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    @traced('memory.save_student_memory')
     def save_student_memory(self, student_id: str, memory_data: Dict[str, Any]):
         """Save student learning patterns to long-term memory"""
-        try:
-            file_path = os.path.join(self.storage_path, f"{student_id}_memory.json")
+        with self._student_lock(student_id):
+            try:
+                file_path = os.path.join(self.storage_path, f"{student_id}_memory.json")
             
-            # Load existing memory if exists
-            existing_data = {}
-            if os.path.exists(file_path):
-                with open(file_path, 'r') as f:
-                    existing_data = json.load(f)
+                # Load existing memory if exists
+                existing_data = {}
+                if os.path.exists(file_path):
+                    with open(file_path, 'r') as f:
+                        existing_data = json.load(f)
             
-            # Update with new data
-            existing_data.update({
-                'last_updated': datetime.now().isoformat(),
-                'learning_data': memory_data
-            })
+                # Update with new data
+                existing_data.update({
+                    'last_updated': datetime.now().isoformat(),
+                    'learning_data': memory_data
+                })
             
-            # Save to file
-            with open(file_path, 'w') as f:
-                json.dump(existing_data, f, indent=2)
+                # Save to file
+                written = self._write_json(file_path, existing_data)
+                tracer.set_attributes(student_id=student_id, bytes_written=written)
             
-            logger.info(f"✅ Memory saved for student {student_id}")
-            return True
+                logger.info(f"✅ Memory saved for student {student_id}")
+                return True
             
-        except Exception as e:
-            logger.error(f"❌ Error saving memory: {e}")
-            return False
+            except Exception as e:
+                logger.error(f"❌ Error saving memory: {e}")
+                return False
     
+    @traced('memory.load_student_memory')
     def load_student_memory(self, student_id: str) -> Dict[str, Any]:
         """Load student learning patterns from long-term memory"""
         try:
@@ -52,6 +89,7 @@ class MemoryBank:
             if os.path.exists(file_path):
                 with open(file_path, 'r') as f:
                     memory_data = json.load(f)
+                    tracer.set_attributes(student_id=student_id, bytes_read=f.tell())
                 logger.info(f"✅ Memory loaded for student {student_id}")
                 return memory_data
             else:
@@ -62,24 +100,145 @@ class MemoryBank:
             logger.error(f"❌ Error loading memory: {e}")
             return {}
     
+    @traced('memory.save_memory_section')
+    def save_memory_section(self, student_id: str, section: str, section_data: Any):
+        """Save one named section (e.g. 'mcq_history') of a student's memory file"""
+        with self._student_lock(student_id):
+            try:
+                file_path = os.path.join(self.storage_path, f"{student_id}_memory.json")
+            
+                existing_data = {}
+                if os.path.exists(file_path):
+                    with open(file_path, 'r') as f:
+                        existing_data = json.load(f)
+            
+                existing_data[section] = section_data
+                existing_data['last_updated'] = datetime.now().isoformat()
+            
+                written = self._write_json(file_path, existing_data)
+                tracer.set_attributes(student_id=student_id, section=section, bytes_written=written)
+            
+                logger.info(f"✅ Memory section '{section}' saved for student {student_id}")
+                return True
+            
+            except Exception as e:
+                logger.error(f"❌ Error saving memory section: {e}")
+                return False
+    
+    def list_students(self) -> List[str]:
+        """IDs of all students with a memory file"""
+        suffix = '_memory.json'
+        return sorted(name[:-len(suffix)] for name in os.listdir(self.storage_path) if name.endswith(suffix))
+    
+    def load_memory_section(self, student_id: str, section: str, default: Any = None) -> Any:
+        """Load one named section of a student's memory file"""
+        return self.load_student_memory(student_id).get(section, default)
+    
+    @traced('memory.save_document')
+    def save_document(self, collection: str, doc_id: str, data: Dict[str, Any]) -> bool:
+        """
+        Save a standalone JSON document (e.g. a background job) under a collection
+        Written to a temp file and renamed, so readers never see half a file
+        """
+        try:
+            directory = os.path.join(self.storage_path, collection)
+            os.makedirs(directory, exist_ok=True)
+            
+            written = self._write_json(os.path.join(directory, f"{doc_id}.json"), data)
+            tracer.set_attributes(collection=collection, doc_id=doc_id, bytes_written=written)
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Error saving {collection} document {doc_id}: {e}")
+            return False
+    
+    @traced('memory.load_document')
+    def load_document(self, collection: str, doc_id: str) -> Dict[str, Any]:
+        """Load a document from a collection (empty if it doesn't exist)"""
+        try:
+            file_path = os.path.join(self.storage_path, collection, f"{doc_id}.json")
+            if not os.path.exists(file_path):
+                return {}
+            with open(file_path, 'r') as f:
+                document = json.load(f)
+                tracer.set_attributes(collection=collection, doc_id=doc_id, bytes_read=f.tell())
+                return document
+                
+        except Exception as e:
+            logger.error(f"❌ Error loading {collection} document {doc_id}: {e}")
+            return {}
+    
+    def memory_signature(self, student_id: str) -> Optional[Tuple[int, int, int]]:
+        """(inode, mtime, size) of a student's memory file, None if missing; changes on every save"""
+        try:
+            stat = os.stat(os.path.join(self.storage_path, f"{student_id}_memory.json"))
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    
+    def document_signature(self, collection: str, doc_id: str) -> Optional[Tuple[int, int, int]]:
+        """
+        Cheap change check for a document: (inode, mtime, size), None if missing
+        Every save renames a new file into place, so any write changes the inode
+        """
+        try:
+            stat = os.stat(os.path.join(self.storage_path, collection, f"{doc_id}.json"))
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    
+    def document_signatures(self, collection: str) -> Dict[str, Tuple[int, int, int]]:
+        """document_signature for every document in a collection, from one directory scan"""
+        directory = os.path.join(self.storage_path, collection)
+        if not os.path.isdir(directory):
+            return {}
+        signatures = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.json'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                signatures[entry.name[:-len('.json')]] = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        return signatures
+    
+    def list_documents(self, collection: str) -> List[str]:
+        """IDs of all documents in a collection"""
+        directory = os.path.join(self.storage_path, collection)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len('.json')] for name in os.listdir(directory) if name.endswith('.json'))
+    
+    def delete_document(self, collection: str, doc_id: str) -> bool:
+        """Delete a document; returns False if it didn't exist"""
+        try:
+            os.remove(os.path.join(self.storage_path, collection, f"{doc_id}.json"))
+            return True
+        except FileNotFoundError:
+            return False
+    
     def update_learning_pattern(self, student_id: str, subject: str, performance: float):
         """Update learning patterns based on recent performance"""
-        memory = self.load_student_memory(student_id)
-        
-        if 'learning_patterns' not in memory:
-            memory['learning_patterns'] = {}
-        
-        if subject not in memory['learning_patterns']:
-            memory['learning_patterns'][subject] = []
+        self.update_learning_patterns(student_id, [(subject, performance)])
+    
+    def update_learning_patterns(self, student_id: str, updates: List[Tuple[str, float]]):
+        """Add several (subject, performance) results with one load and save"""
+        with self._student_lock(student_id):
+            # Patterns live in the learning data, next to the sessions they come from
+            learning_data = self.load_memory_section(student_id, 'learning_data', {}) or {}
+            patterns = learning_data.setdefault('learning_patterns', {})
         
-        memory['learning_patterns'][subject].append({
-            'timestamp': datetime.now().isoformat(),
-            'performance': performance,
-            'difficulty_level': self._calculate_difficulty(performance)
-        })
+            for subject, performance in updates:
+                patterns.setdefault(subject, []).append({
+                    'timestamp': datetime.now().isoformat(),
+                    'performance': performance,
+                    'difficulty_level': self._calculate_difficulty(performance)
+                })
         
-        self.save_student_memory(student_id, memory)
-        logger.info(f"✅ Learning pattern updated for {student_id} in {subject}")
+            self.save_student_memory(student_id, learning_data)
+        logger.info(f"✅ Learning patterns updated for {student_id} in {', '.join(dict.fromkeys(s for s, _ in updates))}")
 
     def _calculate_difficulty(self, performance: float) -> str:
         """Calculate difficulty level based on performance"""
@@ -91,4 +250,4 @@ class MemoryBank:
             return 'beginner'
 
 # Global memory bank instance
-memory_bank = MemoryBank()
\ No newline at end of file
+memory_bank = MemoryBank(os.getenv('MEMORY_BANK_PATH', './memory_data/'))
\ No newline at end of file
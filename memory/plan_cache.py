@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Any, Callable, Tuple
+from utils.metrics import metrics
+from utils.logger import logger
+
+# Different spellings of the same preference
+PREFERENCE_ALIASES = {
+    'preferred_study_time': 'preferred_time',
+    'study_time': 'preferred_time',
+    'style': 'learning_style'
+}
+
+def normalize_subject(subject: str) -> str:
+    return re.sub(r'\s+', ' ', str(subject).strip().lower())
+
+def normalize_preferences(preferences: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Canonical form of a student's preferences
+    Keys become snake_case (with aliases merged), string values are
+    lowercased and trimmed, and lists are sorted
+    """
+    normalized = {}
+    for key, value in (preferences or {}).items():
+        key = re.sub(r'[\s-]+', '_', str(key).strip().lower())
+        key = PREFERENCE_ALIASES.get(key, key)
+        if isinstance(value, str):
+            value = re.sub(r'\s+', ' ', value.strip().lower())
+        elif isinstance(value, (list, tuple, set)):
+            value = sorted(normalize_subject(item) for item in value)
+        if value in ('', None, []):
+            continue
+        normalized[key] = value
+    return dict(sorted(normalized.items()))
+
+def plan_shape_key(study_load: Dict[str, int], preferences: Dict[str, Any]) -> str:
+    """
+    Cache key for a study plan: the sorted subject set with its hour
+    distribution plus the normalized preferences. Students with the same
+    course load and preferences share a key whatever order or case they
+    typed their subjects in.
+    """
+    shape = {
+        'load': sorted((normalize_subject(subject), hours) for subject, hours in study_load.items()),
+        'preferences': normalize_preferences(preferences)
+    }
+    raw = json.dumps(shape, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+class StudyPlanCache:
+    """
+    LRU cache of generated weekly plans shared by all students
+    Concurrent misses for the same key wait for a single model call and
+    get its result, even one that isn't cached (a fallback plan or an error).
+    With a persist path the cache survives restarts.
+    """
+
+    def __init__(self, max_entries: int = 1024, persist_path: str = None):
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def from_env(cls) -> 'StudyPlanCache':
+        max_entries = int(os.getenv('PLAN_CACHE_SIZE', '1024'))
+        persist_path = os.getenv('PLAN_CACHE_PATH') or None
+        return cls(max_entries, persist_path)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._store(key, value)
+            snapshot = list(self._entries.items()) if self.persist_path else None
+        if snapshot is not None:
+            self._save(snapshot)
+
+    def get_or_create(self, key: str, create: Callable[[], Tuple[Any, bool]]) -> Any:
+        """
+        Return the cached plan for a key, or build it with create()
+        create() returns (plan, cacheable); fallback plans aren't cached
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._record(hit=True)
+                return self._entries[key]
+
+            waiter = self._in_flight.get(key)
+            if waiter is None:
+                # This caller builds the plan; others wait for its result
+                future = self._in_flight[key] = Future()
+                self._record(hit=False)
+        if waiter is not None:
+            # Shared even when it isn't cached, so a fallback means one model call, not one per waiter
+            value = waiter.result()
+            self._record(hit=True)
+            return value
+
+        try:
+            value, cacheable = create()
+            if cacheable:
+                self.put(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = metrics.get_counter('study_plan.cache.hits')
+        misses = metrics.get_counter('study_plan.cache.misses')
+        with self._lock:
+            size = len(self._entries)
+        return {
+            'entries': size,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / (hits + misses) if hits + misses else 0.0,
+            'model_calls_saved': metrics.get_counter('study_plan.model_calls_saved')
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.persist_path and os.path.exists(self.persist_path):
+            os.remove(self.persist_path)
+
+    def _store(self, key: str, value: Any):
+        """Add an entry and evict the least recently used (caller holds the lock)"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        metrics.set_gauge('study_plan.cache.entries', len(self._entries))
+
+    def _record(self, hit: bool):
+        metrics.increment('study_plan.cache.hits' if hit else 'study_plan.cache.misses')
+        if hit:
+            # Every hit is a plan the model didn't have to write
+            metrics.increment('study_plan.model_calls_saved')
+        hits = metrics.get_counter('study_plan.cache.hits')
+        total = hits + metrics.get_counter('study_plan.cache.misses')
+        metrics.set_gauge('study_plan.cache.hit_ratio', hits / total)
+
+    def _load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, 'r') as f:
+                for key, value in json.load(f):
+                    self._store(key, value)
+            logger.info(f"✅ Loaded {len(self._entries)} cached study plans")
+        except Exception as e:
+            logger.error(f"❌ Error loading study plan cache: {e}")
+
+    def _save(self, entries: List[Tuple[str, Any]]):
+        try:
+            directory = os.path.dirname(os.path.abspath(self.persist_path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            logger.error(f"❌ Error saving study plan cache: {e}")
+
+# Global study plan cache
+plan_cache = StudyPlanCache.from_env()
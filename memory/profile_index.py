@@ -0,0 +1,177 @@
+import bisect
+import threading
+import time
+from typing import Dict, List, Any, Optional, Set, Tuple
+from memory.plan_cache import normalize_subject, normalize_preferences
+from utils.metrics import metrics
+from utils.logger import logger
+
+# Upper edges of the weekly-hours buckets: [0, 5), [5, 10), [10, 20), [20, 40), [40, ...)
+HOUR_BUCKETS = (5, 10, 20, 40)
+
+def hour_bucket(hours: float) -> int:
+    return bisect.bisect_right(HOUR_BUCKETS, hours)
+
+def profile_terms(profile: Dict[str, Any]) -> Set[Tuple[str, str]]:
+    """The (field, value) pairs a profile is indexed under"""
+    terms = {('subject', normalize_subject(subject)) for subject in profile.get('subjects') or []}
+    for key, value in normalize_preferences(profile.get('preferences')).items():
+        values = value if isinstance(value, list) else [value]
+        for item in values:
+            if not isinstance(item, dict):
+                terms.add((key, str(item).lower()))
+    hours = profile.get('available_hours')
+    if isinstance(hours, (int, float)):
+        terms.add(('hours', hour_bucket(hours)))
+    return terms
+
+class ProfileIndex:
+    """
+    Secondary indexes over student profiles for cohort queries
+    Keeps a set of student IDs per subject, per preference value and per
+    weekly-hours bucket; a query intersects the sets of its filters, smallest
+    first. The index is built from a scan of the stored profiles and then
+    follows the profile change feed (at most once per refresh_interval_s),
+    reloading only the students that changed; profiles written by this
+    worker are indexed as they are saved.
+    """
+
+    def __init__(self, storage, collection: str = 'profiles', feed=None, refresh_interval_s: float = 0.0):
+        self.storage = storage
+        self.collection = collection
+        self.feed = feed
+        self.refresh_interval_s = refresh_interval_s
+        self._postings = {}
+        self._entries = {}
+        self._offset = None
+        self._last_refresh = None
+        self._lock = threading.RLock()
+
+    def add(self, student_id: str, profile: Dict[str, Any], signature=None):
+        """Index (or re-index) one profile"""
+        with self._lock:
+            self._unindex(student_id)
+            terms = profile_terms(profile)
+            for term in terms:
+                self._postings.setdefault(term, set()).add(student_id)
+            self._entries[student_id] = (signature, terms, profile.get('available_hours'))
+
+    def remove(self, student_id: str):
+        with self._lock:
+            self._unindex(student_id)
+
+    def refresh(self, force: bool = False) -> int:
+        """Re-index profiles that changed since the last refresh; returns how many were reloaded"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_refresh is not None and now - self._last_refresh < self.refresh_interval_s:
+                return 0
+            self._last_refresh = now
+
+            if self._offset is None or self.feed is None:
+                changed = self._scan()
+            else:
+                changed = set()
+                while True:
+                    batch = self.feed.read(self._offset, limit=1000)
+                    if batch.get('offset_expired'):
+                        # Fell behind the feed's retention: the changes are gone, so rescan
+                        changed = self._scan()
+                        break
+                    changed.update(event['student_id'] for event in batch['events'])
+                    self._offset = batch['next_offset']
+                    if not batch['events']:
+                        break
+
+            reindexed = 0
+            for student_id in changed:
+                signature = self.storage.document_signature(self.collection, student_id)
+                entry = self._entries.get(student_id)
+                if signature is None:
+                    self._unindex(student_id)
+                elif entry is None or entry[0] != signature:
+                    # Skips our own writes, which were indexed when they were saved
+                    profile = self.storage.load_document(self.collection, student_id)
+                    if profile:
+                        self.add(student_id, profile, signature)
+                        reindexed += 1
+            if reindexed:
+                metrics.increment('profiles.index.reindexed', reindexed)
+                logger.info(f"📈 Indexed {reindexed} changed student profiles")
+            metrics.set_gauge('profiles.index.students', len(self._entries))
+            return reindexed
+
+    def _scan(self) -> Set[str]:
+        """Every stored profile plus every indexed one (first build, or no feed to follow)"""
+        if self.feed is not None:
+            # Taken before the scan, so changes made during it are read from the feed afterwards
+            self._offset = self.feed.end_offset()
+        return set(self.storage.document_signatures(self.collection)) | set(self._entries)
+
+    def query(self, subject: Optional[str] = None, min_hours: Optional[float] = None,
+              max_hours: Optional[float] = None, preferences: Optional[Dict[str, Any]] = None,
+              limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Student IDs matching every filter, sorted, one page at a time
+        Hours filters are min_hours <= available_hours < max_hours. Pass the
+        returned next_cursor to get the following page.
+        """
+        self.refresh()
+        metrics.increment('profiles.index.queries')
+
+        terms = set()
+        if subject:
+            terms.add(('subject', normalize_subject(subject)))
+        for key, value in normalize_preferences(preferences).items():
+            terms.add((key, str(value).lower()))
+        hours_filtered = min_hours is not None or max_hours is not None
+
+        with self._lock:
+            if hours_filtered:
+                # Candidates from the overlapping buckets, then the exact bounds
+                low = hour_bucket(min_hours) if min_hours is not None else 0
+                high = hour_bucket(max_hours) if max_hours is not None else len(HOUR_BUCKETS)
+                by_hours = set()
+                for bucket in range(low, high + 1):
+                    by_hours |= self._postings.get(('hours', bucket), set())
+                postings = [by_hours]
+            else:
+                postings = []
+            postings += [self._postings.get(term, set()) for term in terms]
+
+            if postings:
+                postings.sort(key=len)
+                matches = set(postings[0])
+                for posting in postings[1:]:
+                    if not matches:
+                        break
+                    matches &= posting
+            else:
+                matches = set(self._entries)
+
+            if hours_filtered:
+                matches = {sid for sid in matches
+                           if self._in_range(self._entries[sid][2], min_hours, max_hours)}
+
+        ordered = sorted(matches)
+        start = bisect.bisect_right(ordered, cursor) if cursor else 0
+        page = ordered[start:start + limit]
+        next_cursor = page[-1] if page and start + limit < len(ordered) else None
+        return {'student_ids': page, 'total': len(ordered), 'next_cursor': next_cursor}
+
+    def _unindex(self, student_id: str):
+        entry = self._entries.pop(student_id, None)
+        if entry is None:
+            return
+        for term in entry[1]:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.discard(student_id)
+                if not posting:
+                    del self._postings[term]
+
+    @staticmethod
+    def _in_range(hours, min_hours, max_hours) -> bool:
+        if not isinstance(hours, (int, float)):
+            return False
+        return (min_hours is None or hours >= min_hours) and (max_hours is None or hours < max_hours)
@@ -0,0 +1,138 @@
+import copy
+import json
+import sys
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+
+# Naive timestamps are stored as seconds since this (no time zone conversion, so they round-trip exactly)
+EPOCH = datetime(1970, 1, 1)
+
+class InternTable:
+    """
+    Shared table that maps values to small integer IDs
+    Thousands of profiles take the same few subjects and preferences; each
+    profile keeps the IDs and the value itself is stored once
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._values = []
+        self._lock = threading.Lock()
+
+    def intern(self, value) -> int:
+        value_id = self._ids.get(value)
+        if value_id is not None:
+            return value_id
+        with self._lock:
+            value_id = self._ids.get(value)
+            if value_id is None:
+                value_id = len(self._values)
+                self._values.append(value)
+                self._ids[value] = value_id
+            return value_id
+
+    def value(self, value_id: int):
+        return self._values[value_id]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+# Subject names, and (preference name, JSON value) pairs
+subject_table = InternTable()
+preference_table = InternTable()
+
+def encode_timestamp(value):
+    """
+    ISO timestamp -> float seconds, only when decoding gives back the exact
+    same string; anything else (other ISO spellings, time zones, non-strings)
+    is kept as is, with a stored float wrapped so it isn't decoded as a date
+    """
+    if isinstance(value, float):
+        return (value,)
+    if not isinstance(value, str):
+        return value
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if parsed.tzinfo is not None:
+        return value
+    packed = (parsed - EPOCH).total_seconds()
+    return packed if decode_timestamp(packed) == value else value
+
+def decode_timestamp(value):
+    if isinstance(value, float):
+        return (EPOCH + timedelta(seconds=value)).isoformat()
+    if isinstance(value, tuple):
+        return value[0]
+    return value
+
+class ProfileRecord:
+    """
+    Compact in-memory form of a student profile
+    Subjects and preferences are tuples of IDs into the shared tables and
+    timestamps are floats. Convert with from_dict/to_dict at the edges; the
+    rest of the code (and the API) keeps seeing the usual profile dict.
+    """
+
+    __slots__ = ('student_id', 'subjects', 'available_hours', 'preferences', 'created_at', 'last_updated',
+                 'version', 'extra')
+
+    FIELDS = ('student_id', 'subjects', 'available_hours', 'preferences', 'created_at', 'last_updated', 'version')
+
+    def __init__(self, student_id: Optional[str], subjects: Tuple[int, ...], available_hours, preferences: Tuple[int, ...],
+                 created_at, last_updated, version: Optional[int], extra: Optional[Dict[str, Any]] = None):
+        self.student_id = student_id
+        self.subjects = subjects
+        self.available_hours = available_hours
+        self.preferences = preferences
+        self.created_at = created_at
+        self.last_updated = last_updated
+        self.version = version
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, profile: Dict[str, Any]) -> 'ProfileRecord':
+        student_id = profile.get('student_id')
+        extra = {key: copy.deepcopy(value) for key, value in profile.items() if key not in cls.FIELDS}
+        return cls(
+            student_id=sys.intern(student_id) if isinstance(student_id, str) else student_id,
+            subjects=tuple(subject_table.intern(subject) for subject in profile.get('subjects') or []),
+            available_hours=profile.get('available_hours'),
+            preferences=tuple(preference_table.intern((key, json.dumps(value, sort_keys=True)))
+                              for key, value in (profile.get('preferences') or {}).items()),
+            created_at=encode_timestamp(profile.get('created_at')),
+            last_updated=encode_timestamp(profile.get('last_updated')),
+            version=profile.get('version'),
+            extra=extra or None
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The profile as a new dict, in the shape it is stored and served in"""
+        profile = {
+            'subjects': self.subject_names(),
+            'available_hours': self.available_hours,
+            'preferences': self.preference_dict()
+        }
+        for field in ('created_at', 'last_updated'):
+            value = getattr(self, field)
+            if value is not None:
+                profile[field] = decode_timestamp(value)
+        if self.student_id is not None:
+            profile['student_id'] = self.student_id
+        if self.version is not None:
+            profile['version'] = self.version
+        if self.extra:
+            profile.update(copy.deepcopy(self.extra))
+        return profile
+
+    def subject_names(self) -> List[str]:
+        return [subject_table.value(subject_id) for subject_id in self.subjects]
+
+    def preference_dict(self) -> Dict[str, Any]:
+        preferences = {}
+        for preference_id in self.preferences:
+            key, raw = preference_table.value(preference_id)
+            preferences[key] = json.loads(raw)
+        return preferences
@@ -0,0 +1,220 @@
+import copy
+import fcntl
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Optional
+from memory.memory_bank import memory_bank
+from memory.change_feed import ChangeFeed
+from memory.profile_index import ProfileIndex
+from memory.profile_record import ProfileRecord
+from utils.metrics import metrics
+from utils.logger import logger
+
+# Fields that change on every write, so they aren't reported as changes
+BOOKKEEPING_FIELDS = ('student_id', 'version', 'last_updated')
+
+class ProfileVersionConflictError(ValueError):
+    """A compare-and-set update expected a different profile version"""
+
+    def __init__(self, student_id: str, expected_version: int, current_version: int):
+        super().__init__(f"Profile {student_id} is at version {current_version}, not {expected_version}")
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+class IdAllocator:
+    """
+    Sequential numbers shared by every process on the same storage
+    The counter file is updated under an exclusive file lock, so two workers
+    never hand out the same number
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def next(self) -> int:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock, open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read().strip()
+                value = int(raw) + 1 if raw else 1
+                f.seek(0)
+                f.truncate()
+                f.write(str(value))
+                f.flush()
+                os.fsync(f.fileno())
+                return value
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+class ProfileStore:
+    """
+    Student profiles kept in the memory bank ('profiles' collection)
+    Each worker keeps a bounded LRU of profiles it has read (as compact
+    ProfileRecords, turned back into dicts on the way out). A cached profile
+    is used only while the stored file is unchanged (one stat per read), so a
+    profile written by another worker is picked up on the next read. Every
+    write bumps the profile's version, can be made conditional on the version
+    the caller read (compare-and-set), and is appended to a change feed that
+    other components tail to learn exactly which students changed. Writes
+    to one profile are serialized by a per-profile file lock, so writes to
+    different students don't wait for each other. Cohort queries go through
+    a ProfileIndex that follows the feed.
+    """
+
+    def __init__(self, storage=memory_bank, collection: str = 'profiles', cache_size: int = 1024,
+                 index_refresh_s: float = 0.0, feed_max_bytes: int = 16 * 1024 * 1024):
+        self.storage = storage
+        self.collection = collection
+        self.cache_size = cache_size
+        self.feed = ChangeFeed(os.path.join(storage.storage_path, 'feeds', f"{collection}.jsonl"), feed_max_bytes)
+        self.index = ProfileIndex(storage, collection, self.feed, refresh_interval_s=index_refresh_s)
+        self.ids = IdAllocator(os.path.join(storage.storage_path, 'counters', 'student_id'))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'ProfileStore':
+        return cls(
+            cache_size=int(os.getenv('PROFILE_CACHE_SIZE', '1024')),
+            index_refresh_s=float(os.getenv('PROFILE_INDEX_REFRESH_S', '0')),
+            feed_max_bytes=int(os.getenv('PROFILE_FEED_MAX_BYTES', str(16 * 1024 * 1024)))
+        )
+
+    def get(self, student_id: str) -> Dict[str, Any]:
+        """A student's profile (empty if there is none)"""
+        signature = self.storage.document_signature(self.collection, student_id)
+        with self._lock:
+            cached = self._cache.get(student_id)
+            if cached is not None and signature is not None and cached[0] == signature:
+                self._cache.move_to_end(student_id)
+                metrics.increment('profiles.cache.hits')
+                return cached[1].to_dict()
+            if cached is not None:
+                # Changed or deleted by this or another worker
+                del self._cache[student_id]
+                metrics.increment('profiles.cache.invalidations')
+
+        metrics.increment('profiles.cache.misses')
+        if signature is None:
+            return {}
+        profile = self.storage.load_document(self.collection, student_id)
+        if profile:
+            self._remember(student_id, signature, profile)
+        return profile
+
+    def put(self, student_id: str, profile: Dict[str, Any], expected_version: Optional[int] = None) -> Dict[str, Any]:
+        """Store a whole profile; returns it with its new version"""
+        return self.update(student_id, lambda current: dict(profile), expected_version)
+
+    def update(self, student_id: str, change: Callable[[Dict[str, Any]], Dict[str, Any]],
+               expected_version: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Read-modify-write a profile: change gets the current profile ({} if
+        new) and returns the new one. Returns the stored profile ({} if the
+        write failed). With expected_version the write only happens if the
+        profile is still at that version (0 for a new profile), otherwise
+        ProfileVersionConflictError is raised.
+        """
+        # The profile's lock serializes its writes across workers, so the version check holds
+        with self._locked(student_id):
+            current = self.get(student_id)
+            current_version = current.get('version', 0)
+            if expected_version is not None and expected_version != current_version:
+                metrics.increment('profiles.version_conflicts')
+                raise ProfileVersionConflictError(student_id, expected_version, current_version)
+
+            profile = change(copy.deepcopy(current))
+            profile['student_id'] = student_id
+            profile['version'] = current_version + 1
+            profile['last_updated'] = datetime.now().isoformat()
+
+            if not self.storage.save_document(self.collection, student_id, profile):
+                return {}
+            signature = self.storage.document_signature(self.collection, student_id)
+            self._remember(student_id, signature, profile)
+            self.index.add(student_id, profile, signature)
+            self.feed.append({
+                'type': 'updated' if current else 'created',
+                'student_id': student_id,
+                'version': profile['version'],
+                'changed': sorted(key for key in set(current) | set(profile)
+                                  if key not in BOOKKEEPING_FIELDS and current.get(key) != profile.get(key))
+            })
+            return copy.deepcopy(profile)
+
+    def delete(self, student_id: str) -> bool:
+        """Delete a profile; returns False if there was none"""
+        with self._locked(student_id):
+            current = self.get(student_id)
+            if not self.storage.delete_document(self.collection, student_id):
+                return False
+            with self._lock:
+                self._cache.pop(student_id, None)
+            self.index.remove(student_id)
+            self.feed.append({'type': 'deleted', 'student_id': student_id, 'version': current.get('version', 0)})
+            return True
+
+    @contextmanager
+    def _locked(self, student_id: str):
+        """Hold one profile's write lock (the student's lock in this worker, a file lock across workers)"""
+        path = os.path.join(self.storage.storage_path, 'locks', self.collection, f"{student_id}.lock")
+        with self.storage.student_lock(student_id):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def changes(self, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """Profile changes from a feed offset on (see ChangeFeed.read)"""
+        return self.feed.read(offset, limit)
+
+    def exists(self, student_id: str) -> bool:
+        return self.storage.document_signature(self.collection, student_id) is not None
+
+    def list_ids(self) -> List[str]:
+        return self.storage.list_documents(self.collection)
+
+    def query(self, subject: Optional[str] = None, min_hours: Optional[float] = None,
+              max_hours: Optional[float] = None, preferences: Optional[Dict[str, Any]] = None,
+              limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of profiles matching the filters (see ProfileIndex.query)"""
+        page = self.index.query(subject=subject, min_hours=min_hours, max_hours=max_hours,
+                                preferences=preferences, limit=limit, cursor=cursor)
+        profiles = [self.get(student_id) for student_id in page['student_ids']]
+        return {
+            'students': [profile for profile in profiles if profile],
+            'total': page['total'],
+            'next_cursor': page['next_cursor']
+        }
+
+    def allocate_id(self, prefix: str = 'student') -> str:
+        """A new student ID no other worker will hand out (skips IDs already taken)"""
+        while True:
+            student_id = f"{prefix}_{self.ids.next()}"
+            if not self.exists(student_id):
+                return student_id
+            logger.warning(f"⚠️  {student_id} is already taken, allocating another ID")
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _remember(self, student_id: str, signature, profile: Dict[str, Any]):
+        with self._lock:
+            self._cache[student_id] = (signature, ProfileRecord.from_dict(profile))
+            self._cache.move_to_end(student_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            metrics.set_gauge('profiles.cache.entries', len(self._cache))
+
+# Global profile store
+profile_store = ProfileStore.from_env()
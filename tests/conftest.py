@@ -0,0 +1,10 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# Runs before the test modules import the global stores, so everything they write lands in a scratch directory
+_storage_path = tempfile.mkdtemp(prefix='smartstudy_test_')
+os.environ['MEMORY_BANK_PATH'] = _storage_path
+# Registered first, so it runs after the event bus has drained its last writes at exit
+atexit.register(shutil.rmtree, _storage_path, ignore_errors=True)
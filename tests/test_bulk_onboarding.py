@@ -0,0 +1,85 @@
+import sys
+import os
+import io
+import json
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from agents.bulk_onboarding import read_roster, onboard_roster_file
+from agents.coordinator import coordinator
+from agents.study_plan_agent import study_plan_agent
+from memory.memory_bank import memory_bank
+from memory.plan_cache import plan_cache
+
+ROSTER = """student_id,name,subjects,available_hours,preferences,learning_style
+bulk_test_001,Asha,Operating Systems;Data Structures,6,preferred_time=morning,visual
+bulk_test_002,Ravi,Data Structures;Operating Systems,6,preferred_time=Morning,Visual
+bulk_test_003,Meera,Computer Networks,4,,
+bulk_test_004,Broken,,5,,
+"""
+
+class CountingPlanModel:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        plan = {"weekly_schedule": {"Monday": ["Study"]}, "study_techniques": {"All": "Practice"},
+                "revision_days": ["Sunday"], "weekly_goals": ["Finish the week"]}
+        return type('Response', (), {'text': json.dumps(plan)})()
+
+def test_read_roster():
+    print("🧪 Testing roster parsing...")
+    
+    records = list(read_roster(io.StringIO(ROSTER), 'csv'))
+    assert records[0]['subjects'] == ['Operating Systems', 'Data Structures'], "❌ Test 1 Failed: Subjects not split"
+    assert records[0]['preferences'] == {'preferred_time': 'morning', 'learning_style': 'visual'}, "❌ Test 2 Failed: Preferences not parsed"
+    
+    ndjson = '{"student_id": "a", "subjects": ["OS"], "available_hours": 3}\n\nnot json\n'
+    records = list(read_roster(io.StringIO(ndjson), 'ndjson'))
+    assert len(records) == 2 and '_error' in records[1], "❌ Test 3 Failed: NDJSON not parsed"
+    print("✅ Roster parsing tests PASSED")
+
+def test_bulk_onboarding_resumes():
+    print("🧪 Testing bulk onboarding...")
+    
+    directory = tempfile.mkdtemp()
+    roster_path = os.path.join(directory, 'roster.csv')
+    checkpoint_path = os.path.join(directory, 'roster.checkpoint.jsonl')
+    with open(roster_path, 'w') as f:
+        f.write(ROSTER)
+    
+    plan_cache.clear()
+    fake = CountingPlanModel()
+    study_plan_agent.model = fake
+    reports = []
+    
+    try:
+        summary = onboard_roster_file(coordinator, roster_path, concurrency=4,
+                                      checkpoint_path=checkpoint_path, reporter=reports.append)
+        
+        assert summary['onboarded'] == 3, f"❌ Test 1 Failed: Expected 3 onboarded, got {summary['onboarded']}"
+        assert summary['invalid'] == 1, "❌ Test 2 Failed: Invalid row not reported"
+        assert summary['unique_shapes'] == 2, "❌ Test 3 Failed: Same-shape students not deduplicated"
+        assert fake.calls == 2, f"❌ Test 4 Failed: Expected 2 plan generations, got {fake.calls}"
+        assert study_plan_agent.get_stored_plan('bulk_test_002')['enrichment_status'] == 'enriched', "❌ Test 5 Failed: Plan not enriched"
+        assert reports and reports[-1]['throughput_per_s'] > 0, "❌ Test 6 Failed: No progress reported"
+        
+        # A second run finds everything in the checkpoint
+        again = onboard_roster_file(coordinator, roster_path, checkpoint_path=checkpoint_path, reporter=reports.append)
+        assert again['skipped'] == 4 and again['processed'] == 0, "❌ Test 7 Failed: Checkpoint not used"
+    finally:
+        study_plan_agent.model = None
+        plan_cache.clear()
+        shutil.rmtree(directory, ignore_errors=True)
+        for student_id in ('bulk_test_001', 'bulk_test_002', 'bulk_test_003'):
+            path = os.path.join(memory_bank.storage_path, f"{student_id}_memory.json")
+            if os.path.exists(path):
+                os.remove(path)
+    
+    print("✅ Bulk onboarding tests PASSED")
+
+if __name__ == "__main__":
+    test_read_roster()
+    test_bulk_onboarding_resumes()
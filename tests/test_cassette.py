@@ -0,0 +1,150 @@
+import sys
+import os
+import json
+import subprocess
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from llm.cassette import Cassette, CassetteModel, CassetteMissError, LatencyModel
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class ScriptedResponse:
+    def __init__(self, text):
+        self.text = text
+
+class ScriptedModel:
+    """Stands in for Gemini while recording"""
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        return ScriptedResponse(f'["answer {self.calls}"]')
+
+# Runs the coordinator end to end in a fresh process; the agents' models are
+# replaced with a recording cassette when RECORD=1
+FLOW_SCRIPT = """
+import json, os
+from agents.coordinator import coordinator
+from agents.mcq_agent import mcq_agent
+from agents.study_plan_agent import study_plan_agent
+from utils.metrics import metrics
+
+if os.environ.get('RECORD') == '1':
+    from llm.cassette import CassetteModel, get_cassette
+
+    class Scripted:
+        class Response:
+            def __init__(self, text):
+                self.text = text
+        def generate_content(self, prompt, **kwargs):
+            if 'multiple-choice' in prompt:
+                return self.Response(json.dumps([{"question": "What is paging?", "options": {"a": "Memory scheme", "b": "Disk", "c": "CPU", "d": "Port"}, "correct_answer": "a", "explanation": "Paging splits memory into pages."}] * 3))
+            return self.Response(json.dumps({"weekly_schedule": {"Monday": ["Operating Systems: Processes"]}, "study_techniques": {"Operating Systems": "Active recall"}, "revision_days": ["Sunday"], "weekly_goals": ["Finish processes"]}))
+
+    recorder = CassetteModel(get_cassette(os.environ['LLM_CASSETTE_PATH']), 'gemini-pro', 'record', Scripted())
+    mcq_agent.model = recorder
+    study_plan_agent.model = recorder
+
+student = {'student_id': 'cassette_student', 'subjects': ['Operating Systems'], 'available_hours': 4}
+onboarding = coordinator.onboard_new_student(student)
+session = coordinator.conduct_study_session('cassette_student', {'subjects': ['Operating Systems'], 'topics': ['Paging'], 'duration': 30, 'mcq_score': 1, 'total_questions': 5})
+review = coordinator.generate_weekly_review('cassette_student')
+
+print('RESULT ' + json.dumps({
+    'status': onboarding.get('onboarding_status'),
+    'plan': onboarding.get('study_plan', {}).get('weekly_overview'),
+    'mcqs': session.get('parallel_results', {}).get('mcqs_generated'),
+    'review_questions': len(review.get('practice_recommendations', [])),
+    'misses': metrics.get_counter('llm.cassette.misses'),
+    'hits': metrics.get_counter('llm.cassette.hits')
+}))
+"""
+
+def _run_flow(work_dir, cassette_path, record):
+    env = dict(os.environ)
+    env.pop('GOOGLE_API_KEY', None)
+    env.update({
+        'PYTHONPATH': PROJECT_ROOT,
+        'LLM_BACKEND': 'cassette',
+        'LLM_CASSETTE_MODE': 'replay',
+        'LLM_CASSETTE_PATH': cassette_path,
+        'MEMORY_BANK_PATH': os.path.join(work_dir, 'memory_data'),
+        'RECORD': '1' if record else '0'
+    })
+    output = subprocess.run([sys.executable, '-c', FLOW_SCRIPT], cwd=work_dir, env=env,
+                            capture_output=True, text=True, timeout=120).stdout
+    result_line = [line for line in output.splitlines() if line.startswith('RESULT ')]
+    assert result_line, f"❌ Flow did not finish:\n{output}"
+    return json.loads(result_line[-1][len('RESULT '):])
+
+def test_record_and_replay():
+    print("🧪 Testing cassette record and replay...")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cassette.json')
+        scripted = ScriptedModel()
+        
+        # Test 1: Recording calls the real model and writes the cassette
+        recorder = CassetteModel(Cassette(path), 'gemini-pro', 'record', scripted)
+        first = recorder.generate_content("Explain   paging").text
+        second = recorder.generate_content("Explain paging").text
+        assert scripted.calls == 2 and os.path.exists(path), "❌ Test 1 Failed: Nothing recorded"
+        print("✅ Test 1 PASSED: Interactions recorded")
+        
+        # Test 2: Replay is deterministic, in recorded order, and needs no model
+        player = CassetteModel(Cassette(path), 'gemini-pro', 'replay')
+        assert player.generate_content("Explain paging").text == first, "❌ Test 2 Failed: Wrong replay order"
+        assert player.generate_content("Explain paging").text == second, "❌ Test 2 Failed: Wrong replay order"
+        print("✅ Test 2 PASSED: Responses replayed in order")
+        
+        # Test 3: Streaming replay returns the same text in chunks
+        streamed = ''.join(chunk.text for chunk in player.generate_content("Explain paging", stream=True))
+        assert streamed == first, "❌ Test 3 Failed: Streamed replay differs"
+        print("✅ Test 3 PASSED: Streaming replay works")
+        
+        # Test 4: Unknown prompts raise instead of calling the network
+        try:
+            player.generate_content("Something new")
+            assert False, "❌ Test 4 Failed: Miss did not raise"
+        except CassetteMissError:
+            print("✅ Test 4 PASSED: Cassette miss detected")
+
+def test_latency_model():
+    print("🧪 Testing injected latency...")
+    
+    first = [LatencyModel('lognormal:800,0.5', seed=7).sample_ms() for _ in range(3)]
+    again = [LatencyModel('lognormal:800,0.5', seed=7).sample_ms() for _ in range(3)]
+    assert first == again, "❌ Test 1 Failed: Latency not deterministic for a seed"
+    assert LatencyModel('fixed:250').sample_ms() == 250, "❌ Test 2 Failed: Fixed latency wrong"
+    assert LatencyModel('recorded').sample_ms(420.0) == 420.0, "❌ Test 3 Failed: Recorded latency wrong"
+    
+    try:
+        LatencyModel('gaussian:1')
+        assert False, "❌ Test 4 Failed: Bad spec accepted"
+    except ValueError:
+        pass
+    print("✅ Latency model tests passed")
+
+def test_coordinator_offline():
+    print("🧪 Testing coordinator end to end with no network...")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cassette_path = os.path.join(tmp, 'flow.json')
+        recorded = _run_flow(tmp, cassette_path, record=True)
+        
+        with tempfile.TemporaryDirectory() as replay_dir:
+            replayed = _run_flow(replay_dir, cassette_path, record=False)
+    
+    assert replayed['status'] == 'completed', "❌ Test 1 Failed: Offline onboarding failed"
+    assert replayed['misses'] == 0 and replayed['hits'] > 0, "❌ Test 2 Failed: Replay missed recorded prompts"
+    assert replayed['plan'] == recorded['plan'], "❌ Test 3 Failed: Replayed plan differs"
+    assert replayed['mcqs'] == recorded['mcqs'], "❌ Test 4 Failed: Replayed MCQs differ"
+    assert replayed['review_questions'] == recorded['review_questions'] > 0, "❌ Test 5 Failed: Review not replayed"
+    print("✅ Coordinator ran end to end from the cassette")
+
+if __name__ == "__main__":
+    test_record_and_replay()
+    test_latency_model()
+    test_coordinator_offline()
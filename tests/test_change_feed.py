@@ -0,0 +1,155 @@
+import sys
+import os
+import uuid
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from memory.change_feed import ChangeFeed
+from memory.memory_bank import MemoryBank
+from memory.profile_store import ProfileStore, ProfileVersionConflictError
+
+def test_feed_tails_from_offset():
+    print("🧪 Testing change feed...")
+    feed = ChangeFeed(os.path.join(tempfile.mkdtemp(), 'feed.jsonl'))
+    assert feed.read() == {'events': [], 'next_offset': 0, 'offset_expired': False}, "❌ Test 1 Failed: Empty feed not empty"
+
+    offsets = [feed.append({'n': n}) for n in range(5)]
+    first = feed.read(0, limit=3)
+    assert [event['n'] for event in first['events']] == [0, 1, 2], "❌ Test 2 Failed: Wrong first page"
+    assert [event['offset'] for event in first['events']] == offsets[:3], "❌ Test 3 Failed: Offsets differ"
+    rest = feed.read(first['next_offset'])
+    assert [event['n'] for event in rest['events']] == [3, 4], "❌ Test 4 Failed: Tail missed events"
+    assert rest['next_offset'] == feed.end_offset(), "❌ Test 5 Failed: Tail not at the end"
+    print("✅ Test 1-5 PASSED: Consumers resume from their offset")
+
+def test_compare_and_set():
+    print("🧪 Testing compare-and-set profile updates...")
+    storage = MemoryBank(tempfile.mkdtemp())
+    store_a = ProfileStore(storage=storage)
+    store_b = ProfileStore(storage=storage)
+
+    store_a.put('student_1', {'subjects': ['DBMS'], 'available_hours': 6, 'preferences': {}}, expected_version=0)
+    try:
+        store_b.put('student_1', {'subjects': ['Compilers']}, expected_version=0)
+        assert False, "❌ Test 6 Failed: Second create accepted"
+    except ProfileVersionConflictError as e:
+        assert e.current_version == 1, "❌ Test 7 Failed: Wrong current version"
+
+    # Workers race to update from the same version: exactly one wins
+    results = []
+
+    def set_time(store, value):
+        try:
+            store.update('student_1', lambda p: dict(p, preferences={'preferred_time': value}), expected_version=1)
+            results.append(value)
+        except ProfileVersionConflictError:
+            results.append(None)
+
+    threads = [threading.Thread(target=set_time, args=(store, value))
+               for store, value in ((store_a, 'morning'), (store_b, 'night'), (store_a, 'evening'))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    winners = [value for value in results if value]
+    assert len(winners) == 1, f"❌ Test 8 Failed: {len(winners)} updates won"
+    profile = store_b.get('student_1')
+    assert profile['version'] == 2 and profile['preferences'] == {'preferred_time': winners[0]}, "❌ Test 9 Failed"
+
+    events = store_b.changes()['events']
+    assert [(e['type'], e['version']) for e in events] == [('created', 1), ('updated', 2)], f"❌ Test 10 Failed: {events}"
+    assert events[1]['changed'] == ['preferences'], "❌ Test 11 Failed: Changed fields not reported"
+    print("✅ Test 6-11 PASSED: Stale writes rejected and recorded once")
+
+def test_preferences_endpoint():
+    print("🧪 Testing PATCH /students/<id>/preferences and the change feed endpoint...")
+    from cloud_run_app import app
+    from memory.profile_store import profile_store
+    client = app.test_client()
+
+    student_id = f"feed_test_{uuid.uuid4().hex[:8]}"
+    profile_store.put(student_id, {'subjects': ['Networks'], 'available_hours': 5, 'preferences': {}})
+    offset = profile_store.feed.end_offset()
+
+    ok = client.patch(f'/students/{student_id}/preferences', json={'preferred_time': 'morning'}, headers={'If-Match': '"1"'})
+    stale = client.patch(f'/students/{student_id}/preferences', json={'preferred_time': 'night'}, headers={'If-Match': '"1"'})
+    assert ok.status_code == 200 and ok.headers['ETag'] == '"2"', f"❌ Test 12 Failed: {ok.get_json()}"
+    assert stale.status_code == 412 and stale.get_json()['version'] == 2, "❌ Test 13 Failed: Stale update accepted"
+    assert client.patch('/students/nobody_here/preferences', json={}).status_code == 404, "❌ Test 14 Failed"
+
+    changes = client.get(f'/students/changes?offset={offset}').get_json()
+    assert [e['student_id'] for e in changes['events']] == [student_id], f"❌ Test 15 Failed: {changes}"
+    print("✅ Test 12-15 PASSED: Conditional updates over HTTP")
+
+def test_partial_line_from_crashed_writer():
+    print("🧪 Testing append after a torn write...")
+    feed = ChangeFeed(os.path.join(tempfile.mkdtemp(), 'feed.jsonl'))
+    feed.append({'n': 0})
+    with open(feed.path, 'ab') as f:
+        f.write(b'{"n": 1, "at"')
+
+    offset = feed.append({'n': 2})
+    result = feed.read()
+    assert [event['n'] for event in result['events']] == [0, 2], f"❌ Test 16 Failed: {result['events']}"
+    assert result['events'][-1]['offset'] == offset, "❌ Test 17 Failed: Wrong offset after the torn line"
+    print("✅ Test 16-17 PASSED: Torn line skipped, next event kept")
+
+def test_feed_retention():
+    print("🧪 Testing change feed compaction...")
+    feed = ChangeFeed(os.path.join(tempfile.mkdtemp(), 'feed.jsonl'), max_bytes=2000)
+    offsets = [feed.append({'n': n}) for n in range(100)]
+    assert os.path.getsize(feed.path) <= 2100, f"❌ Test 18 Failed: Feed kept {os.path.getsize(feed.path)} bytes"
+    assert feed.end_offset() > offsets[-1], "❌ Test 19 Failed: End offset moved back"
+
+    expired = feed.read(0)
+    assert expired['offset_expired'] and not expired['events'], "❌ Test 20 Failed: Dropped offset not reported"
+    kept = feed.read(expired['next_offset'], limit=1000)
+    assert [event['offset'] for event in kept['events']] == offsets[-len(kept['events']):], \
+        "❌ Test 21 Failed: Kept events changed offsets"
+    assert kept['events'][-1]['n'] == 99 and not kept['offset_expired'], "❌ Test 22 Failed: Newest events lost"
+
+    # An index that fell behind the feed rebuilds from the stored profiles
+    store = ProfileStore(storage=MemoryBank(tempfile.mkdtemp()), feed_max_bytes=1000)
+    store.put('student_0', {'subjects': ['DBMS'], 'available_hours': 4, 'preferences': {}})
+    assert store.query(subject='DBMS')['total'] == 1, "❌ Test 23 Failed: Index not built"
+    other = ProfileStore(storage=store.storage, feed_max_bytes=1000)
+    for n in range(1, 40):
+        other.put(f"student_{n}", {'subjects': ['DBMS'], 'available_hours': 4, 'preferences': {}})
+    assert store.query(subject='DBMS')['total'] == 40, "❌ Test 24 Failed: Index missed compacted changes"
+    print("✅ Test 18-24 PASSED: Old events dropped, readers told to catch up")
+
+def test_writes_to_different_students_run_in_parallel():
+    print("🧪 Testing per-profile write locks...")
+    storage = MemoryBank(tempfile.mkdtemp())
+    store_a = ProfileStore(storage=storage)
+    store_b = ProfileStore(storage=storage)
+    holding = threading.Event()
+    release = threading.Event()
+
+    def slow_change(profile):
+        holding.set()
+        release.wait(5)
+        return dict(profile, subjects=['Compilers'])
+
+    slow = threading.Thread(target=store_a.update, args=('student_1', slow_change))
+    slow.start()
+    assert holding.wait(5), "❌ Test 25 Failed: Slow write did not start"
+    try:
+        done = threading.Event()
+        threading.Thread(target=lambda: (store_b.put('student_2', {'subjects': ['DBMS']}), done.set())).start()
+        assert done.wait(2), "❌ Test 26 Failed: Write to another student waited"
+    finally:
+        release.set()
+        slow.join()
+    assert store_b.get('student_1')['subjects'] == ['Compilers'], "❌ Test 27 Failed: Slow write lost"
+    print("✅ Test 25-27 PASSED: Profile writes only wait for the same student")
+
+if __name__ == "__main__":
+    test_feed_tails_from_offset()
+    test_compare_and_set()
+    test_preferences_endpoint()
+    test_partial_line_from_crashed_writer()
+    test_feed_retention()
+    test_writes_to_different_students_run_in_parallel()
@@ -0,0 +1,111 @@
+import sys
+import os
+import random
+import tempfile
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from agents.group_matcher import GroupMatcher
+from memory.availability_store import AvailabilityStore
+from memory.memory_bank import MemoryBank
+from tools.availability import availability_bits, free_hours, slot_labels, WEEK_SLOTS
+from tools.weekly_scheduler import WeeklyScheduler
+from utils.event_bus import event_bus
+
+def timetable(free: dict) -> dict:
+    """A timetable whose only free hours are the given {day: [hours]} (09:00-21:00 day, no breaks)"""
+    days = {}
+    for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']:
+        days[day] = [{'start': f"{hour:02d}:00", 'end': f"{hour + 1:02d}:00", 'subject': 'Solo', 'activity': 'study'}
+                     for hour in range(9, 21) if hour not in free.get(day, [])]
+    return {'days': days, 'day_hours': {'start': '09:00', 'end': '21:00'}, 'breaks': []}
+
+def test_availability_bits():
+    print("🧪 Testing availability bitsets...")
+    schedule = WeeklyScheduler().schedule({'OS': 10, 'DSA': 6}, {'preferred_time': 'evening'}, ['Sunday'])
+    bits = availability_bits(schedule)
+    assert len(bits) * 8 == WEEK_SLOTS, f"❌ Test 1 Failed: {len(bits)} bytes"
+    # 12-hour days, minus lunch, minus every hour a block touches
+    busy = sum(1 for entries in schedule['days'].values() for hour in range(9, 21) if hour != 13 and
+               any(int(e['start'][:2]) * 60 + int(e['start'][3:]) < (hour + 1) * 60 and
+                   int(e['end'][:2]) * 60 + int(e['end'][3:]) > hour * 60 for e in entries))
+    assert free_hours(bits) == 7 * 11 - busy, f"❌ Test 2 Failed: {free_hours(bits)} free hours"
+
+    bits = availability_bits(timetable({'Monday': [18, 19], 'Sunday': [10]}))
+    assert slot_labels(bits) == ['Monday 18:00-20:00', 'Sunday 10:00-11:00'], f"❌ Test 3 Failed: {slot_labels(bits)}"
+    print("✅ Test 1-3 PASSED: Free hours as 168 bits")
+
+def make_matcher():
+    store = AvailabilityStore(MemoryBank(tempfile.mkdtemp()))
+    return store, GroupMatcher(store)
+
+def test_find_groups():
+    print("🧪 Testing study group matching...")
+    store, matcher = make_matcher()
+    free = {
+        'student_a': {'Monday': [18, 19, 20], 'Tuesday': [10]},
+        'student_b': {'Monday': [18, 19], 'Tuesday': [10]},
+        'student_c': {'Monday': [19, 20]},
+        'student_d': {'Wednesday': [9, 10, 11]},
+        'student_e': {'Monday': [18, 19, 20]}
+    }
+    for student_id, hours in free.items():
+        store.set_timetable(student_id, timetable(hours))
+        store.record_scores(student_id, [('OS', 40, '2026-03-01T10:00:00'), ('DSA', 90, '2026-03-01T10:00:00')])
+    # A newer good score makes student_e no longer weak in OS
+    store.record_scores('student_e', [('OS', 85, '2026-03-02T10:00:00')])
+    store.record_scores('student_e', [('OS', 10, '2026-02-01T10:00:00')])
+    assert store.get('student_e')['weak_subjects'] == [], "❌ Test 4 Failed: Older score won"
+
+    groups = matcher.find_groups('student_a', size=3, min_hours=1)
+    assert len(groups) == 1 and groups[0]['subject'] == 'os', f"❌ Test 5 Failed: {groups}"
+    assert groups[0]['members'] == ['student_a', 'student_b', 'student_c'], f"❌ Test 6 Failed: {groups[0]}"
+    assert groups[0]['slots'] == ['Monday 19:00-20:00'] and groups[0]['common_hours'] == 1, \
+        f"❌ Test 7 Failed: {groups[0]}"
+    members = matcher.find_groups('student_a', size=3, min_hours=3)[0]['members']
+    assert members == ['student_a', 'student_b'], f"❌ Test 8 Failed: min_hours ignored {members}"
+    assert matcher.find_groups('student_d') == [], "❌ Test 9 Failed: Group without common hours"
+    assert matcher.find_groups('nobody') == [], "❌ Test 10 Failed: Unknown student matched"
+    print("✅ Test 4-10 PASSED: Groups share a weak subject and free hours")
+
+    # Changes are picked up on the next query
+    store.set_timetable('student_d', timetable({'Monday': [18, 19, 20], 'Tuesday': [10]}))
+    members = matcher.find_groups('student_a', size=2)[0]['members']
+    assert members == ['student_a', 'student_d'], f"❌ Test 11 Failed: {members}"
+    groups = matcher.groups_for_subject('OS', size=2)
+    assert sorted(len(group['members']) for group in groups) == [2, 2], f"❌ Test 12 Failed: {groups}"
+    print("✅ Test 11-12 PASSED: Index follows availability changes")
+
+def test_matching_scales():
+    print("🧪 Testing matching against a brute-force search...")
+    store, matcher = make_matcher()
+    rng = random.Random(5)
+    slots = {}
+    for n in range(300):
+        hours = {day: rng.sample(range(9, 21), 4) for day in ['Monday', 'Wednesday', 'Saturday']}
+        store.set_timetable(f"student_{n}", timetable(hours))
+        store.record_scores(f"student_{n}", [('CN', 30, '2026-03-01T10:00:00')])
+        slots[f"student_{n}"] = availability_bits(timetable(hours))
+
+    group = matcher.find_groups('student_0', size=2)[0]
+    best = max(free_hours(slots['student_0'] & bits) for student_id, bits in slots.items() if student_id != 'student_0')
+    assert group['common_hours'] == best, f"❌ Test 13 Failed: {group['common_hours']} != {best}"
+    common = np.unpackbits(slots['student_0']) & np.unpackbits(slots[group['members'][1]])
+    assert len(group['slots']) and group['common_hours'] == int(common.sum()), "❌ Test 14 Failed: Common slots"
+    groups = matcher.groups_for_subject('CN', size=4, limit=1000)
+    members = [student_id for group in groups for student_id in group['members']]
+    assert len(members) == len(set(members)), "❌ Test 15 Failed: Student in two groups"
+    print("✅ Test 13-15 PASSED: Greedy matching picks the best partner")
+
+def test_only_global_matcher_subscribes():
+    print("🧪 Testing event subscriptions...")
+    before = len(event_bus._subscribers.get('mcq.scored', []))
+    make_matcher()
+    assert len(event_bus._subscribers.get('mcq.scored', [])) == before, "❌ Test 16 Failed: Local matcher subscribed"
+    print("✅ Test 16 PASSED: Matchers on their own store stay off the bus")
+
+if __name__ == "__main__":
+    test_availability_bits()
+    test_find_groups()
+    test_matching_scales()
+    test_only_global_matcher_subscribes()
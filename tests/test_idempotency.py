@@ -0,0 +1,108 @@
+import sys
+import os
+import uuid
+import shutil
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from memory.idempotency_store import IdempotencyStore, IdempotencyConflictError
+from memory.memory_bank import MemoryBank
+from agents.progress_tracker import progress_tracker
+from utils.metrics import metrics
+
+def test_store_runs_once():
+    print("🧪 Testing idempotency store...")
+    storage = MemoryBank(tempfile.mkdtemp())
+    store = IdempotencyStore(storage=storage)
+    try:
+        calls = []
+
+        def work():
+            calls.append(1)
+            time.sleep(0.1)
+            return {'result': len(calls)}
+
+        # A retry that arrives while the first attempt runs waits for it
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(store.run('test', 'key-1', 'fp', work)))
+                   for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1, f"❌ Test 1 Failed: Work ran {len(calls)} times"
+        assert sorted(replayed for _, replayed in results) == [False, True, True], "❌ Test 2 Failed: Retries not replayed"
+        assert all(response == {'result': 1} for response, _ in results), "❌ Test 3 Failed: Different responses"
+
+        try:
+            store.run('test', 'key-1', 'other-body', work)
+            assert False, "❌ Test 4 Failed: Reused key accepted"
+        except IdempotencyConflictError:
+            pass
+
+        # Failures aren't stored, so the retry does the work
+        store.run('test', 'key-2', 'fp', lambda: {})
+        response, replayed = store.run('test', 'key-2', 'fp', lambda: {'ok': True})
+        assert response == {'ok': True} and not replayed, "❌ Test 5 Failed: Failed attempt was stored"
+    finally:
+        shutil.rmtree(storage.storage_path, ignore_errors=True)
+    print("✅ Test 1-5 PASSED: Each key runs once")
+
+def test_session_recorded_once():
+    print("🧪 Testing duplicate session suppression...")
+    student_id = f"idempotency_test_{uuid.uuid4().hex[:8]}"
+    session = {'subjects': ['Operating Systems'], 'duration': 30, 'idempotency_key': 'session-1'}
+
+    before = metrics.get_counter('progress.duplicate_sessions_suppressed')
+    assert progress_tracker.record_study_session(student_id, session), "❌ Test 6 Failed: Session not recorded"
+    assert progress_tracker.record_study_session(student_id, session), "❌ Test 7 Failed: Retry reported failure"
+
+    sessions = progress_tracker._load_progress_data(student_id)['study_sessions']
+    assert len(sessions) == 1, f"❌ Test 8 Failed: {len(sessions)} sessions stored"
+    assert metrics.get_counter('progress.duplicate_sessions_suppressed') == before + 1, "❌ Test 9 Failed: Not counted"
+    print("✅ Test 6-9 PASSED: Retried session stored once")
+
+def test_onboard_endpoint_replays():
+    print("🧪 Testing Idempotency-Key on POST /onboard...")
+    from cloud_run_app import app
+    from agents.coordinator import coordinator
+    from agents.study_plan_agent import study_plan_agent
+    client = app.test_client()
+
+    student_id = f"idempotency_test_{uuid.uuid4().hex[:8]}"
+    body = {'student_id': student_id, 'subjects': ['Data Structures'], 'available_hours': 4}
+    headers = {'Idempotency-Key': uuid.uuid4().hex}
+
+    calls = []
+    original = coordinator.onboard_new_student
+    coordinator.onboard_new_student = lambda data, enrich=True: calls.append(1) or original(data, enrich)
+    study_plan_agent.enrichment_mode = 'off'
+    try:
+        first = client.post('/onboard', json=body, headers=headers)
+        retry = client.post('/onboard', json=body, headers=headers)
+        conflict = client.post('/onboard', json=dict(body, available_hours=8), headers=headers)
+        runs = len(calls)
+        # Another client that happens to pick the same key gets its own onboarding
+        other_id = f"idempotency_test_{uuid.uuid4().hex[:8]}"
+        other = client.post('/onboard', json=dict(body, student_id=other_id), headers=headers)
+    finally:
+        coordinator.onboard_new_student = original
+        study_plan_agent.enrichment_mode = 'async'
+
+    assert first.status_code == 200 and retry.status_code == 200, "❌ Test 10 Failed: Onboarding failed"
+    assert runs == 1, f"❌ Test 11 Failed: Onboarding ran {runs} times"
+    assert retry.headers['Idempotent-Replayed'] == 'true', "❌ Test 12 Failed: Retry not marked as replayed"
+    assert retry.get_json()['study_plan'] == first.get_json()['study_plan'], "❌ Test 13 Failed: Different response"
+    assert conflict.status_code == 422, "❌ Test 14 Failed: Reused key with a new body accepted"
+    assert other.status_code == 200 and other.headers['Idempotent-Replayed'] == 'false', \
+        f"❌ Test 15 Failed: Key shared across students ({other.status_code})"
+    assert other.get_json()['student_id'] == other_id and len(calls) == 2, "❌ Test 16 Failed: Other student not onboarded"
+    print("✅ Test 10-16 PASSED: Retried onboarding replayed, keys scoped to the student")
+
+if __name__ == "__main__":
+    test_store_runs_once()
+    test_session_recorded_once()
+    test_onboard_endpoint_replays()
@@ -0,0 +1,146 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from agents.job_queue import JobQueue, QueueFullError, SUCCEEDED, FAILED
+from memory.memory_bank import MemoryBank
+
+def wait_for(queue, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job and job['status'] in (SUCCEEDED, FAILED):
+            return job
+        time.sleep(0.02)
+    return queue.get(job_id)
+
+def fail(payload):
+    raise ValueError("bad input")
+
+def test_job_lifecycle():
+    print("🧪 Testing background job queue...")
+    
+    storage = MemoryBank(tempfile.mkdtemp())
+    try:
+        queue = JobQueue(max_workers=2, storage=storage)
+        queue.register('double', lambda payload: payload['x'] * 2)
+        queue.register('fail', fail)
+        
+        job = queue.submit('double', {'x': 21})
+        assert job['status'] == 'queued', "❌ Test 1 Failed: Job not queued"
+        
+        finished = wait_for(queue, job['job_id'])
+        assert finished['status'] == SUCCEEDED and finished['result'] == 42, "❌ Test 2 Failed: Job result wrong"
+        
+        failed = wait_for(queue, queue.submit('fail', {})['job_id'])
+        assert failed['status'] == FAILED and 'bad input' in failed['error'], "❌ Test 3 Failed: Failure not recorded"
+        assert queue.get('no-such-job') is None, "❌ Test 4 Failed: Unknown job found"
+    finally:
+        shutil.rmtree(storage.storage_path, ignore_errors=True)
+    print("✅ Job lifecycle tests PASSED")
+
+def test_jobs_survive_restart_and_expire():
+    print("🧪 Testing job recovery and expiry...")
+    
+    storage = MemoryBank(tempfile.mkdtemp())
+    try:
+        release = threading.Event()
+        
+        # A queue that is full while its only worker is blocked
+        blocked = JobQueue(max_workers=1, max_pending=1, storage=storage, lease_s=600)
+        blocked.register('wait', lambda payload: release.wait(5))
+        blocked.submit('wait', {})
+        time.sleep(0.1)
+        waiting = blocked.submit('wait', {})
+        try:
+            blocked.submit('wait', {})
+            assert False, "❌ Test 1 Failed: Full queue accepted a job"
+        except QueueFullError:
+            pass
+        
+        # Another worker on the same storage leaves jobs with a live lease alone
+        restarted = JobQueue(max_workers=1, storage=storage)
+        restarted.register('wait', lambda payload: 'done after restart')
+        assert restarted.recover() == 0, "❌ Test 2 Failed: Job of a live worker taken over"
+        
+        # Once the owner stops renewing (as if it crashed), the waiting job is taken over and run
+        stored = storage.load_document('jobs', waiting['job_id'])
+        stored['lease_expires_at'] = time.time() - 1
+        storage.save_document('jobs', waiting['job_id'], stored)
+        assert restarted.recover() == 1, "❌ Test 3 Failed: Waiting job not recovered"
+        recovered = wait_for(restarted, waiting['job_id'])
+        assert recovered['result'] == 'done after restart', "❌ Test 4 Failed: Recovered job did not run"
+        release.set()
+        
+        # Finished jobs disappear after the TTL
+        short_lived = JobQueue(max_workers=1, ttl_s=0.2, sweep_interval_s=0, storage=storage)
+        short_lived.register('noop', lambda payload: None)
+        job = short_lived.submit('noop', {})
+        assert wait_for(short_lived, job['job_id'])['status'] == SUCCEEDED, "❌ Test 5 Failed: Job did not finish"
+        time.sleep(0.3)
+        assert short_lived.get(job['job_id']) is None, "❌ Test 6 Failed: Old job not expired"
+        assert job['job_id'] not in storage.list_documents('jobs'), "❌ Test 7 Failed: Expired job not deleted"
+        
+        # A running job keeps its lease and doesn't expire however long it runs
+        release = threading.Event()
+        busy = JobQueue(max_workers=1, ttl_s=0.2, sweep_interval_s=0, lease_s=0.3, storage=storage)
+        busy.register('slow', lambda payload: release.wait(5))
+        job = busy.submit('slow', {})
+        time.sleep(0.6)
+        other = JobQueue(max_workers=1, storage=storage)
+        other.register('slow', lambda payload: None)
+        assert busy.get(job['job_id'])['status'] == 'running', "❌ Test 8 Failed: Running job expired"
+        assert other.recover() == 0, "❌ Test 9 Failed: Running job taken over despite its heartbeat"
+        release.set()
+        assert wait_for(busy, job['job_id'])['status'] == SUCCEEDED, "❌ Test 10 Failed: Slow job did not finish"
+        
+        # A finished record without finished_at (as older heartbeats could save) still reads and expires
+        stored = storage.load_document('jobs', job['job_id'])
+        stored['finished_at'] = None
+        storage.save_document('jobs', job['job_id'], stored)
+        assert busy.get(job['job_id'])['status'] == SUCCEEDED, "❌ Test 11 Failed: Record without finished_at unreadable"
+    finally:
+        shutil.rmtree(storage.storage_path, ignore_errors=True)
+    print("✅ Recovery and expiry tests PASSED")
+
+def test_async_onboard_endpoint():
+    print("🧪 Testing POST /onboard?async=true...")
+    
+    from cloud_run_app import app
+    from agents.study_plan_agent import study_plan_agent
+    client = app.test_client()
+    
+    bad = client.post('/onboard?async=true', json={'subjects': [], 'available_hours': 5})
+    assert bad.status_code == 400, "❌ Test 1 Failed: Invalid request accepted"
+    
+    study_plan_agent.enrichment_mode = 'off'
+    try:
+        response = client.post('/onboard?async=true', json={
+            'student_id': 'async_job_test_001',
+            'subjects': ['Operating Systems'],
+            'available_hours': 4
+        })
+        assert response.status_code == 202, f"❌ Test 2 Failed: Expected 202, got {response.status_code}"
+        status_url = response.headers['Location']
+        
+        deadline = time.time() + 10
+        job = client.get(status_url).get_json()
+        while job['status'] not in (SUCCEEDED, FAILED) and time.time() < deadline:
+            time.sleep(0.05)
+            job = client.get(status_url).get_json()
+        
+        assert job['status'] == SUCCEEDED, f"❌ Test 3 Failed: Job ended as {job['status']}"
+        assert job['result']['student_id'] == 'async_job_test_001', "❌ Test 4 Failed: Result missing"
+        assert client.get('/jobs/unknown').status_code == 404, "❌ Test 5 Failed: Unknown job not 404"
+    finally:
+        study_plan_agent.enrichment_mode = 'async'
+    print("✅ Async onboarding endpoint tests PASSED")
+
+if __name__ == "__main__":
+    test_job_lifecycle()
+    test_jobs_survive_restart_and_expire()
+    test_async_onboard_endpoint()
@@ -0,0 +1,41 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from utils.json_stream import IncrementalJSONArrayParser
+
+def test_incremental_json_parser():
+    print("🧪 Testing incremental JSON array parser...")
+    
+    text = 'Here you go:\n```json\n[{"question": "What is [a]?", "options": {"a": "x}"}},\n {"question": "Say \\"hi\\""}]\n```'
+    
+    # Test 1: Elements come out as soon as they close, whatever the chunk size
+    for chunk_size in [1, 3, 7, len(text)]:
+        parser = IncrementalJSONArrayParser()
+        elements = []
+        for i in range(0, len(text), chunk_size):
+            elements.extend(parser.feed(text[i:i + chunk_size]))
+        
+        assert len(elements) == 2, f"❌ Test 1 Failed: Expected 2 elements with chunk size {chunk_size}"
+        assert elements[0]['options']['a'] == 'x}', "❌ Test 1 Failed: Braces inside strings broke parsing"
+        assert elements[1]['question'] == 'Say "hi"', "❌ Test 1 Failed: Escaped quotes broke parsing"
+        assert parser.finished, "❌ Test 1 Failed: End of array not detected"
+    print("✅ Test 1 PASSED: Elements parsed across chunk boundaries")
+    
+    # Test 2: First element is available before the array is complete
+    parser = IncrementalJSONArrayParser()
+    first = parser.feed('[{"question": "Q1"}, {"question": "Q')
+    assert first == [{'question': 'Q1'}], "❌ Test 2 Failed: First element not returned early"
+    assert not parser.finished, "❌ Test 2 Failed: Array finished too early"
+    print("✅ Test 2 PASSED: First element returned before the array closed")
+    
+    # Test 3: Malformed elements are skipped
+    parser = IncrementalJSONArrayParser()
+    elements = parser.feed('[{"question": oops}, {"question": "ok"}]')
+    assert elements == [{'question': 'ok'}], "❌ Test 3 Failed: Malformed element not skipped"
+    print("✅ Test 3 PASSED: Malformed elements skipped")
+    
+    print("🎉 Incremental JSON parser tests passed!")
+
+if __name__ == "__main__":
+    test_incremental_json_parser()
@@ -0,0 +1,81 @@
+import sys
+import os
+import json
+import time
+import uuid
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from agents.study_plan_agent import study_plan_agent
+from agents.schemas import validate_weekly_plan
+from memory.memory_bank import memory_bank
+from memory.plan_cache import plan_cache
+from tools.local_planner import local_planner
+
+MODEL_PLAN = {
+    "weekly_schedule": {"Monday": ["Operating Systems: Process states in depth"]},
+    "study_techniques": {"Operating Systems": "Draw the process state diagram from memory"},
+    "revision_days": ["Sunday"],
+    "weekly_goals": ["Explain every process state transition"]
+}
+
+class FakePlanModel:
+    def generate_content(self, prompt, **kwargs):
+        return type('Response', (), {'text': json.dumps(MODEL_PLAN)})()
+
+def test_local_planner():
+    print("🧪 Testing local study planner...")
+    
+    study_load = {'Operating Systems': 4, 'DSA': 3, 'Basket Weaving': 1}
+    plan = local_planner.create_weekly_plan(study_load, {'learning_style': 'Visual'})
+    
+    _, invalid = validate_weekly_plan(plan)
+    assert not invalid, f"❌ Test 1 Failed: Local plan is not a valid weekly plan: {invalid}"
+    
+    sessions = [entry for day, entries in plan['weekly_schedule'].items()
+                if day not in plan['revision_days'] for entry in entries if entry != 'Rest day']
+    assert len(sessions) == sum(study_load.values()), "❌ Test 2 Failed: Study hours not all scheduled"
+    assert "DSA: Arrays and Linked Lists" in sessions, "❌ Test 3 Failed: Catalogue topics not used"
+    assert plan == local_planner.create_weekly_plan(study_load, {'learning_style': 'visual'}), "❌ Test 4 Failed: Plan not deterministic"
+    
+    os_sessions = [entry for entry in sessions if entry.startswith('Operating Systems')]
+    assert os_sessions[0].endswith('Processes and Threads'), "❌ Test 5 Failed: Topics out of order"
+    print("✅ Local planner tests PASSED")
+
+def test_fast_plan_enrichment():
+    print("🧪 Testing fast plan with background enrichment...")
+    
+    student_id = f"test_fast_plan_{uuid.uuid4().hex[:8]}"
+    profile = {'subjects': ['Operating Systems', 'Data Structures'], 'available_hours': 6, 'preferences': {}}
+    plan_cache.clear()
+    study_plan_agent.model = FakePlanModel()
+    
+    try:
+        start = time.perf_counter()
+        plan = study_plan_agent.generate_fast_plan(profile)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        assert plan['plan_source'] == 'local', "❌ Test 1 Failed: Fast plan not local"
+        assert elapsed_ms < 500, f"❌ Test 2 Failed: Fast plan took {elapsed_ms:.0f}ms"
+        
+        study_plan_agent.save_plan(student_id, plan)
+        future = study_plan_agent.enrich_plan_async(student_id, profile, plan['generated_at'])
+        assert future.result(timeout=30), "❌ Test 3 Failed: Enrichment did not use the model"
+        
+        stored = study_plan_agent.get_stored_plan(student_id)
+        overview = stored['weekly_overview']
+        assert stored['enrichment_status'] == 'enriched', "❌ Test 4 Failed: Stored plan not enriched"
+        assert overview['weekly_schedule']['Monday'] == MODEL_PLAN['weekly_schedule']['Monday'], "❌ Test 5 Failed: Model wording not merged"
+        assert overview['weekly_schedule']['Tuesday'] == plan['weekly_overview']['weekly_schedule']['Tuesday'], "❌ Test 6 Failed: Local days lost"
+        assert 'Data Structures' in overview['study_techniques'], "❌ Test 7 Failed: Local techniques lost"
+    finally:
+        study_plan_agent.model = None
+        plan_cache.clear()
+        path = os.path.join(memory_bank.storage_path, f"{student_id}_memory.json")
+        if os.path.exists(path):
+            os.remove(path)
+    
+    print("✅ Fast plan enrichment tests PASSED")
+
+if __name__ == "__main__":
+    test_local_planner()
+    test_fast_plan_enrichment()
@@ -3,6 +3,18 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from agents.mcq_agent import mcq_agent
+from llm.client import model_registry
+from utils.metrics import metrics
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+class FakeStreamingModel:
+    """Streams a canned JSON answer a few characters at a time"""
+    def generate_content(self, prompt, stream=False, **kwargs):
+        text = '[{"question": "What is a process?", "options": {"a": "A running program", "b": "A file", "c": "A disk", "d": "A port"}, "correct_answer": "a", "explanation": "A process is a program in execution."}, {"question": "What is a thread?", "options": {"a": "A lightweight process", "b": "A file", "c": "A disk", "d": "A port"}, "correct_answer": "a", "explanation": "Threads share an address space."}]'
+        return [FakeChunk(text[i:i + 10]) for i in range(0, len(text), 10)]
 
 def test_mcq_agent():
     print("🧪 Testing MCQ Creator Agent...")
@@ -38,5 +50,21 @@ def test_mcq_agent():
     
     print("🎉 MCQ Creator Agent tests passed!")
 
+def test_stream_mcqs():
+    print("🧪 Testing streaming MCQ generation...")
+    
+    model_registry.set_model(mcq_agent.agent_name, FakeStreamingModel())
+    try:
+        mcqs = list(mcq_agent.stream_mcqs("Operating Systems", "beginner", 2))
+    finally:
+        model_registry.set_model(mcq_agent.agent_name, None)
+    
+    assert len(mcqs) == 2, "❌ Test 1 Failed: Wrong number of streamed MCQs"
+    assert mcqs[0]['question'] == "What is a process?", "❌ Test 2 Failed: Streamed MCQ content wrong"
+    assert metrics.snapshot()['timings']['mcq.time_to_first_question_ms']['count'] >= 1, "❌ Test 3 Failed: Time to first question not recorded"
+    
+    print("✅ Streaming MCQ tests passed!")
+
 if __name__ == "__main__":
-    test_mcq_agent()
\ No newline at end of file
+    test_mcq_agent()
+    test_stream_mcqs()
\ No newline at end of file
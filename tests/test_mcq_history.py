@@ -0,0 +1,112 @@
+import sys
+import os
+import json
+import uuid
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from agents.mcq_agent import mcq_agent
+from memory.mcq_history import MCQHistoryIndex, fingerprint_question
+from memory.memory_bank import memory_bank
+
+QUESTIONS = [
+    {"question": f"Which scheduling algorithm is number {i}?",
+     "options": {"a": "FCFS", "b": "SJF", "c": "Round Robin", "d": "Priority"},
+     "correct_answer": "a", "explanation": "Sample explanation."}
+    for i in range(4)
+]
+
+class CountingModel:
+    """Returns the same questions every time and counts the calls"""
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        return type('Response', (), {'text': json.dumps(QUESTIONS)})()
+
+def test_fingerprint_normalization():
+    print("🧪 Testing question fingerprints...")
+    
+    a = fingerprint_question({"question": "What is a  Process?"})
+    b = fingerprint_question({"question": "what is a process"})
+    c = fingerprint_question({"question": "What is a thread?"})
+    
+    assert a == b, "❌ Test 1 Failed: Case/punctuation changed the fingerprint"
+    assert a != c, "❌ Test 2 Failed: Different questions share a fingerprint"
+    assert fingerprint_question("2+2=?") != fingerprint_question("2*2=?"), "❌ Test 3 Failed: Operators ignored"
+    assert fingerprint_question("Что такое процесс?") != fingerprint_question("Что такое поток?"), \
+        "❌ Test 4 Failed: Non-ASCII questions collapsed"
+    assert fingerprint_question("ＣＰＵ scheduling") == fingerprint_question("cpu scheduling"), \
+        "❌ Test 5 Failed: Unicode forms not normalized"
+    print("✅ Fingerprint tests PASSED")
+
+def test_history_persists():
+    print("🧪 Testing MCQ history index...")
+    
+    student_id = f"test_history_{uuid.uuid4().hex[:8]}"
+    history = MCQHistoryIndex()
+    
+    try:
+        history.mark_served(student_id, "Operating Systems", QUESTIONS[:2])
+        unseen = history.filter_unseen(student_id, "operating systems ", QUESTIONS)
+        assert unseen == QUESTIONS[2:], "❌ Test 1 Failed: Seen questions not filtered"
+        
+        # A fresh index reads the same history back from the memory bank
+        reloaded = MCQHistoryIndex()
+        assert reloaded.has_seen(student_id, "Operating Systems", QUESTIONS[0]), "❌ Test 2 Failed: History not persisted"
+        assert reloaded.seen_count(student_id, "Operating Systems") == 2, "❌ Test 3 Failed: Wrong seen count"
+        
+        # Two workers serving the same student both keep their questions
+        other_worker = MCQHistoryIndex()
+        assert other_worker.seen_count(student_id, "Operating Systems") == 2, "❌ Test 4 Failed: History not loaded"
+        history.mark_served(student_id, "Operating Systems", QUESTIONS[2:3])
+        other_worker.mark_served(student_id, "Operating Systems", QUESTIONS[3:])
+        assert history.seen_count(student_id, "Operating Systems") == 4, "❌ Test 5 Failed: Other worker's write lost"
+        
+        small = MCQHistoryIndex(max_per_topic=3)
+        small.mark_served(student_id, "Networks", QUESTIONS)
+        assert small.seen_count(student_id, "Networks") == 3, "❌ Test 6 Failed: History not trimmed"
+        assert not small.has_seen(student_id, "Networks", QUESTIONS[0]), "❌ Test 7 Failed: Oldest entry kept"
+    finally:
+        path = os.path.join(memory_bank.storage_path, f"{student_id}_memory.json")
+        if os.path.exists(path):
+            os.remove(path)
+    
+    print("✅ MCQ history tests PASSED")
+
+def test_no_repeats_and_pool_reuse():
+    print("🧪 Testing per-student MCQ dedupe...")
+    
+    first_student = f"test_history_{uuid.uuid4().hex[:8]}"
+    second_student = f"test_history_{uuid.uuid4().hex[:8]}"
+    topic = f"Scheduling {uuid.uuid4().hex[:6]}"
+    fake = CountingModel()
+    mcq_agent.model = fake
+    
+    try:
+        first = mcq_agent.generate_mcqs(topic, 'beginner', 2, student_id=first_student)
+        second = mcq_agent.generate_mcqs(topic, 'beginner', 2, student_id=first_student)
+        
+        first_questions = {mcq['question'] for mcq in first}
+        second_questions = {mcq['question'] for mcq in second}
+        assert len(first) == 2 and len(second) == 2, "❌ Test 1 Failed: Wrong number of questions"
+        assert not first_questions & second_questions, "❌ Test 2 Failed: Student saw a question twice"
+        
+        # The pool already has unseen questions for a new student
+        calls_before = fake.calls
+        third = mcq_agent.generate_mcqs(topic, 'beginner', 2, student_id=second_student)
+        assert len(third) == 2, "❌ Test 3 Failed: No pooled questions served"
+        assert fake.calls == calls_before, "❌ Test 4 Failed: Model called although the pool had questions"
+    finally:
+        mcq_agent.model = None
+        for student_id in (first_student, second_student):
+            path = os.path.join(memory_bank.storage_path, f"{student_id}_memory.json")
+            if os.path.exists(path):
+                os.remove(path)
+    
+    print("✅ MCQ dedupe tests PASSED")
+
+if __name__ == "__main__":
+    test_fingerprint_normalization()
+    test_history_persists()
+    test_no_repeats_and_pool_reuse()
@@ -0,0 +1,70 @@
+import sys
+import os
+import subprocess
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from llm.client import ModelRegistry
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class CountingConfig:
+    """Stands in for gcp_config and counts how many models it builds"""
+    def __init__(self):
+        self.created = []
+
+    def get_model(self, generation_config=None):
+        model = {'generation_config': generation_config}
+        self.created.append(model)
+        return model
+
+def test_lazy_startup():
+    print("🧪 Testing that startup does no model work...")
+    
+    # Import every agent with no API key: nothing should touch the model
+    env = dict(os.environ)
+    env.pop('GOOGLE_API_KEY', None)
+    env.pop('LLM_BACKEND', None)
+    env['PYTHONPATH'] = PROJECT_ROOT
+    script = "from agents.coordinator import coordinator; from llm.client import model_registry; print('LOADED', model_registry.loaded_agents())"
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        output = subprocess.run([sys.executable, '-c', script], cwd=tmp, env=env,
+                                capture_output=True, text=True, timeout=60).stdout
+    
+    assert "LOADED []" in output, f"❌ Test 1 Failed: Model work at import time:\n{output}"
+    print("✅ Test 1 PASSED: Agents import without creating models")
+
+def test_shared_models():
+    print("🧪 Testing shared model registry...")
+    
+    config = CountingConfig()
+    registry = ModelRegistry(config)
+    registry.set_generation_config('mcq_agent', {'temperature': 0.7})
+    
+    # Test 1: Many threads asking at once still create one model per agent
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get_model('mcq_agent'))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(config.created) == 1, "❌ Test 1 Failed: Model created more than once"
+    assert all(model is results[0] for model in results), "❌ Test 1 Failed: Threads got different models"
+    print("✅ Test 1 PASSED: One model shared across threads")
+    
+    # Test 2: Per-agent generation configs
+    assert results[0]['generation_config'] == {'temperature': 0.7}, "❌ Test 2 Failed: Agent config not applied"
+    assert registry.get_model('study_plan_agent')['generation_config'] is None, "❌ Test 2 Failed: Config leaked to other agent"
+    print("✅ Test 2 PASSED: Per-agent generation configs applied")
+    
+    # Test 3: Overrides replace the lazily created model
+    registry.set_model('mcq_agent', 'override')
+    assert registry.get_model('mcq_agent') == 'override', "❌ Test 3 Failed: Override ignored"
+    print("✅ Test 3 PASSED: Model override works")
+
+if __name__ == "__main__":
+    test_lazy_startup()
+    test_shared_models()
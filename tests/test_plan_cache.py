@@ -0,0 +1,124 @@
+import sys
+import os
+import json
+import time
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from agents.study_plan_agent import study_plan_agent
+from memory.plan_cache import StudyPlanCache, plan_cache, plan_shape_key
+from llm.resilience import ModelUnavailableError
+
+PLAN = {
+    "weekly_schedule": {"Monday": ["Operating Systems: Processes"], "Tuesday": ["Data Structures: Trees"]},
+    "study_techniques": {"Operating Systems": "Diagrams", "Data Structures": "Practice problems"},
+    "revision_days": ["Sunday"],
+    "weekly_goals": ["Finish Operating Systems unit 1"]
+}
+
+class CountingModel:
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise ModelUnavailableError("model down")
+        return type('Response', (), {'text': json.dumps(PLAN)})()
+
+def test_plan_shape_key():
+    print("🧪 Testing study plan cache keys...")
+    
+    key = plan_shape_key({'Operating Systems': 3, 'Data Structures': 3}, {'preferred_time': 'Morning'})
+    same = plan_shape_key({'data structures': 3, 'operating  systems': 3}, {'Preferred Study Time': ' morning '})
+    other_hours = plan_shape_key({'Operating Systems': 4, 'Data Structures': 2}, {'preferred_time': 'morning'})
+    other_prefs = plan_shape_key({'Operating Systems': 3, 'Data Structures': 3}, {'preferred_time': 'evening'})
+    
+    assert key == same, "❌ Test 1 Failed: Same shape gave different keys"
+    assert key != other_hours, "❌ Test 2 Failed: Hour distribution ignored"
+    assert key != other_prefs, "❌ Test 3 Failed: Preferences ignored"
+    print("✅ Cache key tests PASSED")
+
+def test_shared_plan_cache():
+    print("🧪 Testing shared study plan cache...")
+    
+    plan_cache.clear()
+    fake = CountingModel()
+    study_plan_agent.model = fake
+    
+    try:
+        first = study_plan_agent.generate_study_plan({
+            'subjects': ['Operating Systems', 'Data Structures'], 'available_hours': 6,
+            'preferences': {'preferred_time': 'morning'}
+        })
+        second = study_plan_agent.generate_study_plan({
+            'subjects': ['data structures', 'operating systems'], 'available_hours': 6,
+            'preferences': {'preferred_time': 'Morning'}
+        })
+        
+        assert fake.calls == 1, f"❌ Test 1 Failed: Expected one model call, got {fake.calls}"
+        assert first['weekly_overview'] == PLAN, "❌ Test 2 Failed: First plan changed"
+        
+        # The shared plan uses the second student's own subject names
+        overview = second['weekly_overview']
+        assert overview['weekly_schedule']['Monday'] == ["operating systems: Processes"], "❌ Test 3 Failed: Subject not personalized"
+        assert 'data structures' in overview['study_techniques'], "❌ Test 4 Failed: Techniques not personalized"
+        assert plan_cache.stats()['hit_ratio'] > 0, "❌ Test 5 Failed: Hit ratio not tracked"
+        
+        # Default plans from an unavailable model are not cached
+        study_plan_agent.model = CountingModel(fail=True)
+        profile = {'subjects': ['Compilers'], 'available_hours': 2, 'preferences': {}}
+        study_plan_agent.generate_study_plan(profile)
+        assert plan_cache.get(plan_shape_key({'Compilers': 2}, {})) is None, "❌ Test 6 Failed: Fallback plan cached"
+    finally:
+        study_plan_agent.model = None
+        plan_cache.clear()
+    
+    print("✅ Shared study plan cache tests PASSED")
+
+def test_waiters_share_uncached_results():
+    print("🧪 Testing single-flight for fallback plans and errors...")
+    cache = StudyPlanCache()
+    calls = []
+
+    def slow(result):
+        def create():
+            calls.append(1)
+            time.sleep(0.2)
+            if isinstance(result, Exception):
+                raise result
+            return result, False
+        return create
+
+    def race(create, count=5):
+        outcomes = []
+        def run():
+            try:
+                outcomes.append(cache.get_or_create('shape', create))
+            except Exception as e:
+                outcomes.append(e)
+        threads = [threading.Thread(target=run) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    fallback = {'source': 'default'}
+    outcomes = race(slow(fallback))
+    assert len(calls) == 1, f"❌ Test 1 Failed: Fallback built {len(calls)} times"
+    assert all(outcome is fallback for outcome in outcomes), "❌ Test 2 Failed: Waiters didn't get the fallback"
+    assert cache.get('shape') is None, "❌ Test 3 Failed: Fallback cached"
+
+    calls.clear()
+    outcomes = race(slow(ModelUnavailableError("model down")))
+    assert len(calls) == 1, f"❌ Test 4 Failed: Failing create ran {len(calls)} times"
+    assert all(isinstance(outcome, ModelUnavailableError) for outcome in outcomes), "❌ Test 5 Failed: Error not shared"
+    print("✅ Test 1-5 PASSED: One create per burst, whatever it returns")
+
+if __name__ == "__main__":
+    test_plan_shape_key()
+    test_shared_plan_cache()
+    test_waiters_share_uncached_results()
@@ -0,0 +1,86 @@
+import sys
+import os
+import uuid
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from memory.memory_bank import MemoryBank
+from memory.profile_store import ProfileStore
+
+def make_cohort(store):
+    store.put('student_1', {'subjects': ['Computer Networks', 'DBMS'], 'available_hours': 4,
+                            'preferences': {'preferred_time': 'Morning'}})
+    store.put('student_2', {'subjects': ['computer networks'], 'available_hours': 12,
+                            'preferences': {'preferred_time': 'morning', 'learning_style': 'visual'}})
+    store.put('student_3', {'subjects': ['Computer Networks'], 'available_hours': 5,
+                            'preferences': {'study_time': 'evening'}})
+    store.put('student_4', {'subjects': ['Operating Systems'], 'available_hours': 2,
+                            'preferences': {'preferred_time': 'morning'}})
+
+def test_cohort_queries():
+    print("🧪 Testing profile index queries...")
+    store = ProfileStore(storage=MemoryBank(tempfile.mkdtemp()))
+    make_cohort(store)
+
+    result = store.index.query(subject='Computer Networks', preferences={'preferred_time': 'morning'})
+    assert result['student_ids'] == ['student_1', 'student_2'], f"❌ Test 1 Failed: {result}"
+    result = store.index.query(max_hours=5)
+    assert result['student_ids'] == ['student_1', 'student_4'], f"❌ Test 2 Failed: {result}"
+    result = store.index.query(subject='computer networks', min_hours=5, max_hours=20)
+    assert result['student_ids'] == ['student_2', 'student_3'], f"❌ Test 3 Failed: {result}"
+    # Preference aliases are indexed under the canonical name
+    result = store.index.query(preferences={'preferred_time': 'evening'})
+    assert result['student_ids'] == ['student_3'], f"❌ Test 4 Failed: {result}"
+    assert store.index.query(subject='Compilers')['total'] == 0, "❌ Test 5 Failed: Unknown subject matched"
+
+    # Re-saving a profile moves it between index entries
+    store.put('student_4', {'subjects': ['Computer Networks'], 'available_hours': 2,
+                            'preferences': {'preferred_time': 'night'}})
+    result = store.index.query(subject='Computer Networks', preferences={'preferred_time': 'morning'})
+    assert 'student_4' not in result['student_ids'], "❌ Test 6 Failed: Stale index entry"
+    assert store.index.query(subject='Operating Systems')['total'] == 0, "❌ Test 7 Failed: Old subject kept"
+    print("✅ Test 1-7 PASSED: Filters intersect correctly")
+
+def test_other_workers_and_pagination():
+    print("🧪 Testing index refresh and pagination...")
+    storage = MemoryBank(tempfile.mkdtemp())
+    reader = ProfileStore(storage=storage, index_refresh_s=0)
+    writer = ProfileStore(storage=storage)
+    make_cohort(writer)
+
+    pages = []
+    cursor = None
+    while True:
+        page = reader.query(subject='Computer Networks', limit=2, cursor=cursor)
+        pages.append([profile['student_id'] for profile in page['students']])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert pages == [['student_1', 'student_2'], ['student_3']], f"❌ Test 8 Failed: Pages {pages}"
+
+    writer.delete('student_2')
+    assert reader.index.query(subject='Computer Networks')['total'] == 2, "❌ Test 9 Failed: Deleted profile kept"
+    print("✅ Test 8-9 PASSED: Other workers' profiles found, pages complete")
+
+def test_students_endpoint():
+    print("🧪 Testing GET /students...")
+    from cloud_run_app import app
+    from memory.profile_store import profile_store
+    client = app.test_client()
+
+    subject = f"Subject {uuid.uuid4().hex[:8]}"
+    for n in range(3):
+        profile_store.put(f"index_test_{uuid.uuid4().hex[:8]}", {'subjects': [subject], 'available_hours': 3 + n,
+                                                                'preferences': {'preferred_time': 'morning'}})
+
+    response = client.get(f'/students?subject={subject}&preferred_time=morning&max_hours=5&limit=1')
+    data = response.get_json()
+    assert response.status_code == 200, f"❌ Test 10 Failed: Status {response.status_code}"
+    assert data['total'] == 2 and len(data['students']) == 1 and data['next_cursor'], f"❌ Test 11 Failed: {data}"
+    assert client.get('/students?max_hours=many').status_code == 400, "❌ Test 12 Failed: Bad number accepted"
+    print("✅ Test 10-12 PASSED: Endpoint filters and paginates")
+
+if __name__ == "__main__":
+    test_cohort_queries()
+    test_other_workers_and_pagination()
+    test_students_endpoint()
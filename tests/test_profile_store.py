@@ -0,0 +1,119 @@
+import sys
+import os
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from memory.memory_bank import MemoryBank
+from memory.profile_store import ProfileStore
+from memory.profile_record import ProfileRecord, subject_table
+from agents.student_profile_agent import StudentProfileAgent
+
+def test_profiles_shared_between_workers():
+    print("🧪 Testing profiles shared between workers...")
+    storage = MemoryBank(tempfile.mkdtemp())
+    # Two stores on the same storage stand in for two workers
+    worker_a = StudentProfileAgent(ProfileStore(storage=storage))
+    worker_b = StudentProfileAgent(ProfileStore(storage=storage))
+
+    worker_a.collect_student_info('student_x', ['Algorithms'], 6)
+    profile = worker_b.get_student_profile('student_x')
+    assert profile['subjects'] == ['Algorithms'], "❌ Test 1 Failed: Profile not visible on the other worker"
+    assert profile['version'] == 1, "❌ Test 2 Failed: Version not set"
+
+    # B has it cached now; an update on A must still reach B
+    assert worker_a.update_study_preferences('student_x', {'difficulty': 'hard'}), "❌ Test 3 Failed: Update failed"
+    profile = worker_b.get_student_profile('student_x')
+    assert profile['preferences'] == {'difficulty': 'hard'}, "❌ Test 4 Failed: Stale cached profile"
+    assert profile['version'] == 2, "❌ Test 5 Failed: Version not bumped"
+
+    # Callers get copies, not the cached profile
+    profile['subjects'].append('Changed')
+    assert worker_b.get_student_profile('student_x')['subjects'] == ['Algorithms'], "❌ Test 6 Failed: Cache mutated"
+    assert not worker_b.update_study_preferences('nobody', {}), "❌ Test 7 Failed: Unknown student updated"
+    print("✅ Test 1-7 PASSED: Profiles persisted and invalidated")
+
+def test_cache_is_bounded():
+    print("🧪 Testing profile cache bound...")
+    store = ProfileStore(storage=MemoryBank(tempfile.mkdtemp()), cache_size=3)
+    for n in range(10):
+        store.put(f"student_{n}", {'subjects': ['Databases']})
+    assert len(store._cache) == 3, f"❌ Test 8 Failed: {len(store._cache)} profiles cached"
+    assert store.get('student_0')['subjects'] == ['Databases'], "❌ Test 9 Failed: Evicted profile not reloaded"
+    print("✅ Test 8-9 PASSED: Cache stays bounded")
+
+def test_compact_records_round_trip():
+    print("🧪 Testing compact profile records...")
+    profile = {
+        'subjects': ['Algorithms', 'DBMS'],
+        'available_hours': 7,
+        'preferences': {'preferred_time': 'morning', 'focus_days': ['mon', 'wed'], 'reminders': True},
+        'created_at': '2026-03-01T09:15:30.123456',
+        'student_id': 'student_7',
+        'version': 3,
+        'last_updated': '2026-03-02T10:00:00',
+        'notes': {'advisor': 'Dr. Rao'}
+    }
+    record = ProfileRecord.from_dict(profile)
+    assert record.to_dict() == profile, "❌ Test 10 Failed: Round trip changed the profile"
+    assert not hasattr(record, '__dict__'), "❌ Test 11 Failed: Record has a per-instance dict"
+    for stamp in ('2024-01-05T10:00', '2024-01-05 10:00:00', '2024-01-05', 1704448800.0, '2024-01-05T10:00:00+05:30'):
+        odd = dict(profile, created_at=stamp, last_updated=stamp)
+        assert ProfileRecord.from_dict(odd).to_dict() == odd, f"❌ Test 11 Failed: {stamp!r} changed"
+
+    other = ProfileRecord.from_dict(dict(profile, student_id='student_8'))
+    assert other.subjects == record.subjects, "❌ Test 12 Failed: Subjects not shared"
+    assert subject_table.value(record.subjects[0]) == 'Algorithms', "❌ Test 13 Failed: Wrong subject ID"
+
+    # Cached profiles come back as independent dicts
+    store = ProfileStore(storage=MemoryBank(tempfile.mkdtemp()))
+    store.put('student_7', profile)
+    first = store.get('student_7')
+    first['preferences']['focus_days'].append('fri')
+    assert store.get('student_7')['preferences']['focus_days'] == ['mon', 'wed'], "❌ Test 14 Failed: Cache mutated"
+    print("✅ Test 10-14 PASSED: Records are compact and lossless")
+
+def test_allocated_ids_are_unique():
+    print("🧪 Testing student ID allocation...")
+    storage = MemoryBank(tempfile.mkdtemp())
+    stores = [ProfileStore(storage=storage) for _ in range(4)]
+    stores[0].put('student_2', {'subjects': ['Compilers']})
+
+    ids = []
+    lock = threading.Lock()
+
+    def allocate(store):
+        for _ in range(25):
+            student_id = store.allocate_id()
+            with lock:
+                ids.append(student_id)
+
+    threads = [threading.Thread(target=allocate, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(ids)) == 100, "❌ Test 15 Failed: Duplicate student IDs"
+    assert 'student_2' not in ids, "❌ Test 16 Failed: Existing student ID handed out"
+    print("✅ Test 15-16 PASSED: IDs never collide")
+
+def test_onboarding_without_id():
+    print("🧪 Testing onboarding without a student_id...")
+    from agents.coordinator import coordinator
+    from agents.study_plan_agent import study_plan_agent
+    study_plan_agent.enrichment_mode = 'off'
+    try:
+        first = coordinator.onboard_new_student({'subjects': ['Networks'], 'available_hours': 3})
+        second = coordinator.onboard_new_student({'subjects': ['Networks'], 'available_hours': 3})
+    finally:
+        study_plan_agent.enrichment_mode = 'async'
+    assert first['student_id'] != second['student_id'], "❌ Test 17 Failed: Same ID allocated twice"
+    print("✅ Test 17 PASSED: Onboarding allocates distinct IDs")
+
+if __name__ == "__main__":
+    test_profiles_shared_between_workers()
+    test_cache_is_bounded()
+    test_compact_records_round_trip()
+    test_allocated_ids_are_unique()
+    test_onboarding_without_id()
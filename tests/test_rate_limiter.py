@@ -0,0 +1,79 @@
+import sys
+import os
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from llm.rate_limiter import (RateLimiter, FileTokenBucket, RateLimitTimeoutError,
+                              call_priority, current_priority, INTERACTIVE, BATCH)
+from utils.metrics import metrics
+
+def test_token_bucket_rate():
+    print("🧪 Testing token bucket rate...")
+    
+    limiter = RateLimiter(rate_per_s=20, burst=1)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire(INTERACTIVE)
+    elapsed = time.monotonic() - start
+    
+    assert elapsed >= 0.18, f"❌ Test 1 Failed: 5 calls at 20/s took only {elapsed:.2f}s"
+    print(f"✅ Test 1 PASSED: Rate enforced ({elapsed:.2f}s for 5 calls)")
+    
+    try:
+        limiter = RateLimiter(rate_per_s=0.1, burst=1)
+        limiter.acquire(BATCH)
+        limiter.acquire(BATCH, timeout=0.1)
+        assert False, "❌ Test 2 Failed: Acquire did not time out"
+    except RateLimitTimeoutError:
+        print("✅ Test 2 PASSED: Acquire times out")
+
+def test_priority_fairness():
+    print("🧪 Testing priority classes...")
+    
+    limiter = RateLimiter(rate_per_s=20, burst=1)
+    limiter.acquire(BATCH)  # empty the bucket so everyone queues
+    
+    order = []
+    lock = threading.Lock()
+    
+    def worker(priority):
+        limiter.acquire(priority)
+        with lock:
+            order.append(priority)
+    
+    threads = [threading.Thread(target=worker, args=(BATCH,)) for _ in range(8)]
+    threads += [threading.Thread(target=worker, args=(INTERACTIVE,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    first_half = order[:8]
+    assert first_half.count(INTERACTIVE) >= 5, f"❌ Test 1 Failed: Interactive not preferred: {order}"
+    assert BATCH in order[:10], f"❌ Test 2 Failed: Batch starved: {order}"
+    assert 'llm.rate_limiter.wait_ms.batch' in metrics.snapshot()['timings'], "❌ Test 3 Failed: Wait time not exported"
+    print(f"✅ Interactive calls admitted first without starving batch: {order}")
+
+def test_priority_scope_and_shared_bucket():
+    print("🧪 Testing priority scope and cross-process bucket...")
+    
+    assert current_priority() == INTERACTIVE
+    with call_priority(BATCH):
+        assert current_priority() == BATCH, "❌ Test 1 Failed: Priority scope not applied"
+    assert current_priority() == INTERACTIVE, "❌ Test 1 Failed: Priority scope leaked"
+    print("✅ Test 1 PASSED: Priority scope works")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bucket.json')
+        worker_a = FileTokenBucket(path, rate_per_s=0.01, capacity=2)
+        worker_b = FileTokenBucket(path, rate_per_s=0.01, capacity=2)
+        assert worker_a.try_take() and worker_b.try_take(), "❌ Test 2 Failed: Tokens not available"
+        assert not worker_a.try_take(), "❌ Test 2 Failed: Quota not shared between workers"
+    print("✅ Test 2 PASSED: File bucket shares one quota")
+
+if __name__ == "__main__":
+    test_token_bucket_rate()
+    test_priority_fairness()
+    test_priority_scope_and_shared_bucket()
@@ -0,0 +1,166 @@
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from llm.client import model_registry
+from llm.resilience import (ResilientModel, ResiliencePolicy, CircuitOpenError,
+                            DeadlineExceededError, request_deadline)
+from utils.metrics import metrics
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class ScriptedModel:
+    """Each call sleeps for the next delay in the script (or fails)"""
+    def __init__(self, delays=None, fail=False):
+        self.delays = list(delays or [])
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        with self._lock:
+            self.calls += 1
+            delay = self.delays.pop(0) if self.delays else 0
+        time.sleep(delay)
+        if self.fail:
+            raise ConnectionError("upstream down")
+        return FakeResponse(f"answer to {prompt}")
+
+def test_timeouts_and_deadlines():
+    print("🧪 Testing model call timeouts...")
+    
+    model_registry.set_model('resilience_timeout', ScriptedModel(delays=[2, 2]))
+    wrapper = ResilientModel('resilience_timeout', ResiliencePolicy(timeout_s=0.1))
+    
+    # Test 1: A hung call stops blocking after the per-agent timeout
+    start = time.monotonic()
+    try:
+        wrapper.generate_content("slow")
+        assert False, "❌ Test 1 Failed: Slow call did not time out"
+    except DeadlineExceededError:
+        assert time.monotonic() - start < 1, "❌ Test 1 Failed: Timeout took too long"
+    print("✅ Test 1 PASSED: Per-call timeout enforced")
+    
+    # Test 2: The request budget caps the timeout
+    wrapper.policy.timeout_s = 10
+    start = time.monotonic()
+    with request_deadline(0.1):
+        try:
+            wrapper.generate_content("slow")
+            assert False, "❌ Test 2 Failed: Request deadline ignored"
+        except DeadlineExceededError:
+            assert time.monotonic() - start < 1, "❌ Test 2 Failed: Deadline took too long"
+    print("✅ Test 2 PASSED: Request deadline respected")
+    
+    assert metrics.get_counter('llm.resilience_timeout.timeouts') == 2, "❌ Test 3 Failed: Timeouts not counted"
+    model_registry.set_model('resilience_timeout', None)
+
+def test_circuit_breaker():
+    print("🧪 Testing circuit breaker...")
+    
+    model = ScriptedModel()
+    model_registry.set_model('resilience_breaker', model)
+    wrapper = ResilientModel('resilience_breaker', ResiliencePolicy(failure_threshold=2, reset_timeout_s=0.2))
+    
+    # A good response is cached for use while the circuit is open
+    assert wrapper.generate_content("cached prompt").text == "answer to cached prompt"
+    
+    model.fail = True
+    for _ in range(2):
+        try:
+            wrapper.generate_content("new prompt")
+        except ConnectionError:
+            pass
+    calls_when_tripped = model.calls
+    
+    # Test 1: Open circuit rejects without calling upstream
+    try:
+        wrapper.generate_content("new prompt")
+        assert False, "❌ Test 1 Failed: Open circuit let a call through"
+    except CircuitOpenError:
+        pass
+    assert model.calls == calls_when_tripped, "❌ Test 1 Failed: Upstream called while open"
+    print("✅ Test 1 PASSED: Circuit opened after consecutive failures")
+    
+    # Test 2: Cached responses are served while open
+    assert wrapper.generate_content("cached prompt").text == "answer to cached prompt", "❌ Test 2 Failed: Cache not served"
+    print("✅ Test 2 PASSED: Cached response served while open")
+    
+    # Test 3: After the reset timeout a trial call closes the circuit again
+    model.fail = False
+    time.sleep(0.25)
+    assert wrapper.generate_content("new prompt").text == "answer to new prompt", "❌ Test 3 Failed: Trial call failed"
+    assert wrapper.breaker.state == 'closed', "❌ Test 3 Failed: Circuit did not close"
+    print("✅ Test 3 PASSED: Circuit closed after successful trial")
+    model_registry.set_model('resilience_breaker', None)
+
+def test_hedged_requests():
+    print("🧪 Testing hedged requests...")
+    
+    # First attempt hangs, the hedge answers quickly
+    model = ScriptedModel(delays=[1.5, 0])
+    model_registry.set_model('resilience_hedge', model)
+    wrapper = ResilientModel('resilience_hedge', ResiliencePolicy(
+        timeout_s=5, hedge=True, hedge_min_samples=0, hedge_min_delay_s=0.05))
+    
+    start = time.monotonic()
+    response = wrapper.generate_content("hedge me")
+    assert response.text == "answer to hedge me", "❌ Test 1 Failed: Wrong hedged response"
+    assert time.monotonic() - start < 1, "❌ Test 1 Failed: Hedge did not win"
+    assert model.calls == 2, "❌ Test 2 Failed: Hedge not fired"
+    assert metrics.get_counter('llm.resilience_hedge.hedge_wins') == 1, "❌ Test 3 Failed: Hedge win not counted"
+    print("✅ Hedged request beat the slow attempt")
+    model_registry.set_model('resilience_hedge', None)
+
+class StallingStreamModel:
+    """Streams two chunks, then stalls for stall_s before the rest"""
+    def __init__(self, stall_s):
+        self.stall_s = stall_s
+
+    def generate_content(self, prompt, **kwargs):
+        def chunks():
+            yield FakeResponse("first ")
+            yield FakeResponse("second ")
+            time.sleep(self.stall_s)
+            yield FakeResponse("late")
+        return chunks()
+
+def test_streams_are_timed():
+    print("🧪 Testing streamed responses against the deadline...")
+    
+    model_registry.set_model('resilience_stream', StallingStreamModel(stall_s=2))
+    wrapper = ResilientModel('resilience_stream', ResiliencePolicy(timeout_s=10, failure_threshold=1))
+    
+    # Test 1: A stream that stalls stops blocking at the request deadline and counts as a failure
+    received = []
+    start = time.monotonic()
+    with request_deadline(0.3):
+        try:
+            for chunk in wrapper.generate_content("stream", stream=True):
+                received.append(chunk.text)
+            assert False, "❌ Test 1 Failed: Stalled stream did not time out"
+        except DeadlineExceededError:
+            assert time.monotonic() - start < 1, "❌ Test 1 Failed: Stall not cut off at the deadline"
+    assert received == ["first ", "second "], f"❌ Test 2 Failed: Chunks before the stall lost {received}"
+    assert wrapper.breaker.state == wrapper.breaker.OPEN, "❌ Test 3 Failed: Stalled stream counted as a success"
+    print("✅ Test 1-3 PASSED: Stalled stream timed out")
+    
+    # Test 4: A stream that finishes in time closes the circuit again
+    model_registry.set_model('resilience_stream', StallingStreamModel(stall_s=0))
+    wrapper.policy.reset_timeout_s = 0
+    wrapper.breaker.reset_timeout_s = 0
+    text = ''.join(chunk.text for chunk in wrapper.generate_content("stream", stream=True))
+    assert text == "first second late", f"❌ Test 4 Failed: {text}"
+    assert wrapper.breaker.state == wrapper.breaker.CLOSED, "❌ Test 5 Failed: Finished stream not a success"
+    print("✅ Test 4-5 PASSED: Finished stream recorded as a success")
+    model_registry.set_model('resilience_stream', None)
+
+if __name__ == "__main__":
+    test_timeouts_and_deadlines()
+    test_circuit_breaker()
+    test_hedged_requests()
+    test_streams_are_timed()
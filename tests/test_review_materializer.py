@@ -0,0 +1,94 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from agents.coordinator import coordinator
+from agents.progress_tracker import progress_tracker
+from agents.review_materializer import ReviewMaterializer
+from llm.rate_limiter import current_priority, INTERACTIVE, BATCH
+from memory.memory_bank import memory_bank
+from utils.event_bus import event_bus
+
+STUDENTS = ['review_test_001', 'review_test_002']
+
+def _setup_students():
+    for student_id in STUDENTS:
+        coordinator.onboard_new_student({
+            'student_id': student_id,
+            'subjects': ['Operating Systems', 'Computer Networks'],
+            'available_hours': 6
+        }, enrich=False)
+        progress_tracker.record_study_session(student_id, {'subjects': ['Operating Systems'], 'duration': 60})
+
+    # Nothing recorded for months: not an active student
+    memory_bank.save_student_memory('review_test_inactive', {
+        'study_sessions': [{'timestamp': '2020-01-01T09:00:00', 'duration_minutes': 30}]
+    })
+    # Derived progress updates land before the reviews are fingerprinted
+    event_bus.drain()
+
+def test_materialize_only_changed():
+    print("🧪 Testing weekly review materialization...")
+    _setup_students()
+    materializer = ReviewMaterializer(coordinator, processes=1, model_concurrency=2)
+
+    summary = materializer.run(force=True)
+    first = {student_id: materializer.get_review(student_id) for student_id in STUDENTS}
+    assert all(doc.get('review', {}).get('next_week_plan') for doc in first.values()), "❌ Test 1 Failed: Reviews not stored"
+    assert not materializer.get_review('review_test_inactive'), "❌ Test 2 Failed: Inactive student was reviewed"
+    assert summary['inactive'] >= 1, "❌ Test 3 Failed: Inactive student not counted"
+    print("✅ Test 1-3 PASSED: Active students' reviews stored")
+
+    # Only the student with a new session is recomputed
+    progress_tracker.record_study_session(STUDENTS[0], {'subjects': ['Computer Networks'], 'duration': 45})
+    event_bus.drain()
+    materializer.run()
+    changed = materializer.get_review(STUDENTS[0])
+    unchanged = materializer.get_review(STUDENTS[1])
+    assert changed['fingerprint'] != first[STUDENTS[0]]['fingerprint'], "❌ Test 4 Failed: Changed student not recomputed"
+    sessions_before = first[STUDENTS[0]]['review']['progress']['metrics']['total_study_sessions']
+    assert changed['review']['progress']['metrics']['total_study_sessions'] == sessions_before + 1, "❌ Test 5 Failed: Stale progress stored"
+    assert unchanged['materialized_at'] == first[STUDENTS[1]]['materialized_at'], "❌ Test 6 Failed: Unchanged student recomputed"
+    print("✅ Test 4-6 PASSED: Only changed students recomputed")
+
+def test_process_pool_matches_in_process():
+    print("🧪 Testing progress metrics across processes...")
+    _setup_students()
+    in_process = ReviewMaterializer(coordinator, processes=1, chunk_size=1)
+    pooled = ReviewMaterializer(coordinator, processes=2, chunk_size=1)
+
+    ids = STUDENTS + ['review_test_inactive']
+    expected = in_process._snapshots(ids, '2024-01-01')
+    actual = pooled._snapshots(ids, '2024-01-01')
+    assert [row[:2] for row in actual] == [row[:2] for row in expected], "❌ Test 7 Failed: Fingerprints differ"
+    assert [row[2] and row[2]['metrics'] for row in actual] == [row[2] and row[2]['metrics'] for row in expected], \
+        "❌ Test 8 Failed: Metrics differ"
+    print("✅ Test 7-8 PASSED: Worker processes compute the same metrics")
+
+def test_priority_follows_the_caller():
+    print("🧪 Testing model call priority of reviews...")
+    _setup_students()
+    materializer = ReviewMaterializer(coordinator, processes=1)
+    priorities = []
+    workflow = coordinator.weekly_review_workflow
+    original = workflow.run
+
+    def recording(*args, **kwargs):
+        priorities.append(current_priority())
+        return original(*args, **kwargs)
+
+    workflow.run = recording
+    try:
+        materializer.run(force=True)
+        assert priorities and set(priorities) == {BATCH}, f"❌ Test 9 Failed: Nightly run at {priorities}"
+        priorities.clear()
+        materializer.refresh(STUDENTS[0])
+        assert priorities == [INTERACTIVE], f"❌ Test 10 Failed: Request path at {priorities}"
+    finally:
+        workflow.run = original
+    print("✅ Test 9-10 PASSED: Nightly reviews are batch, on-demand reviews interactive")
+
+if __name__ == "__main__":
+    test_materialize_only_changed()
+    test_process_pool_matches_in_process()
+    test_priority_follows_the_caller()
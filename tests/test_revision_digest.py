@@ -0,0 +1,79 @@
+import sys
+import os
+import json
+import time
+import tempfile
+from datetime import date
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from agents.spaced_repetition import SpacedRepetitionEngine, DAY_S
+from agents.revision_digest import RevisionDigestJob
+from memory.due_wheel import DueWheel, day_of
+from memory.memory_bank import MemoryBank
+
+def make_job(carry_days: int = 7):
+    root = tempfile.mkdtemp()
+    wheel = DueWheel(os.path.join(root, 'due_wheel'))
+    engine = SpacedRepetitionEngine(storage=MemoryBank(root), wheel=wheel)
+    return engine, wheel, RevisionDigestJob(engine, wheel, os.path.join(root, 'digests'), carry_days)
+
+def test_due_wheel_buckets():
+    print("🧪 Testing due wheel buckets...")
+    engine, wheel, _ = make_job()
+    now = time.mktime(date(2026, 3, 2).timetuple()) + 10 * 3600
+    engine.review('student_1', 'OS', 5, now)
+    engine.review('student_1', 'DSA', 5, now)
+    engine.review('student_2', 'OS', 0, now)
+
+    tomorrow = day_of(now + DAY_S)
+    assert wheel.days() == [tomorrow], f"❌ Test 1 Failed: Buckets {wheel.days()}"
+    students = dict(wheel.students_due(tomorrow))
+    assert sorted(students) == ['student_1', 'student_2'], "❌ Test 2 Failed: Wrong students in bucket"
+    assert [item['topic'] for item in students['student_1']] == ['OS', 'DSA'], "❌ Test 3 Failed: Wrong items"
+    assert list(wheel.students_due('2026-01-01')) == [], "❌ Test 4 Failed: Empty day isn't empty"
+    print("✅ Test 1-4 PASSED: Due dates land in their day's bucket")
+
+def test_daily_digests():
+    print("🧪 Testing daily revision digests...")
+    engine, wheel, job = make_job(carry_days=2)
+    day0 = time.mktime(date(2026, 3, 2).timetuple()) + 10 * 3600
+    for student in range(20):
+        engine.review(f"student_{student}", 'OS', 5, day0)
+        if student % 2 == 0:
+            engine.review(f"student_{student}", 'DSA', 1, day0)
+    # Far-off cards must not be read on day 1
+    for n in range(3):
+        engine.review('student_far', 'CN', 5, day0 - 30 * DAY_S + n * DAY_S)
+
+    day1 = day_of(day0 + DAY_S)
+    summary = job.run(day1)
+    assert summary['students'] == 20 and summary['topics'] == 30, f"❌ Test 5 Failed: Summary {summary}"
+    with open(summary['outbox']) as f:
+        digests = {digest['student_id']: digest for digest in map(json.loads, f)}
+    assert digests['student_0']['topics'] == ['OS', 'DSA'] and digests['student_0']['count'] == 2, \
+        f"❌ Test 6 Failed: Digest {digests['student_0']}"
+    assert 'student_far' not in digests, "❌ Test 7 Failed: Student without due topics got a digest"
+    assert digests['student_1']['message'] == "You have 1 topic to revise today", "❌ Test 8 Failed: Message"
+    print("✅ Test 5-8 PASSED: Digests for the day's due topics")
+
+    # Re-running the day gives the same outbox; revising a topic drops it from the next day
+    assert job.run(day1)['topics'] == 30, "❌ Test 9 Failed: Re-run changed the digests"
+    engine.review('student_1', 'OS', 5, day0 + DAY_S + 3600)
+    day2 = wheel.next_day(day1)
+    summary = job.run(day2)
+    with open(summary['outbox']) as f:
+        digests = {digest['student_id']: digest for digest in map(json.loads, f)}
+    assert 'student_1' not in digests, f"❌ Test 10 Failed: Revised topic carried {digests.get('student_1')}"
+    assert digests['student_0']['overdue'] == 2, "❌ Test 11 Failed: Carried topics not overdue"
+    assert summary['students'] == 19 and summary['topics'] == 29, f"❌ Test 12 Failed: Summary {summary}"
+
+    # Unrevised topics stop after carry_days, and old buckets are deleted
+    day3 = wheel.next_day(day2)
+    assert job.run(day3)['topics'] == 29, "❌ Test 13 Failed: Dropped within carry_days"
+    assert job.run(wheel.next_day(day3))['topics'] == 0, "❌ Test 13 Failed: Carried past carry_days"
+    assert day1 not in wheel.days(), f"❌ Test 14 Failed: Old bucket kept {wheel.days()}"
+    print("✅ Test 9-14 PASSED: Re-runs, revisions and carry-over")
+
+if __name__ == "__main__":
+    test_due_wheel_buckets()
+    test_daily_digests()
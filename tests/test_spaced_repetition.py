@@ -0,0 +1,82 @@
+import sys
+import os
+import uuid
+import random
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from agents.spaced_repetition import SpacedRepetitionEngine, next_card, quality_from_percentage, DAY_S
+from memory.memory_bank import MemoryBank
+from utils.event_bus import event_bus
+
+def test_sm2_updates():
+    print("🧪 Testing SM-2 card updates...")
+    card = {}
+    intervals = []
+    for _ in range(3):
+        card = next_card(card, 5, 0.0)
+        intervals.append(card['interval_days'])
+    assert intervals == [1, 6, 16], f"❌ Test 1 Failed: Intervals {intervals}"
+    assert card['ease'] == 2.8, f"❌ Test 2 Failed: Ease {card['ease']}"
+
+    card = next_card(card, 1, 0.0)
+    assert card['interval_days'] == 1 and card['repetitions'] == 0, "❌ Test 3 Failed: Lapse didn't reset"
+    assert card['lapses'] == 1 and card['ease'] < 2.8, "❌ Test 4 Failed: Lapse not counted"
+    assert quality_from_percentage(100) == 5 and quality_from_percentage(40) == 2, "❌ Test 5 Failed: Quality mapping"
+    print("✅ Test 1-5 PASSED: SM-2 intervals and ease")
+
+def test_due_queue():
+    print("🧪 Testing due queue...")
+    root = tempfile.mkdtemp()
+    engine = SpacedRepetitionEngine(storage=MemoryBank(root))
+    rng = random.Random(3)
+    now = 1_000_000.0
+    for n in range(60):
+        engine.review('student_1', f"Topic {n}", rng.randint(0, 5), now - rng.randint(0, 20) * DAY_S)
+    # Reviewing again leaves stale heap entries behind that must be skipped
+    for n in range(0, 60, 3):
+        engine.review('student_1', f"Topic {n}", 5, now)
+
+    deck = engine._load('student_1')
+    expected = {topic for topic, card in deck['cards'].items() if card['due'] <= now}
+    due = engine.due('student_1', until=now)
+    assert {card['topic'] for card in due} == expected and len(due) == len(expected), "❌ Test 6 Failed: Wrong due topics"
+    due_times = [deck['cards'][card['topic']]['due'] for card in due]
+    assert due_times == sorted(due_times), "❌ Test 7 Failed: Not earliest first"
+    assert len(engine.due('student_1', until=now, limit=3)) == min(3, len(expected)), "❌ Test 8 Failed: Limit ignored"
+
+    first = engine.next_due('student_1')
+    assert deck['cards'][first['topic']]['due'] == min(card['due'] for card in deck['cards'].values()), \
+        "❌ Test 9 Failed: Wrong next due"
+    assert len(deck['heap']) <= 2 * len(deck['cards']), "❌ Test 10 Failed: Heap not compacted"
+    assert engine.wheel.path == os.path.join(root, 'due_wheel') and engine.wheel.days(), \
+        "❌ Test 11 Failed: Due dates not kept next to the engine's storage"
+    shutil.rmtree(root, ignore_errors=True)
+    print("✅ Test 6-11 PASSED: Due topics come out earliest first")
+
+def test_learns_from_mcq_results():
+    print("🧪 Testing cards learn from MCQ scores...")
+    from agents.progress_tracker import progress_tracker
+    from agents.spaced_repetition import spaced_repetition
+    from cloud_run_app import app
+
+    student_id = f"revision_test_{uuid.uuid4().hex[:8]}"
+    progress_tracker.update_mcq_performance(student_id, 'Deadlocks', 1, 5)
+    progress_tracker.update_mcq_performance(student_id, 'Paging', 5, 5)
+    assert event_bus.drain(timeout=10), "❌ Test 12 Failed: Events not handled"
+
+    cards = spaced_repetition.cards(student_id)
+    assert cards['Deadlocks']['lapses'] == 1 and cards['Paging']['repetitions'] == 1, f"❌ Test 13 Failed: {cards}"
+
+    response = app.test_client().get(f'/revision/{student_id}?days=2')
+    data = response.get_json()
+    assert response.status_code == 200, f"❌ Test 14 Failed: Status {response.status_code}"
+    assert {card['topic'] for card in data['due']} == {'Deadlocks', 'Paging'}, f"❌ Test 15 Failed: {data}"
+    assert app.test_client().get(f'/revision/{student_id}').get_json()['due'] == [], "❌ Test 16 Failed: Due too early"
+    print("✅ Test 12-16 PASSED: MCQ results schedule revisions")
+
+if __name__ == "__main__":
+    test_sm2_updates()
+    test_due_queue()
+    test_learns_from_mcq_results()
@@ -0,0 +1,85 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from utils.json_repair import parse_json_with_repair
+from agents.schemas import validate_mcqs, validate_weekly_plan
+from agents.mcq_agent import mcq_agent
+from llm.client import model_registry
+from utils.metrics import metrics
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeFixModel:
+    """Returns a corrected question and remembers the prompts it was sent"""
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return FakeResponse('[{"question": "Fixed?", "options": {"a": "1", "b": "2", "c": "3", "d": "4"}, "correct_answer": "b", "explanation": "Fixed."}]')
+
+def test_json_repair():
+    print("🧪 Testing JSON repair...")
+    
+    # Test 1: Code fences and trailing commas are repaired locally
+    data, repairs = parse_json_with_repair('```json\n[{"a": 1,},]\n```', '[')
+    assert data == [{'a': 1}], "❌ Test 1 Failed: Trailing commas not repaired"
+    assert 'code_fences' in repairs and 'trailing_commas' in repairs, "❌ Test 1 Failed: Repairs not reported"
+    print("✅ Test 1 PASSED: Code fences and trailing commas repaired")
+    
+    # Test 2: Truncated responses are closed
+    data, repairs = parse_json_with_repair('{"weekly_goals": ["Finish OS"', '{')
+    assert data == {'weekly_goals': ['Finish OS']}, "❌ Test 2 Failed: Truncated JSON not repaired"
+    print("✅ Test 2 PASSED: Truncated JSON repaired")
+    
+    # Test 3: Commas inside strings are left alone
+    data, _ = parse_json_with_repair('[{"q": "a, ]"},]', '[')
+    assert data == [{'q': 'a, ]'}], "❌ Test 3 Failed: String content changed by repair"
+    print("✅ Test 3 PASSED: String content preserved")
+
+def test_schemas():
+    print("🧪 Testing structured output schemas...")
+    
+    valid, invalid = validate_mcqs([
+        {"question": "Q1", "options": {"A": "1", "b": "2", "c": "3", "d": "4"}, "correct_answer": "A", "explanation": "E"},
+        {"question": "Q2", "options": {"a": "1"}, "correct_answer": "e", "explanation": "E"}
+    ])
+    assert len(valid) == 1 and valid[0]['correct_answer'] == 'a', "❌ Test 1 Failed: Valid MCQ not normalized"
+    assert list(invalid) == [1], "❌ Test 2 Failed: Invalid MCQ not detected"
+    print("✅ MCQ schema validated")
+    
+    plan, invalid_fields = validate_weekly_plan({
+        "weekly_schedule": {"monday": ["OS: Processes"]},
+        "study_techniques": {"OS": "Practice"},
+        "revision_days": ["Someday"]
+    })
+    assert plan['weekly_schedule'] == {"Monday": ["OS: Processes"]}, "❌ Test 3 Failed: Plan days not normalized"
+    assert set(invalid_fields) == {'revision_days', 'weekly_goals'}, "❌ Test 4 Failed: Invalid plan fields not detected"
+    print("✅ Weekly plan schema validated field by field")
+
+def test_targeted_reprompt():
+    print("🧪 Testing targeted re-prompt for invalid MCQs...")
+    
+    response = '[{"question": "Good?", "options": {"a": "1", "b": "2", "c": "3", "d": "4"}, "correct_answer": "a", "explanation": "Yes."}, {"question": "Broken?", "options": {"a": "1"}, "correct_answer": "a", "explanation": "No."},]'
+    fake_model = FakeFixModel()
+    reprompts_before = metrics.get_counter('mcq.reprompts')
+    
+    model_registry.set_model(mcq_agent.agent_name, fake_model)
+    try:
+        mcqs = mcq_agent._parse_mcq_response(response, 2, "Operating Systems", "beginner")
+    finally:
+        model_registry.set_model(mcq_agent.agent_name, None)
+    
+    assert [mcq['question'] for mcq in mcqs] == ["Good?", "Fixed?"], "❌ Test 1 Failed: Invalid MCQ not replaced"
+    assert len(fake_model.prompts) == 1 and "Broken?" in fake_model.prompts[0], "❌ Test 2 Failed: Re-prompt not targeted"
+    assert "Good?" not in fake_model.prompts[0], "❌ Test 3 Failed: Valid MCQ was sent back to the model"
+    assert metrics.get_counter('mcq.reprompts') == reprompts_before + 1, "❌ Test 4 Failed: Re-prompt not counted"
+    print("✅ Only the invalid MCQ was re-prompted")
+
+if __name__ == "__main__":
+    test_json_repair()
+    test_schemas()
+    test_targeted_reprompt()
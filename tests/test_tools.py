@@ -31,6 +31,24 @@ def test_schedule_tools():
     
     print("✅ Schedule Tools Tests: PASSED")
 
+def test_batch_allocation():
+    """Test batch allocation matches the per-student tools and always adds up"""
+    
+    subjects = [['OS', 'DSA', 'CN', 'DBMS'], ['OS', 'DSA'], ['CN'], []]
+    hours = [10, 7, 3, 5]
+    loads = study_tools.calculate_study_load_batch(subjects, hours)
+    assert loads == [study_tools.calculate_study_load(s, h) for s, h in zip(subjects, hours)], "Batch study load differs"
+    
+    # More subjects than hours used to push one subject below zero
+    allocation = schedule_tools.optimize_time_allocation(['OS', 'DSA', 'CN', 'DBMS', 'COA'], {}, 3)
+    assert sum(allocation.values()) == 3 and min(allocation.values()) >= 0, "Allocation went negative"
+    
+    weights = [{'OS': 3.0, 'DSA': 1.0}, {'CN': 1.0, 'DBMS': 1.0, 'COA': 1.0}]
+    allocations = schedule_tools.optimize_time_allocation_batch([['OS', 'DSA'], ['CN', 'DBMS', 'COA']], weights, [9, 10])
+    assert allocations == [{'OS': 6, 'DSA': 3}, {'CN': 4, 'DBMS': 3, 'COA': 3}], f"Wrong allocation: {allocations}"
+    
+    print("✅ Batch Allocation Tests: PASSED")
+
 if __name__ == "__main__":
     test_study_tools()
     test_schedule_tools()
\ No newline at end of file
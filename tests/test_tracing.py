@@ -0,0 +1,67 @@
+import sys
+import os
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from agents.workflow import Workflow, WorkflowStep
+from memory.memory_bank import memory_bank
+from utils.tracing import Tracer, tracer, NOOP_SPAN
+
+def test_nested_spans_across_threads():
+    print("🧪 Testing trace spans...")
+    tracer.clear()
+    original_rate = tracer.sample_rate
+    tracer.sample_rate = 0.0
+
+    def load(student_id):
+        memory_bank.save_memory_section(student_id, 'tracing_test', {'ok': True})
+        return memory_bank.load_student_memory(student_id)
+
+    workflow = Workflow('tracing_test', [
+        WorkflowStep('load', load, inputs=['student_id'], output='memory'),
+        WorkflowStep('count', lambda memory: len(memory), inputs=['memory'], output='count')
+    ])
+
+    try:
+        with tracer.span('test.root', force=True, student_id='tracing_test_001') as root:
+            workflow.run(student_id='tracing_test_001')
+    finally:
+        tracer.sample_rate = original_rate
+
+    trace = tracer.get_trace(root.trace.trace_id)
+    spans = {span['name']: span for span in trace['spans']}
+    assert trace['name'] == 'test.root', "❌ Test 1 Failed: Root span missing"
+    assert spans['tracing_test.load']['parent_id'] == spans['test.root']['span_id'], "❌ Test 2 Failed: Step span not nested"
+    assert spans['tracing_test.load']['thread'] != spans['test.root']['thread'], "❌ Test 3 Failed: Step didn't run on the pool"
+
+    load_span = spans['memory.load_student_memory']
+    assert load_span['parent_id'] == spans['tracing_test.load']['span_id'], "❌ Test 4 Failed: Storage span not nested"
+    assert load_span['attributes']['bytes_read'] > 0, "❌ Test 5 Failed: Bytes read not recorded"
+    print("✅ Test 1-5 PASSED: Spans nest across the workflow pool")
+
+def test_sampling_and_export():
+    print("🧪 Testing sampling and export...")
+    export_path = os.path.join(tempfile.mkdtemp(), 'traces.jsonl')
+    local = Tracer(sample_rate=0.0, buffer_size=2, export_path=export_path)
+
+    with local.span('unsampled') as span:
+        with local.span('child') as child:
+            pass
+    assert span is NOOP_SPAN and child is NOOP_SPAN, "❌ Test 6 Failed: Spans recorded with sampling off"
+    assert local.traces() == [], "❌ Test 7 Failed: Unsampled trace kept"
+
+    for index in range(3):
+        with local.span(f'sampled_{index}', force=True):
+            pass
+    names = [trace['name'] for trace in local.traces()]
+    assert names == ['sampled_2', 'sampled_1'], "❌ Test 8 Failed: Ring buffer not bounded"
+
+    with open(export_path) as f:
+        exported = [json.loads(line) for line in f]
+    assert len(exported) == 3 and exported[0]['spans'][0]['name'] == 'sampled_0', "❌ Test 9 Failed: Traces not exported"
+    print("✅ Test 6-9 PASSED: Sampling, ring buffer and export work")
+
+if __name__ == "__main__":
+    test_nested_spans_across_threads()
+    test_sampling_and_export()
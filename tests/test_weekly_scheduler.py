@@ -0,0 +1,69 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from tools.weekly_scheduler import WeeklyScheduler
+from agents.study_plan_agent import study_plan_agent
+
+def minutes(clock_time):
+    hours, mins = clock_time.split(':')
+    return int(hours) * 60 + int(mins)
+
+def blocks_of(schedule, activity=None):
+    return [(day, entry) for day, entries in schedule['days'].items() for entry in entries
+            if activity is None or entry['activity'] == activity]
+
+def test_constraints():
+    print("🧪 Testing weekly scheduler constraints...")
+    scheduler = WeeklyScheduler(max_block_minutes=90, break_minutes=15)
+    load = {'Operating Systems': 7, 'Data Structures': 5, 'Computer Networks': 3}
+    schedule = scheduler.schedule(load, revision_days=['Wednesday', 'Saturday'])
+
+    studied = {}
+    for day, entry in blocks_of(schedule, 'study'):
+        studied[entry['subject']] = studied.get(entry['subject'], 0) + entry['minutes']
+        assert entry['minutes'] <= 90, "❌ Test 1 Failed: Block longer than the maximum"
+        assert day not in ('Wednesday', 'Saturday'), "❌ Test 2 Failed: New study on a revision day with room elsewhere"
+    assert studied == {subject: hours * 60 for subject, hours in load.items()}, f"❌ Test 3 Failed: {studied}"
+    assert not schedule['unscheduled_hours'], "❌ Test 4 Failed: Hours left over"
+
+    for day, entries in schedule['days'].items():
+        for previous, entry in zip(entries, entries[1:]):
+            assert minutes(entry['start']) - minutes(previous['end']) >= 15, f"❌ Test 5 Failed: No break on {day}"
+        for entry in entries:
+            start, end = minutes(entry['start']), minutes(entry['end'])
+            assert 9 * 60 <= start and end <= 21 * 60, "❌ Test 6 Failed: Block outside the day"
+            assert end <= 13 * 60 or start >= 14 * 60, "❌ Test 7 Failed: Block during lunch"
+
+    revision = [entry['subject'] for day, entry in blocks_of(schedule, 'revision') if day == 'Wednesday']
+    assert revision == list(load), "❌ Test 8 Failed: Missing revision blocks"
+    print("✅ Test 1-8 PASSED: Hours, blocks, breaks and revision days honoured")
+
+def test_preferences_and_overflow():
+    print("🧪 Testing preferred windows and full weeks...")
+    scheduler = WeeklyScheduler()
+    schedule = scheduler.schedule({'Algorithms': 6, 'DBMS': 4}, {'Preferred Time': 'Evening'})
+    starts = [minutes(entry['start']) for _, entry in blocks_of(schedule)]
+    assert all(start >= 17 * 60 for start in starts), "❌ Test 9 Failed: Blocks outside the preferred evening"
+
+    # More hours than the week holds: everything that fits is placed, the rest reported
+    schedule = scheduler.schedule({f"Subject {n}": 30 for n in range(4)})
+    scheduled = sum(schedule['scheduled_hours'].values())
+    assert 60 < scheduled < 120 and schedule['unscheduled_hours'], "❌ Test 10 Failed: Overflow not reported"
+    assert scheduled + sum(schedule['unscheduled_hours'].values()) == 120, "❌ Test 11 Failed: Hours lost"
+    print("✅ Test 9-11 PASSED: Preferred time first, overflow reported")
+
+def test_plan_has_valid_times():
+    print("🧪 Testing study plan schedule times...")
+    plan = study_plan_agent.generate_fast_plan({'subjects': ['OS', 'DSA', 'CN'], 'available_hours': 40,
+                                                'preferences': {}})
+    times = [entry['start'] for _, entry in blocks_of(plan['weekly_timetable'])]
+    times += [slot.split('-')[1] for slot in plan['daily_schedule']]
+    assert all(minutes(time) <= 24 * 60 for time in times), "❌ Test 12 Failed: Slot past midnight"
+    assert plan['daily_schedule'], "❌ Test 13 Failed: Empty daily schedule"
+    print("✅ Test 12-13 PASSED: No 25:00 slots")
+
+if __name__ == "__main__":
+    test_constraints()
+    test_preferences_and_overflow()
+    test_plan_has_valid_times()
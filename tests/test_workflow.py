@@ -0,0 +1,75 @@
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from agents.workflow import Workflow, WorkflowStep, WorkflowError
+
+def slow(value, delay=0.2):
+    time.sleep(delay)
+    return value
+
+def test_independent_steps_run_in_parallel():
+    print("🧪 Testing workflow parallelism...")
+    
+    workflow = Workflow('test_parallel', [
+        WorkflowStep('a', lambda x: slow(x + 1), inputs=['x'], output='a'),
+        WorkflowStep('b', lambda x: slow(x * 2), inputs=['x'], output='b'),
+        WorkflowStep('total', lambda a, b: a + b, inputs=['a', 'b'], output='total')
+    ])
+    
+    run = workflow.run(x=3)
+    breakdown = run.breakdown()
+    
+    assert run.get('total') == 10, "❌ Test 1 Failed: Wrong result"
+    assert run.total_ms < 350, f"❌ Test 2 Failed: Steps ran one after another ({run.total_ms:.0f}ms)"
+    assert list(breakdown['steps'])[-1] == 'total', "❌ Test 3 Failed: Dependent step ran too early"
+    assert breakdown['steps']['a']['duration_ms'] >= 190, "❌ Test 4 Failed: Step timing missing"
+    print("✅ Parallelism tests PASSED")
+
+def test_retries_timeouts_and_optional_steps():
+    print("🧪 Testing workflow retries and timeouts...")
+    
+    attempts = []
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ValueError("temporary failure")
+        return 'ok'
+    
+    workflow = Workflow('test_retries', [
+        WorkflowStep('flaky', flaky, retries=2, retry_backoff_s=0.01),
+        WorkflowStep('too_slow', lambda: slow('late', 1.0), timeout_s=0.1, required=False, default='fallback'),
+        WorkflowStep('per_item', lambda item: item * 10, inputs=['items'], map_over='items', map_as='item', limit=3)
+    ])
+    
+    run = workflow.run(items=[1, 2, 3, 4])
+    
+    assert run.get('flaky') == 'ok', "❌ Test 1 Failed: Retries did not recover"
+    assert run.timings['flaky']['attempts'] == 3, "❌ Test 2 Failed: Wrong attempt count"
+    assert run.get('too_slow') == 'fallback', "❌ Test 3 Failed: Timed out step not defaulted"
+    assert run.total_ms < 900, "❌ Test 4 Failed: Workflow waited for the slow step"
+    assert run.get('per_item') == [10, 20, 30], "❌ Test 5 Failed: Map step wrong"
+    
+    failing = Workflow('test_failure', [WorkflowStep('boom', lambda: 1 / 0)])
+    try:
+        failing.run()
+        assert False, "❌ Test 6 Failed: Required failure not raised"
+    except WorkflowError as e:
+        assert e.step == 'boom', "❌ Test 6 Failed: Wrong failing step"
+    
+    cyclic = Workflow('test_cycle', [
+        WorkflowStep('a', lambda b: b, inputs=['b'], output='a'),
+        WorkflowStep('b', lambda a: a, inputs=['a'], output='b')
+    ])
+    try:
+        cyclic.run()
+        assert False, "❌ Test 7 Failed: Cycle not detected"
+    except ValueError:
+        pass
+    
+    print("✅ Retry and timeout tests PASSED")
+
+if __name__ == "__main__":
+    test_independent_steps_run_in_parallel()
+    test_retries_timeouts_and_optional_steps()
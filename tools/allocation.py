@@ -0,0 +1,63 @@
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+
+def pad_rows(rows: Sequence[Sequence[float]], fill: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Ragged rows as one (students, max subjects) matrix plus a mask of the real entries"""
+    width = max((len(row) for row in rows), default=0)
+    lengths = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+    mask = np.arange(width) < lengths[:, None]
+    matrix = np.full((len(rows), width), fill, dtype=np.float64)
+    if width:
+        matrix[mask] = np.fromiter((value for row in rows for value in row), dtype=np.float64, count=int(lengths.sum()))
+    return matrix, mask
+
+def largest_remainder(weights: np.ndarray, totals: np.ndarray, mask: np.ndarray = None, minimum: int = 0) -> np.ndarray:
+    """
+    Split each row's total into whole hours in proportion to its weights
+    Every row sums exactly to its total and no entry goes negative. Each
+    entry first gets min(minimum, total // entries) hours; the rest is
+    shared by weight, rounded down, and the hours left over go one each to
+    the entries with the largest remainders (earlier entries win ties).
+    Rows without positive weights are split evenly. Masked-out entries get 0.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    totals = np.asarray(totals, dtype=np.int64)
+    if mask is None:
+        mask = np.ones(weights.shape, dtype=bool)
+    if weights.size == 0:
+        return np.zeros(weights.shape, dtype=np.int64)
+
+    counts = mask.sum(axis=1)
+    weights = np.where(mask, np.clip(weights, 0.0, None), 0.0)
+    row_weight = weights.sum(axis=1)
+    # Even split for rows with no usable weights
+    weights = np.where((row_weight == 0)[:, None] & mask, 1.0, weights)
+    row_weight = weights.sum(axis=1)
+
+    totals = np.maximum(totals, 0)
+    base = np.minimum(minimum, totals // np.maximum(counts, 1))
+    remaining = totals - base * counts
+
+    safe_weight = np.where(row_weight > 0, row_weight, 1.0)
+    # Multiply before dividing: whole-number weights then give correctly rounded quotas
+    quotas = weights * remaining[:, None] / safe_weight[:, None]
+    hours = np.floor(quotas)
+    left_over = remaining - hours.sum(axis=1).astype(np.int64)
+
+    fractions = np.where(mask, quotas - hours, -1.0)
+    order = np.argsort(-fractions, axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(order.shape[1])[None, :].repeat(order.shape[0], axis=0), axis=1)
+    hours += (ranks < left_over[:, None]) & mask
+
+    return np.where(mask, hours + base[:, None], 0).astype(np.int64)
+
+def allocate_batch(subjects: Sequence[Sequence[str]], weights: Sequence[Sequence[float]],
+                   totals: Sequence[int], minimum: int = 0) -> List[Dict[str, int]]:
+    """largest_remainder for ragged per-student subject lists; returns one {subject: hours} per student"""
+    if not len(subjects):
+        return []
+    matrix, mask = pad_rows(weights)
+    hours = largest_remainder(matrix, np.asarray(totals, dtype=np.int64), mask, minimum)
+    # zip stops at each student's own subjects, dropping the padding
+    return [dict(zip(row_subjects, row_hours)) for row_subjects, row_hours in zip(subjects, hours.tolist())]
@@ -0,0 +1,67 @@
+from typing import Dict, List, Any
+import numpy as np
+from agents.schemas import WEEK_DAYS
+
+# One bit per hour of the week: bit day * 24 + hour, Monday 00:00 first
+WEEK_SLOTS = 7 * 24
+WEEK_BYTES = WEEK_SLOTS // 8
+# Set bits in every byte value, for counting common hours without a Python loop
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+def _minutes(clock: str) -> int:
+    hours, minutes = clock.split(':')
+    return int(hours) * 60 + int(minutes)
+
+def availability_bits(weekly_timetable: Dict[str, Any]) -> np.ndarray:
+    """
+    Free hours of a weekly timetable as WEEK_SLOTS bits (packed, WEEK_BYTES bytes)
+    An hour is free when it lies inside the study day and no block or
+    fixed break touches it
+    """
+    day_hours = weekly_timetable.get('day_hours') or {'start': '09:00', 'end': '21:00'}
+    day_start, day_end = _minutes(day_hours['start']), _minutes(day_hours['end'])
+    first_hour, last_hour = -(-day_start // 60), day_end // 60
+    busy = [(_minutes(start), _minutes(end)) for start, end in weekly_timetable.get('breaks', [])]
+
+    slots = np.zeros(WEEK_SLOTS, dtype=bool)
+    for index, day in enumerate(WEEK_DAYS):
+        taken = busy + [(_minutes(entry['start']), _minutes(entry['end']))
+                        for entry in weekly_timetable.get('days', {}).get(day, [])]
+        for hour in range(first_hour, last_hour):
+            if not any(start < (hour + 1) * 60 and end > hour * 60 for start, end in taken):
+                slots[index * 24 + hour] = True
+    return np.packbits(slots)
+
+def encode_bits(bits: np.ndarray) -> str:
+    return bits.tobytes().hex()
+
+def decode_bits(value: str) -> np.ndarray:
+    """Packed bits from encode_bits (no free hours if missing or malformed)"""
+    try:
+        bits = np.frombuffer(bytes.fromhex(value or ''), dtype=np.uint8)
+    except ValueError:
+        bits = np.zeros(0, dtype=np.uint8)
+    if bits.size != WEEK_BYTES:
+        return np.zeros(WEEK_BYTES, dtype=np.uint8)
+    return bits.copy()
+
+def free_hours(bits: np.ndarray) -> int:
+    return int(POPCOUNT[bits].sum())
+
+def slot_labels(bits: np.ndarray) -> List[str]:
+    """Set bits as readable ranges, e.g. 'Monday 18:00-20:00'"""
+    slots = np.unpackbits(bits)[:WEEK_SLOTS]
+    labels = []
+    for index, day in enumerate(WEEK_DAYS):
+        hours = slots[index * 24:(index + 1) * 24]
+        hour = 0
+        while hour < 24:
+            if hours[hour]:
+                end = hour
+                while end < 24 and hours[end]:
+                    end += 1
+                labels.append(f"{day} {hour:02d}:00-{end % 24:02d}:00")
+                hour = end
+            else:
+                hour += 1
+    return labels
@@ -0,0 +1,139 @@
+from typing import Dict, List, Any
+from agents.schemas import WEEK_DAYS
+from memory.plan_cache import normalize_subject, normalize_preferences
+from utils.logger import logger
+
+# Topics covered in order for common B.Tech subjects
+SUBJECT_CATALOGUE = {
+    'operating systems': ['Processes and Threads', 'CPU Scheduling', 'Synchronization', 'Deadlocks',
+                          'Memory Management', 'Virtual Memory', 'File Systems', 'I/O Systems'],
+    'data structures': ['Arrays and Linked Lists', 'Stacks and Queues', 'Trees', 'Binary Search Trees',
+                        'Heaps', 'Hashing', 'Graphs', 'Tries'],
+    'algorithms': ['Complexity Analysis', 'Sorting', 'Divide and Conquer', 'Greedy Algorithms',
+                   'Dynamic Programming', 'Graph Algorithms', 'Backtracking', 'NP-Completeness'],
+    'database management systems': ['ER Model', 'Relational Model', 'SQL', 'Normalization',
+                                    'Indexing', 'Transactions', 'Concurrency Control', 'Recovery'],
+    'computer networks': ['OSI and TCP/IP Models', 'Physical and Data Link Layer', 'Network Layer',
+                          'Routing', 'Transport Layer', 'Congestion Control', 'Application Layer', 'Network Security'],
+    'compiler design': ['Lexical Analysis', 'Parsing', 'Syntax-Directed Translation', 'Semantic Analysis',
+                        'Intermediate Code', 'Code Optimization', 'Code Generation'],
+    'theory of computation': ['Finite Automata', 'Regular Expressions', 'Context-Free Grammars',
+                              'Pushdown Automata', 'Turing Machines', 'Decidability'],
+    'computer organization': ['Number Systems', 'Instruction Sets', 'ALU Design', 'Pipelining',
+                              'Memory Hierarchy', 'Cache', 'I/O Organization'],
+    'software engineering': ['Process Models', 'Requirements', 'Design Principles', 'UML',
+                             'Testing', 'Maintenance', 'Project Management'],
+    'discrete mathematics': ['Logic', 'Sets and Relations', 'Functions', 'Combinatorics',
+                             'Graph Theory', 'Recurrence Relations'],
+    'machine learning': ['Linear Regression', 'Classification', 'Decision Trees', 'Support Vector Machines',
+                         'Clustering', 'Neural Networks', 'Model Evaluation']
+}
+
+SUBJECT_ALIASES = {
+    'os': 'operating systems',
+    'ds': 'data structures',
+    'dsa': 'data structures',
+    'data structures and algorithms': 'data structures',
+    'design and analysis of algorithms': 'algorithms',
+    'daa': 'algorithms',
+    'dbms': 'database management systems',
+    'databases': 'database management systems',
+    'cn': 'computer networks',
+    'networks': 'computer networks',
+    'compilers': 'compiler design',
+    'toc': 'theory of computation',
+    'coa': 'computer organization',
+    'se': 'software engineering',
+    'ml': 'machine learning'
+}
+
+GENERIC_TOPICS = ['Fundamentals', 'Core Concepts', 'Worked Examples', 'Practice Problems', 'Advanced Topics']
+
+TECHNIQUES = {
+    'visual': 'Mind maps and diagrams for each topic',
+    'auditory': 'Explain topics aloud and review recorded notes',
+    'reading': 'Summarize each topic in your own notes',
+    'kinesthetic': 'Hands-on practice problems and small projects',
+    'practical': 'Hands-on practice problems and small projects'
+}
+DEFAULT_TECHNIQUE = 'Pomodoro technique: 25min study, 5min break'
+
+class LocalPlanner:
+    """
+    Deterministic weekly planner that needs no model call
+    Builds the same plan shape as the LLM (weekly_schedule, study_techniques,
+    revision_days, weekly_goals) from the study load and a topic catalogue
+    """
+
+    def __init__(self, catalogue: Dict[str, List[str]] = None):
+        self.catalogue = catalogue or SUBJECT_CATALOGUE
+
+    def topics_for(self, subject: str) -> List[str]:
+        """Ordered topics for a subject (generic ones for unknown subjects)"""
+        key = normalize_subject(subject)
+        key = SUBJECT_ALIASES.get(key, key)
+        return self.catalogue.get(key, GENERIC_TOPICS)
+
+    def create_weekly_plan(self, study_load: Dict[str, int], preferences: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Create a full weekly plan from the per-subject hours"""
+        preferences = normalize_preferences(preferences)
+        subjects = [subject for subject, hours in study_load.items() if hours > 0] or list(study_load)
+
+        revision_days = ['Wednesday', 'Saturday'] if sum(study_load.values()) > 4 else ['Saturday']
+        study_days = [day for day in WEEK_DAYS if day not in revision_days]
+
+        weekly_schedule = {day: [] for day in WEEK_DAYS}
+        covered = {subject: [] for subject in subjects}
+        sessions = self._interleave_sessions(study_load)
+        for index, subject in enumerate(sessions):
+            topics = self.topics_for(subject)
+            topic = topics[len(covered[subject]) % len(topics)]
+            covered[subject].append(topic)
+            # Consecutive sessions fill the days in order, so topics stay in sequence
+            day = study_days[index * len(study_days) // len(sessions)]
+            weekly_schedule[day].append(f"{subject}: {topic}")
+
+        for day in revision_days:
+            weekly_schedule[day] = [f"{subject}: Revision" for subject in subjects] or ["Weekly review"]
+        for day in study_days:
+            if not weekly_schedule[day]:
+                weekly_schedule[day] = ["Rest day"]
+
+        technique = TECHNIQUES.get(preferences.get('learning_style'), DEFAULT_TECHNIQUE)
+        study_techniques = {subject: technique for subject in subjects} or {'Default': DEFAULT_TECHNIQUE}
+
+        weekly_goals = [
+            f"Cover {', '.join(dict.fromkeys(covered[subject]))} in {subject}"
+            for subject in subjects if covered[subject]
+        ]
+        weekly_goals.append(f"Complete revision on {' and '.join(revision_days)}")
+
+        logger.info(f"⚡ Local weekly plan built for {len(subjects)} subjects")
+        return {
+            'weekly_schedule': weekly_schedule,
+            'study_techniques': study_techniques,
+            'revision_days': revision_days,
+            'weekly_goals': weekly_goals
+        }
+
+    def _interleave_sessions(self, study_load: Dict[str, int]) -> List[str]:
+        """
+        One entry per study hour, spreading each subject through the week
+        The subject with the most hours left goes next, never twice in a row
+        when another subject is available
+        """
+        remaining = {subject: hours for subject, hours in study_load.items() if hours > 0}
+        sessions = []
+        while remaining:
+            candidates = sorted(remaining, key=lambda subject: (-remaining[subject], subject))
+            if sessions and len(candidates) > 1 and candidates[0] == sessions[-1]:
+                candidates = candidates[1:]
+            subject = candidates[0]
+            sessions.append(subject)
+            remaining[subject] -= 1
+            if remaining[subject] == 0:
+                del remaining[subject]
+        return sessions
+
+# Global local planner
+local_planner = LocalPlanner()
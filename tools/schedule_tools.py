@@ -1,5 +1,7 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Sequence
 from datetime import datetime, timedelta
+from tools.allocation import allocate_batch
+from tools.weekly_scheduler import weekly_scheduler
 from utils.logger import logger
 
 class ScheduleTools:
@@ -30,36 +32,44 @@ class ScheduleTools:
             logger.error(f"❌ Error creating daily schedule: {e}")
             return {}
     
+    @staticmethod
+    def create_weekly_schedule(study_load: Dict[str, int], preferences: Dict[str, Any] = None,
+                               revision_days: List[str] = None) -> Dict[str, Any]:
+        """Timed study blocks for the whole week (see WeeklyScheduler)"""
+        try:
+            schedule = weekly_scheduler.schedule(study_load, preferences, revision_days)
+            blocks = sum(len(entries) for entries in schedule['days'].values())
+            logger.info(f"✅ Weekly schedule created with {blocks} blocks")
+            return schedule
+            
+        except Exception as e:
+            logger.error(f"❌ Error creating weekly schedule: {e}")
+            return {}
+    
     @staticmethod
     def optimize_time_allocation(subjects: List[str], priority_weights: Dict[str, float], total_hours: int) -> Dict[str, int]:
         """Optimize time allocation based on subject priorities"""
         try:
-            total_weight = sum(priority_weights.values())
-            if total_weight == 0:
-                # Equal distribution if no weights provided
-                hours_per_subject = total_hours // len(subjects)
-                return {subject: hours_per_subject for subject in subjects}
-            
-            allocation = {}
-            for subject in subjects:
-                weight = priority_weights.get(subject, 1.0)
-                hours = int((weight / total_weight) * total_hours)
-                allocation[subject] = max(1, hours)  # Minimum 1 hour per subject
-            
-            # Adjust for rounding
-            allocated_total = sum(allocation.values())
-            if allocated_total != total_hours:
-                # Distribute remaining hours
-                difference = total_hours - allocated_total
-                subject_with_least = min(allocation.items(), key=lambda x: x[1])[0]
-                allocation[subject_with_least] += difference
-            
+            allocation = ScheduleTools.optimize_time_allocation_batch([subjects], [priority_weights], [total_hours])[0]
             logger.info(f"✅ Time allocation optimized: {allocation}")
             return allocation
             
         except Exception as e:
             logger.error(f"❌ Error optimizing time allocation: {e}")
             return {}
+    
+    @staticmethod
+    def optimize_time_allocation_batch(subjects: Sequence[List[str]], priority_weights: Sequence[Dict[str, float]],
+                                       total_hours: Sequence[int]) -> List[Dict[str, int]]:
+        """
+        optimize_time_allocation for many students at once (one entry per student)
+        Hours follow the weights (1.0 for subjects without one) with at least
+        1 hour per subject when there are enough hours, and always add up to
+        the student's total (largest-remainder rounding)
+        """
+        weights = [[student_weights.get(subject, 1.0) for subject in student_subjects]
+                   for student_subjects, student_weights in zip(subjects, priority_weights)]
+        return allocate_batch(subjects, weights, total_hours, minimum=1)
 
 # Global schedule tools instance
 schedule_tools = ScheduleTools()
\ No newline at end of file
@@ -1,6 +1,7 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Sequence
 import json
 from datetime import datetime, timedelta
+from tools.allocation import allocate_batch
 from utils.logger import logger
 
 class StudyTools:
@@ -29,6 +30,11 @@ class StudyTools:
             logger.error(f"❌ Error calculating study load: {e}")
             return {}
     
+    @staticmethod
+    def calculate_study_load_batch(subjects: Sequence[List[str]], available_hours: Sequence[int]) -> List[Dict[str, int]]:
+        """calculate_study_load for many students at once (same split, one entry per student)"""
+        return allocate_batch(subjects, [[1.0] * len(student_subjects) for student_subjects in subjects], available_hours)
+    
     @staticmethod
     def generate_revision_schedule(learned_topics: List[str], retention_scores: Dict[str, float]) -> Dict[str, Any]:
         """Generate spaced repetition schedule based on retention scores"""
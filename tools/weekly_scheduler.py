@@ -0,0 +1,186 @@
+import heapq
+from typing import Dict, List, Any, Optional, Tuple
+from agents.schemas import WEEK_DAYS
+from memory.plan_cache import normalize_preferences
+from utils.logger import logger
+
+# Preferred study windows, in minutes from midnight
+PREFERRED_WINDOWS = {
+    'morning': (6 * 60, 12 * 60),
+    'afternoon': (12 * 60, 17 * 60),
+    'evening': (17 * 60, 21 * 60),
+    'night': (20 * 60, 24 * 60)
+}
+
+def clock(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+class DayGrid:
+    """
+    Free time of one day as segments where a block may start
+    Segments already leave the break after every placed block, so any
+    block that fits in a segment respects the breaks
+    """
+
+    def __init__(self, day: str, start: int, end: int, fixed_breaks: List[Tuple[int, int]], break_minutes: int):
+        self.day = day
+        self.break_minutes = break_minutes
+        self.blocks = []
+        self.subjects = set()
+        self.minutes = 0
+        self.segments = []
+        cursor = start
+        for break_start, break_end in sorted(fixed_breaks):
+            if break_start > cursor:
+                self.segments.append((cursor, min(break_start, end)))
+            cursor = max(cursor, break_end)
+        if cursor < end:
+            self.segments.append((cursor, end))
+
+    def largest_free(self) -> int:
+        return max((end - start for start, end in self.segments), default=0)
+
+    def place(self, length: int, preferred: Optional[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+        """Take length minutes, inside the preferred window if possible; returns (start, end) or None"""
+        choice = None
+        if preferred:
+            for index, (start, end) in enumerate(self.segments):
+                begin = max(start, preferred[0])
+                if begin + length <= min(end, preferred[1]):
+                    choice = (index, begin)
+                    break
+        if choice is None:
+            for index, (start, end) in enumerate(self.segments):
+                if end - start >= length:
+                    choice = (index, start)
+                    break
+        if choice is None:
+            return None
+
+        index, begin = choice
+        start, end = self.segments[index]
+        pieces = []
+        if begin - self.break_minutes > start:
+            pieces.append((start, begin - self.break_minutes))
+        if begin + length + self.break_minutes < end:
+            pieces.append((begin + length + self.break_minutes, end))
+        self.segments[index:index + 1] = pieces
+        self.minutes += length
+        return begin, begin + length
+
+class WeeklyScheduler:
+    """
+    Places each subject's weekly hours into timed blocks over a 7-day grid
+    Hours are cut into blocks of at most max_block_minutes with a break after
+    each, outside the fixed breaks (lunch). Revision days get a short
+    revision block per subject and only take new study once the other days
+    are full. A heap hands each block to the least-loaded day and another
+    picks the subject with the most time left, so subjects spread over the
+    week (a subject only gets a second block on a day once every open day
+    has one); within a day the preferred time window is filled first.
+    Scheduling n blocks takes O(n log n).
+    """
+
+    def __init__(self, day_start: int = 9 * 60, day_end: int = 21 * 60, max_block_minutes: int = 120,
+                 min_block_minutes: int = 30, break_minutes: int = 15, revision_minutes: int = 30,
+                 fixed_breaks: List[Tuple[int, int]] = None):
+        self.day_start = day_start
+        self.day_end = day_end
+        self.max_block_minutes = max_block_minutes
+        self.min_block_minutes = min_block_minutes
+        self.break_minutes = break_minutes
+        self.revision_minutes = revision_minutes
+        self.fixed_breaks = fixed_breaks if fixed_breaks is not None else [(13 * 60, 14 * 60)]
+
+    def schedule(self, study_load: Dict[str, float], preferences: Dict[str, Any] = None,
+                 revision_days: List[str] = None) -> Dict[str, Any]:
+        """Timed blocks for every day of the week, plus the hours that didn't fit"""
+        preferred = PREFERRED_WINDOWS.get(normalize_preferences(preferences).get('preferred_time'))
+        start, end = self.day_start, self.day_end
+        if preferred:
+            # A preferred window outside the usual day widens it
+            start, end = min(start, preferred[0]), max(end, preferred[1])
+        revision_days = [day for day in WEEK_DAYS if day in (revision_days or [])]
+        days = [DayGrid(day, start, end, self.fixed_breaks, self.break_minutes) for day in WEEK_DAYS]
+        subjects = [subject for subject, hours in study_load.items() if hours > 0]
+
+        for grid in days:
+            if grid.day in revision_days:
+                for subject in subjects:
+                    slot = grid.place(self.revision_minutes, preferred)
+                    if slot:
+                        grid.blocks.append((slot[0], slot[1], subject, 'revision'))
+
+        # Subjects: most minutes left first (ties in the order given)
+        remaining = {subject: int(round(study_load[subject] * 60)) for subject in subjects}
+        subject_heap = [(-minutes, order, subject) for order, (subject, minutes) in enumerate(remaining.items())]
+        heapq.heapify(subject_heap)
+        # Days: study days before revision days, then the least loaded
+        day_heap = [(grid.day in revision_days, grid.minutes, index) for index, grid in enumerate(days)
+                    if grid.largest_free() >= self.min_block_minutes]
+        heapq.heapify(day_heap)
+
+        while subject_heap and day_heap:
+            _, order, subject = heapq.heappop(subject_heap)
+            is_revision_day, index = self._pick_day(day_heap, days, subject)
+            grid = days[index]
+
+            length = min(self.max_block_minutes, remaining[subject], grid.largest_free())
+            if length < min(self.min_block_minutes, remaining[subject]):
+                # This day is full; the subject tries the next one
+                heapq.heappush(subject_heap, (-remaining[subject], order, subject))
+                continue
+            begin, finish = grid.place(length, preferred)
+            grid.blocks.append((begin, finish, subject, 'study'))
+            grid.subjects.add(subject)
+            remaining[subject] -= length
+
+            if remaining[subject] > 0:
+                heapq.heappush(subject_heap, (-remaining[subject], order, subject))
+            if grid.largest_free() >= self.min_block_minutes:
+                heapq.heappush(day_heap, (is_revision_day, grid.minutes, index))
+
+        unscheduled = {subject: round(minutes / 60, 2) for subject, minutes in remaining.items() if minutes > 0}
+        if unscheduled:
+            logger.warning(f"⚠️  Weekly schedule is full; not scheduled (hours): {unscheduled}")
+
+        return {
+            'days': {
+                grid.day: [
+                    {'start': clock(begin), 'end': clock(finish), 'subject': subject, 'activity': activity,
+                     'minutes': finish - begin}
+                    for begin, finish, subject, activity in sorted(grid.blocks)
+                ]
+                for grid in days
+            },
+            'revision_days': revision_days,
+            'day_hours': {'start': clock(start), 'end': clock(end)},
+            'breaks': [[clock(break_start), clock(break_end)] for break_start, break_end in sorted(self.fixed_breaks)],
+            'scheduled_hours': {subject: round((study_load[subject] * 60 - remaining[subject]) / 60, 2)
+                                for subject in subjects},
+            'unscheduled_hours': unscheduled
+        }
+
+    @staticmethod
+    def _pick_day(day_heap: list, days: List[DayGrid], subject: str) -> Tuple[bool, int]:
+        """Least-loaded day, skipping days that already study the subject while others don't"""
+        skipped = []
+        choice = None
+        while day_heap:
+            entry = heapq.heappop(day_heap)
+            if skipped and entry[0] != skipped[0][0]:
+                # Never move to a revision day just to avoid a repeat
+                skipped.append(entry)
+                break
+            if subject not in days[entry[2]].subjects:
+                choice = entry
+                break
+            skipped.append(entry)
+        if choice is None:
+            choice = skipped.pop(0)
+        for entry in skipped:
+            heapq.heappush(day_heap, entry)
+        return choice[0], choice[2]
+
+# Global weekly scheduler
+weekly_scheduler = WeeklyScheduler()
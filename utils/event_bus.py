@@ -0,0 +1,153 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Callable
+from utils.metrics import metrics
+from utils.logger import logger
+
+_STOP = object()
+
+class EventBus:
+    """
+    In-process publish/subscribe for derived updates
+    publish() only queues the event; one dispatcher thread takes events off a
+    bounded queue in batches and hands each subscriber the events of its
+    topic, in publish order. When the queue is full the event is handled
+    inline, and queued events are drained at interpreter exit, so nothing
+    is lost. With mode='sync' every event is handled inline (scripts, tests).
+    """
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 100, batch_wait_s: float = 0.05,
+                 put_timeout_s: float = 1.0, mode: str = 'async'):
+        self.batch_size = max(1, batch_size)
+        self.batch_wait_s = batch_wait_s
+        self.put_timeout_s = put_timeout_s
+        self.mode = mode
+        self._subscribers = {}
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._dispatcher = None
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    @classmethod
+    def from_env(cls) -> 'EventBus':
+        return cls(
+            max_queue=int(os.getenv('EVENT_BUS_MAX_QUEUE', '10000')),
+            batch_size=int(os.getenv('EVENT_BUS_BATCH_SIZE', '100')),
+            mode=os.getenv('EVENT_BUS_MODE', 'async').lower()
+        )
+
+    def subscribe(self, topic: str, handler: Callable[[List[Dict[str, Any]]], None]):
+        """Call handler with lists of events published to a topic"""
+        with self._lock:
+            self._subscribers.setdefault(topic, []).append(handler)
+
+    def publish(self, topic: str, payload: Dict[str, Any]) -> bool:
+        """Queue an event for the topic's subscribers; returns False if nobody subscribes"""
+        if topic not in self._subscribers:
+            return False
+        event = {'topic': topic, 'payload': payload, 'published_at': time.time()}
+        metrics.increment('events.published')
+
+        if self.mode == 'sync':
+            self._dispatch([event])
+            return True
+
+        self._ensure_dispatcher()
+        try:
+            self._queue.put(event, timeout=self.put_timeout_s)
+        except queue.Full:
+            # Don't drop derived updates: do the work on the caller's thread instead
+            metrics.increment('events.handled_inline')
+            logger.warning(f"⚠️  Event queue full, handling {topic} inline")
+            self._dispatch([event])
+            return True
+
+        metrics.set_gauge('events.queue_depth', self._queue.qsize())
+        return True
+
+    def drain(self, timeout: float = None) -> bool:
+        """Wait until every queued event is handled; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float = 30.0):
+        """Handle everything still queued and stop the dispatcher (runs at exit)"""
+        with self._lock:
+            dispatcher, self._dispatcher = self._dispatcher, None
+        if dispatcher is None:
+            return
+        pending = self._queue.qsize()
+        self._queue.put(_STOP)
+        dispatcher.join(timeout)
+        if pending:
+            logger.info(f"🧹 Event bus drained {pending} events on shutdown")
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is not None:
+            return
+        with self._lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._run, name='event-bus', daemon=True)
+                self._dispatcher.start()
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            if event is _STOP:
+                self._queue.task_done()
+                return
+            batch = [event]
+
+            # Collect whatever arrives shortly after, up to a full batch
+            deadline = time.monotonic() + self.batch_wait_s
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    event = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if event is _STOP:
+                    stop = True
+                    break
+                batch.append(event)
+
+            try:
+                self._dispatch(batch)
+            finally:
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+                metrics.set_gauge('events.queue_depth', self._queue.qsize())
+            if stop:
+                return
+
+    def _dispatch(self, events: List[Dict[str, Any]]):
+        by_topic = OrderedDict()
+        for event in events:
+            by_topic.setdefault(event['topic'], []).append(event)
+
+        now = time.time()
+        metrics.observe('events.batch_size', len(events))
+        for event in events:
+            metrics.observe('events.lag_ms', (now - event['published_at']) * 1000)
+
+        for topic, topic_events in by_topic.items():
+            for handler in list(self._subscribers.get(topic, [])):
+                try:
+                    handler(topic_events)
+                    metrics.increment('events.processed', len(topic_events))
+                except Exception as e:
+                    metrics.increment('events.handler_errors')
+                    logger.error(f"❌ Event handler for {topic} failed: {e}")
+
+# Global event bus
+event_bus = EventBus.from_env()
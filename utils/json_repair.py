@@ -0,0 +1,178 @@
+import json
+import re
+from typing import Any, List, Optional, Tuple
+from utils.metrics import metrics
+
+CODE_FENCE = re.compile(r"```(?:json|JSON)?")
+SMART_QUOTES = {'“': '"', '”': '"', '‘': "'", '’': "'"}
+PYTHON_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+
+def parse_json_with_repair(text: str, expect: str = '[', metric_prefix: str = None) -> Tuple[Optional[Any], List[str]]:
+    """
+    Parse JSON from a model response, repairing common breakage locally
+    Returns (data or None, list of repairs that were applied)
+    """
+    data, repairs = _parse(text, expect)
+
+    if metric_prefix:
+        metrics.increment(f'{metric_prefix}.parse_attempts')
+        if data is None:
+            metrics.increment(f'{metric_prefix}.parse_failures')
+        elif repairs:
+            metrics.increment(f'{metric_prefix}.repaired')
+        for name in repairs:
+            metrics.increment(f'{metric_prefix}.repairs.{name}')
+
+        attempts = metrics.get_counter(f'{metric_prefix}.parse_attempts')
+        failures = metrics.get_counter(f'{metric_prefix}.parse_failures')
+        metrics.set_gauge(f'{metric_prefix}.parse_failure_rate', failures / attempts)
+
+    return data, repairs
+
+def _parse(text: str, expect: str) -> Tuple[Optional[Any], List[str]]:
+    repairs = []
+    if not text:
+        return None, repairs
+
+    # Remove markdown code fences around the JSON
+    cleaned = CODE_FENCE.sub('', text)
+    if cleaned != text:
+        repairs.append('code_fences')
+
+    candidate = _extract_span(cleaned, expect)
+    if candidate is None:
+        return None, repairs
+
+    data = _try_load(candidate)
+    if data is not None:
+        return data, repairs
+
+    # Apply the local fixes one at a time until the text parses
+    fixes = [
+        ('smart_quotes', _replace_smart_quotes),
+        ('trailing_commas', _remove_trailing_commas),
+        ('python_literals', _replace_python_literals),
+        ('unclosed_brackets', _close_brackets)
+    ]
+    for name, fix in fixes:
+        fixed = fix(candidate)
+        if fixed != candidate:
+            repairs.append(name)
+            candidate = fixed
+            data = _try_load(candidate)
+            if data is not None:
+                return data, repairs
+
+    return None, repairs
+
+def _try_load(text: str) -> Optional[Any]:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+def _extract_span(text: str, expect: str) -> Optional[str]:
+    """Cut out the outermost JSON array or object"""
+    closer = ']' if expect == '[' else '}'
+    start_idx = text.find(expect)
+    if start_idx == -1:
+        return None
+
+    end_idx = text.rfind(closer)
+    if end_idx < start_idx:
+        # Truncated response, keep everything and let _close_brackets try
+        return text[start_idx:].strip()
+    return text[start_idx:end_idx + 1]
+
+def _scan_outside_strings(text: str):
+    """Yield (char, in_string) for every character; quote marks count as in_string"""
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+            yield char, True
+        elif char == '"':
+            in_string = True
+            yield char, True
+        else:
+            yield char, False
+
+def _replace_smart_quotes(text: str) -> str:
+    for smart, plain in SMART_QUOTES.items():
+        text = text.replace(smart, plain)
+    return text
+
+def _remove_trailing_commas(text: str) -> str:
+    """Drop commas that come right before a closing bracket"""
+    result = []
+    pending_comma = None
+    for char, in_string in _scan_outside_strings(text):
+        if not in_string and char == ',':
+            if pending_comma is not None:
+                result.append(pending_comma)
+            pending_comma = char
+            continue
+        if not in_string and char.isspace() and pending_comma is not None:
+            pending_comma += char
+            continue
+        if pending_comma is not None:
+            if in_string or char not in ']}':
+                result.append(pending_comma)
+            else:
+                # Keep the whitespace, lose the comma
+                result.append(pending_comma[1:])
+            pending_comma = None
+        result.append(char)
+    if pending_comma is not None:
+        result.append(pending_comma)
+    return ''.join(result)
+
+def _replace_python_literals(text: str) -> str:
+    """Turn True/False/None written outside strings into JSON literals"""
+    result = []
+    word = []
+    for char, in_string in _scan_outside_strings(text):
+        if not in_string and (char.isalnum() or char == '_'):
+            word.append(char)
+            continue
+        if word:
+            token = ''.join(word)
+            result.append(PYTHON_LITERALS.get(token, token))
+            word = []
+        result.append(char)
+    if word:
+        token = ''.join(word)
+        result.append(PYTHON_LITERALS.get(token, token))
+    return ''.join(result)
+
+def _close_brackets(text: str) -> str:
+    """Close brackets (and a string) left open by a truncated response"""
+    stack = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '[{':
+            stack.append(']' if char == '[' else '}')
+        elif char in ']}' and stack:
+            stack.pop()
+
+    if not stack and not in_string:
+        return text
+
+    closed = text + ('"' if in_string else '')
+    return _remove_trailing_commas(closed.rstrip().rstrip(',') + ''.join(reversed(stack)))
@@ -0,0 +1,105 @@
+import json
+from typing import List, Any
+from utils.logger import logger
+
+class IncrementalJSONArrayParser:
+    """
+    Incremental parser for a streamed JSON array
+    Feed it text chunks and it returns each array element as soon as it closes
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._pos = 0
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._element_start = None
+
+    @property
+    def finished(self) -> bool:
+        """True once the closing bracket of the array has been seen"""
+        return self._finished
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Add a chunk of text and return the elements completed by it"""
+        if self._finished or not chunk:
+            return []
+
+        self._buffer += chunk
+        completed = []
+
+        while self._pos < len(self._buffer) and not self._finished:
+            char = self._buffer[self._pos]
+
+            if not self._started:
+                # Skip any text (or code fences) before the array starts
+                if char == '[':
+                    self._started = True
+                    self._depth = 1
+                self._pos += 1
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                self._pos += 1
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._element_start is None:
+                    self._element_start = self._pos
+            elif char in '{[':
+                if self._depth == 1 and self._element_start is None:
+                    self._element_start = self._pos
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 1:
+                    # A nested object/array element just closed
+                    self._emit(self._pos + 1, completed)
+                elif self._depth == 0:
+                    # End of the top-level array
+                    self._emit(self._pos, completed)
+                    self._finished = True
+            elif char == ',' and self._depth == 1:
+                self._emit(self._pos, completed)
+            elif self._depth == 1 and not char.isspace() and self._element_start is None:
+                # Start of a scalar element (number, true, false, null)
+                self._element_start = self._pos
+
+            self._pos += 1
+
+        self._compact()
+        return completed
+
+    def _emit(self, end: int, completed: List[Any]):
+        """Decode the pending element that ends at the given position"""
+        if self._element_start is None:
+            return
+
+        raw = self._buffer[self._element_start:end].strip()
+        self._element_start = None
+        if not raw:
+            return
+
+        try:
+            completed.append(json.loads(raw))
+        except json.JSONDecodeError as e:
+            logger.warning(f"⚠️  Skipping malformed streamed JSON element: {e}")
+
+    def _compact(self):
+        """Drop text that has already been parsed"""
+        keep_from = self._pos if self._element_start is None else self._element_start
+        if keep_from > 0:
+            self._buffer = self._buffer[keep_from:]
+            self._pos -= keep_from
+            if self._element_start is not None:
+                self._element_start -= keep_from
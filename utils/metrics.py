@@ -0,0 +1,106 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any
+
+class MetricsRegistry:
+    """
+    Simple in-process metrics registry
+    Keeps counters, gauges and timing samples for observability
+    """
+
+    def __init__(self, max_samples: int = 1000):
+        self.max_samples = max_samples
+        self._counters = {}
+        self._gauges = {}
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1):
+        """Increase a counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        """Set a gauge to its current value"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        """Record one sample (for example a latency in milliseconds)"""
+        with self._lock:
+            samples = self._samples.setdefault(name, {'count': 0, 'sum': 0.0, 'recent': []})
+            samples['count'] += 1
+            samples['sum'] += value
+            samples['recent'].append(value)
+
+            # Keep only the most recent samples for percentiles
+            if len(samples['recent']) > self.max_samples:
+                del samples['recent'][0]
+
+    @contextmanager
+    def timer(self, name: str):
+        """Time a block of code in milliseconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def get_counter(self, name: str) -> float:
+        """Get the current value of a counter"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def get_count(self, name: str) -> int:
+        """Get how many samples have been observed for a metric"""
+        with self._lock:
+            return self._samples.get(name, {}).get('count', 0)
+
+    def percentile(self, name: str, pct: float) -> float:
+        """Get a percentile (0-100) of the recent samples for a metric"""
+        with self._lock:
+            recent = list(self._samples.get(name, {}).get('recent', []))
+        return self._percentile(recent, pct)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get all metrics as a plain dictionary"""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            samples = {name: (data['count'], data['sum'], list(data['recent']))
+                       for name, data in self._samples.items()}
+
+        timings = {}
+        for name, (count, total, recent) in samples.items():
+            timings[name] = {
+                'count': count,
+                'avg': total / count if count else 0.0,
+                'p50': self._percentile(recent, 50),
+                'p95': self._percentile(recent, 95),
+                'p99': self._percentile(recent, 99)
+            }
+
+        return {
+            'counters': counters,
+            'gauges': gauges,
+            'timings': timings
+        }
+
+    def reset(self):
+        """Clear all metrics"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._samples.clear()
+
+    @staticmethod
+    def _percentile(values: List[float], pct: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, int(round((pct / 100) * (len(ordered) - 1))))
+        return ordered[index]
+
+# Global metrics instance
+metrics = MetricsRegistry()
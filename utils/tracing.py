@@ -0,0 +1,249 @@
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Optional
+from utils.logger import logger
+
+class Span:
+    """One timed operation in a trace, with attributes (student_id, topic, bytes...)"""
+
+    __slots__ = ('name', 'trace', 'span_id', 'parent_id', 'start', '_started', 'duration_ms',
+                 'attributes', 'status', 'error', 'thread')
+
+    sampled = True
+
+    def __init__(self, name: str, trace: '_Trace', parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = None
+        self.attributes = attributes
+        self.status = 'ok'
+        self.error = None
+        self.thread = threading.current_thread().name
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': datetime.fromtimestamp(self.start).isoformat(),
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'error': self.error,
+            'thread': self.thread,
+            'attributes': self.attributes
+        }
+
+class _NoopSpan:
+    """Stands in for a span when the trace isn't sampled; every call does nothing"""
+
+    __slots__ = ()
+    sampled = False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class _Trace:
+    """The spans of one sampled root operation (filled in from any thread)"""
+
+    def __init__(self, max_spans: int):
+        self.trace_id = uuid.uuid4().hex
+        self.max_spans = max_spans
+        self.spans = []
+        self.dropped = 0
+        self.root = None
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+            dropped = self.dropped
+        return {
+            'trace_id': self.trace_id,
+            'name': self.root.name,
+            'start': datetime.fromtimestamp(self.root.start).isoformat(),
+            'duration_ms': self.root.duration_ms,
+            'status': self.root.status,
+            'span_count': len(spans),
+            'dropped_spans': dropped,
+            'spans': [span.to_dict() for span in spans]
+        }
+
+# Span the current code runs inside (NOOP_SPAN inside an unsampled trace)
+_current_span = contextvars.ContextVar('trace_span', default=None)
+
+class Tracer:
+    """
+    Lightweight in-process tracing with nested spans
+    A root span decides whether its trace is sampled (TRACE_SAMPLE_RATE) and
+    child spans follow it; spans follow the context into workflow steps and
+    model calls because those pools copy the caller's context. Finished
+    traces are kept in a ring buffer (GET /debug/traces) and, with an export
+    path, appended to a JSONL file. With sampling off a span costs one
+    context lookup.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, buffer_size: int = 100, export_path: str = None,
+                 max_spans: int = 1000):
+        self.sample_rate = sample_rate
+        self.export_path = export_path
+        self.max_spans = max_spans
+        self._traces = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'Tracer':
+        return cls(
+            sample_rate=float(os.getenv('TRACE_SAMPLE_RATE', '0')),
+            buffer_size=int(os.getenv('TRACE_BUFFER_SIZE', '100')),
+            export_path=os.getenv('TRACE_EXPORT_PATH') or None
+        )
+
+    def start_span(self, name: str, force: bool = False, **attributes):
+        """
+        Open a span as a child of the current one; returns (span, token) for end_span
+        force=True samples a new trace whatever the sample rate
+        """
+        parent = _current_span.get()
+        if parent is NOOP_SPAN:
+            return NOOP_SPAN, None
+        if parent is None and not force:
+            if self.sample_rate <= 0:
+                return NOOP_SPAN, None
+            if random.random() >= self.sample_rate:
+                # Remember the decision so child spans don't sample on their own
+                return NOOP_SPAN, _current_span.set(NOOP_SPAN)
+
+        if parent is None:
+            trace = _Trace(self.max_spans)
+            span = Span(name, trace, None, attributes)
+            trace.root = span
+        else:
+            span = Span(name, parent.trace, parent.span_id, attributes)
+        return span, _current_span.set(span)
+
+    def end_span(self, span, token, error: BaseException = None):
+        """Close a span from start_span; a root span finishes its trace"""
+        if token is not None:
+            _current_span.reset(token)
+        if not span.sampled:
+            return
+
+        span.duration_ms = round((time.perf_counter() - span._started) * 1000, 3)
+        if error is not None:
+            span.status = 'error'
+            span.error = f"{type(error).__name__}: {error}"
+        span.trace.add(span)
+        if span.parent_id is None:
+            self._finish(span.trace)
+
+    @contextmanager
+    def span(self, name: str, force: bool = False, **attributes):
+        """Trace a block of code"""
+        span, token = self.start_span(name, force, **attributes)
+        if span is NOOP_SPAN and token is None:
+            yield span
+            return
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, token, e)
+            raise
+        self.end_span(span, token)
+
+    def current_span(self):
+        """The span the caller is running in (a no-op span if not tracing)"""
+        return _current_span.get() or NOOP_SPAN
+
+    def set_attributes(self, **attributes):
+        """Add attributes to the current span"""
+        span = _current_span.get()
+        if span is not None:
+            span.set_attributes(**attributes)
+
+    def traces(self, limit: int = None) -> List[Dict[str, Any]]:
+        """Finished traces, newest first, without their spans"""
+        with self._lock:
+            traces = list(self._traces)
+        traces.reverse()
+        summaries = []
+        for trace in traces[:limit]:
+            summary = trace.to_dict()
+            del summary['spans']
+            summaries.append(summary)
+        return summaries
+
+    def get_trace(self, trace_id: str) -> Dict[str, Any]:
+        """A finished trace with all its spans (empty if it has left the buffer)"""
+        with self._lock:
+            for trace in self._traces:
+                if trace.trace_id == trace_id:
+                    return trace.to_dict()
+        return {}
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+    def _finish(self, trace: _Trace):
+        with self._lock:
+            self._traces.append(trace)
+        if not self.export_path:
+            return
+        line = json.dumps(trace.to_dict(), default=str)
+        with self._lock:
+            try:
+                directory = os.path.dirname(os.path.abspath(self.export_path))
+                os.makedirs(directory, exist_ok=True)
+                with open(self.export_path, 'a') as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                logger.error(f"❌ Error exporting trace: {e}")
+
+def traced(name: str = None) -> Callable:
+    """Decorator that runs a function inside a span (named after it by default)"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Nothing to record: skip the context manager entirely
+            if tracer.sample_rate <= 0 and _current_span.get() is None:
+                return func(*args, **kwargs)
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Global tracer
+tracer = Tracer.from_env()